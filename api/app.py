@@ -5,7 +5,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.database import init_db
-from api.routers import projects, threads, resources, query, messages, findings, jobs, notifications, websocket, auth
+from api.routers import projects, threads, resources, uploads, query, messages, findings, jobs, notifications, websocket, auth
 
 app = FastAPI(
     title="Akleao Research API",
@@ -48,6 +48,7 @@ app.add_middleware(
 app.include_router(auth.router)  # Auth routes (no auth required)
 app.include_router(projects.router)
 app.include_router(threads.router)
+app.include_router(uploads.router)  # Before resources.router so /uploads isn't taken for a resource ID
 app.include_router(resources.router)
 app.include_router(resources.global_router)  # Global resources (library)
 app.include_router(query.router)
@@ -60,9 +61,14 @@ app.include_router(websocket.router)
 
 @app.on_event("startup")
 def startup():
-    """Initialize database on startup."""
+    """Initialize database and shared API clients on startup."""
     init_db()
 
+    from api.clients import warmup
+    from rag.docling_pool import warmup_docling
+    warmup()
+    warmup_docling()
+
 
 @app.get("/")
 def root():
@@ -74,3 +80,10 @@ def root():
 def health():
     """Health check endpoint."""
     return {"status": "healthy"}
+
+
+@app.get("/health/embedding-cache")
+def embedding_cache_stats():
+    """Query embedding cache hit/miss counters for this API process."""
+    from rag.embedding_cache import get_embedding_cache
+    return get_embedding_cache().stats()
@@ -13,6 +13,7 @@ from fastapi import Response
 JWT_SECRET = os.getenv("JWT_SECRET", secrets.token_hex(32))
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24 * 7  # 1 week
+UPLOAD_TOKEN_EXPIRATION_MINUTES = 60
 MAGIC_LINK_EXPIRATION_MINUTES = 15
 AUTH_COOKIE_NAME = "auth_token"
 
@@ -54,6 +55,32 @@ def decode_jwt_token(token: str) -> dict:
     return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
 
 
+def create_upload_token(user_id: str, project_id: str, sha256: str, size: int) -> str:
+    """Create a token authorizing one upload of a file with a known hash (from preflight)."""
+    payload = {
+        "sub": user_id,
+        "purpose": "upload",
+        "project_id": project_id,
+        "sha256": sha256,
+        "size": size,
+        "exp": datetime.utcnow() + timedelta(minutes=UPLOAD_TOKEN_EXPIRATION_MINUTES),
+        "iat": datetime.utcnow(),
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def decode_upload_token(token: str) -> dict:
+    """Decode and validate an upload token.
+
+    Raises:
+        jwt.InvalidTokenError: If the token is invalid, expired or not an upload token
+    """
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    if payload.get("purpose") != "upload":
+        raise jwt.InvalidTokenError("Not an upload token")
+    return payload
+
+
 def set_auth_cookie(response: Response, token: str) -> None:
     """Set the httpOnly auth cookie on a response."""
     # Check if we're in development (localhost)
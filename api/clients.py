@@ -0,0 +1,164 @@
+"""Process-wide registry of long-lived API clients.
+
+Embedder (OpenAI), VectorStore (Pinecone), Anthropic and the RAG pipeline
+are created once per process on first use and shared by every request,
+so their HTTP connection pools stay warm. Index existence is checked once
+per process - eagerly from warmup() at API/worker start, or lazily on
+first use otherwise.
+
+Celery's prefork workers call warmup() from worker_process_init, so each
+child process builds its own clients after the fork.
+"""
+
+import os
+import threading
+from dotenv import load_dotenv
+from anthropic import Anthropic
+
+from rag.embeddings import Embedder
+from rag.embedding_cache import get_embedding_cache
+from rag.vectorstore import VectorStore, create_vectorstore
+from rag.retriever import Retriever
+from rag.lexical import LexicalIndexStore
+from rag.rerank import LexicalReranker
+from rag.pipeline import RAGPipeline
+
+# Load environment
+load_dotenv()
+
+_clients: dict[str, object] = {}
+_lock = threading.RLock()
+_index_checked = False
+
+
+def _get_or_create(name: str, factory):
+    """Return the named client, creating it under the lock on first use."""
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory()
+                _clients[name] = client
+    return client
+
+
+def get_embedder() -> Embedder:
+    """Shared embedder with the query cache and chunk embedding store."""
+    def create():
+        from api.services.embedding_store import DatabaseEmbeddingStore
+        return Embedder(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            cache=get_embedding_cache(),
+            chunk_store=DatabaseEmbeddingStore()
+        )
+    return _get_or_create("embedder", create)
+
+
+def get_vectorstore() -> VectorStore:
+    """Shared vector store, with the index checked once per process.
+
+    VECTOR_STORE_BACKEND selects Pinecone (the default) or the local store.
+    Chunk text lives in the chunk_records table; vectors only carry the
+    metadata needed for filtering.
+    """
+    def create():
+        from api.services.chunk_store import DatabaseChunkStore
+        return create_vectorstore(
+            api_key=os.getenv("PINECONE_API_KEY"),
+            index_name=os.getenv("PINECONE_INDEX_NAME", "akleao-research"),
+            dimension=get_embedder().dimensions,
+            chunk_store=DatabaseChunkStore()
+        )
+    vectorstore = _get_or_create("vectorstore", create)
+    _ensure_index(vectorstore)
+    return vectorstore
+
+
+def _ensure_index(vectorstore: VectorStore) -> None:
+    global _index_checked
+    if _index_checked:
+        return
+    with _lock:
+        if not _index_checked:
+            vectorstore.create_index_if_not_exists()
+            _index_checked = True
+
+
+def get_lexical_store() -> LexicalIndexStore:
+    """Shared store of per-resource BM25 indexes (LEXICAL_INDEX_DIR).
+
+    Indexes are built at ingestion whatever RETRIEVAL_MODE is, so hybrid
+    retrieval can be turned on without reindexing. LEXICAL_CACHE_SIZE is how
+    many indexes stay loaded.
+    """
+    return _get_or_create("lexical_store", lambda: LexicalIndexStore(
+        base_dir=os.getenv("LEXICAL_INDEX_DIR", "lexical_indexes"),
+        max_loaded=int(os.getenv("LEXICAL_CACHE_SIZE", "32"))
+    ))
+
+
+def get_retriever() -> Retriever:
+    """Shared retriever over the shared embedder and vector store.
+
+    RETRIEVAL_MODE selects "dense" (the default) or "hybrid" (BM25 + dense).
+    RERANKER selects "none" (the default) or "lexical" (opt-in), and
+    RERANK_OVERFETCH how many candidates per result are rescored.
+    """
+    reranker = LexicalReranker() if os.getenv("RERANKER", "none") == "lexical" else None
+    return _get_or_create("retriever", lambda: Retriever(
+        embedder=get_embedder(),
+        vectorstore=get_vectorstore(),
+        lexical_store=get_lexical_store(),
+        mode=os.getenv("RETRIEVAL_MODE", "dense"),
+        reranker=reranker,
+        overfetch=int(os.getenv("RERANK_OVERFETCH", "4"))
+    ))
+
+
+def get_anthropic() -> Anthropic:
+    """Shared Anthropic client."""
+    return _get_or_create("anthropic", lambda: Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY")))
+
+
+def get_pipeline() -> RAGPipeline:
+    """Shared ingestion pipeline built on the shared embedder and vector store."""
+    def create():
+        pipeline = RAGPipeline(
+            embedder=get_embedder(),
+            vectorstore=get_vectorstore(),
+            lexical_store=get_lexical_store(),
+            retrieval_mode=os.getenv("RETRIEVAL_MODE", "dense")
+        )
+        # Index was already checked by get_vectorstore()
+        pipeline._initialized = True
+        return pipeline
+    return _get_or_create("pipeline", create)
+
+
+def warmup() -> None:
+    """Create all clients and check the index up front.
+
+    Called at API startup and Celery worker process start so the first
+    request doesn't pay for client setup. Failures are logged, not raised -
+    clients are retried lazily on first use.
+    """
+    try:
+        get_anthropic()
+        get_retriever()
+        get_pipeline()
+
+        # Exemplar embeddings load in the background
+        from rag.intent_router import get_intent_router
+        get_intent_router(get_embedder()).warm()
+        print("[Clients] Warmed up API clients")
+    except Exception as e:
+        print(f"[Clients] Warmup failed, clients will be created on first use: {e}")
+
+
+def reset_clients() -> None:
+    """Drop all cached clients (useful for testing)."""
+    global _index_checked
+    with _lock:
+        _clients.clear()
+        _index_checked = False
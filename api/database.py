@@ -2,7 +2,7 @@
 
 import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, String, DateTime, ForeignKey, Text, Enum, Integer
+from sqlalchemy import create_engine, Column, String, DateTime, ForeignKey, Text, Enum, Integer, BigInteger, LargeBinary, Index
 from sqlalchemy.orm import sessionmaker, relationship, declarative_base
 from sqlalchemy.pool import QueuePool
 import enum
@@ -191,6 +191,10 @@ class Thread(Base):
     parent_thread_id = Column(String, ForeignKey("threads.id", ondelete="SET NULL"), nullable=True)
     parent_message_id = Column(String, ForeignKey("messages.id", ondelete="SET NULL"), nullable=True)
     context_text = Column(Text, nullable=True)  # The selected text that spawned this thread
+    # Rolling summary of turns that dropped out of the agent's history window
+    summary = Column(Text, nullable=True)
+    summary_through = Column(DateTime, nullable=True)  # created_at of the last summarized message
+    summary_updated_at = Column(DateTime, nullable=True)
 
     project = relationship("Project", back_populates="threads")
     messages = relationship("Message", back_populates="thread", cascade="all, delete-orphan", foreign_keys="Message.thread_id")
@@ -408,6 +412,78 @@ class Notification(Base):
     job = relationship("ConversationJob", backref="notifications")
 
 
+class ChunkEmbedding(Base):
+    """Content-addressed chunk embedding, reused across reindexes and re-uploads.
+
+    Keyed by embedding model and SHA-256 of the chunk text, so identical
+    chunks from any resource share one stored vector.
+    """
+    __tablename__ = "chunk_embeddings"
+
+    model = Column(String, primary_key=True)
+    content_hash = Column(String(64), primary_key=True)
+    embedding = Column(LargeBinary, nullable=False)  # float32 bytes
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ChunkRecord(Base):
+    """Chunk text and metadata for a vector, kept out of Pinecone metadata.
+
+    Keyed by the vector's namespace and ID. Pinecone only stores the fields
+    needed for filtering; retrieval hydrates matches from this table. The
+    manifest columns (chunk_index, page_ref, char_count) also serve the
+    paginated chunk listing without touching the content.
+    """
+    __tablename__ = "chunk_records"
+    __table_args__ = (
+        # Keyset pagination order for a resource's chunks
+        Index("ix_chunk_records_resource_order", "resource_id", "source", "chunk_index", "vector_id"),
+    )
+
+    namespace = Column(String, primary_key=True)
+    vector_id = Column(String, primary_key=True)
+    resource_id = Column(String, nullable=True, index=True)
+    source = Column(String, nullable=True, index=True)
+    chunk_index = Column(Integer, nullable=True)
+    page_ref = Column(String, nullable=True)
+    char_count = Column(Integer, nullable=True)
+    content = Column(LargeBinary, nullable=False)  # zlib-compressed UTF-8
+    metadata_json = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class UploadSession(Base):
+    """A resumable upload: the file arrives as numbered parts, then is assembled.
+
+    Parts are stored through the storage backend until completion, when they
+    are assembled into the project file and the resource is created.
+    """
+    __tablename__ = "upload_sessions"
+
+    id = Column(String, primary_key=True, default=generate_uuid)
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    project_id = Column(String, ForeignKey("projects.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)  # Total bytes
+    sha256 = Column(String(64), nullable=False)  # Expected hash, verified after assembly
+    mime_type = Column(String, nullable=True)  # Sniffed from the start of part 1
+    part_size = Column(Integer, nullable=False)  # Bytes per part (the last may be shorter)
+    status = Column(String, default="open", nullable=False)  # open, completed, aborted, expired
+    resource_id = Column(String, ForeignKey("resources.id", ondelete="SET NULL"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class UploadPart(Base):
+    """A part received for an upload session."""
+    __tablename__ = "upload_parts"
+
+    session_id = Column(String, ForeignKey("upload_sessions.id", ondelete="CASCADE"), primary_key=True)
+    part_number = Column(Integer, primary_key=True)  # 1-based
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 def init_db():
     """Create all tables and run migrations if needed."""
     # Check if we need to migrate from old schema
@@ -897,6 +973,34 @@ def _run_incremental_migrations():
                     conn.execute(text("ALTER TABLE resources ADD COLUMN chunk_count INTEGER"))
                     print("[Migration] Added chunk_count column to resources")
 
+            # Migration 21: Add chunk manifest columns and pagination index to chunk_records
+            if "chunk_records" in existing_tables:
+                chunk_columns = [col["name"] for col in inspector.get_columns("chunk_records")]
+                if "page_ref" not in chunk_columns:
+                    conn.execute(text("ALTER TABLE chunk_records ADD COLUMN page_ref VARCHAR"))
+                    print("[Migration] Added page_ref column to chunk_records")
+                if "char_count" not in chunk_columns:
+                    conn.execute(text("ALTER TABLE chunk_records ADD COLUMN char_count INTEGER"))
+                    print("[Migration] Added char_count column to chunk_records")
+                conn.execute(text("""
+                    CREATE INDEX IF NOT EXISTS ix_chunk_records_resource_order
+                    ON chunk_records (resource_id, source, chunk_index, vector_id)
+                """))
+
+            # Migration 22: Add rolling conversation summary columns to threads
+            if "threads" in existing_tables:
+                thread_columns = [col["name"] for col in inspector.get_columns("threads")]
+                datetime_type = "TIMESTAMP" if 'postgresql' in str(engine.url) else "DATETIME"
+                if "summary" not in thread_columns:
+                    conn.execute(text("ALTER TABLE threads ADD COLUMN summary TEXT"))
+                    print("[Migration] Added summary column to threads")
+                if "summary_through" not in thread_columns:
+                    conn.execute(text(f"ALTER TABLE threads ADD COLUMN summary_through {datetime_type}"))
+                    print("[Migration] Added summary_through column to threads")
+                if "summary_updated_at" not in thread_columns:
+                    conn.execute(text(f"ALTER TABLE threads ADD COLUMN summary_updated_at {datetime_type}"))
+                    print("[Migration] Added summary_updated_at column to threads")
+
             trans.commit()
         except Exception as e:
             trans.rollback()
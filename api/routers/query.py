@@ -11,10 +11,8 @@ from dotenv import load_dotenv
 from api.database import get_db, Project, Thread, Message, User, Resource, ProjectResource
 from api.schemas import QueryRequest, QueryResponse, SourceInfo, SemanticSearchRequest, SemanticSearchResponse, SemanticSearchResult
 from api.middleware.auth import get_current_user
-from rag.embeddings import Embedder
-from rag.vectorstore import VectorStore
-from rag.retriever import Retriever
 from rag.agent import Agent, ResourceInfo
+from api import clients
 import time
 
 router = APIRouter(tags=["query"])
@@ -58,21 +56,13 @@ def get_agent(version: Optional[str] = None):
     Args:
         version: Agent version to use ("v1" or "v2"). If None, uses default from env/agent.
     """
-    openai_key = os.getenv("OPENAI_API_KEY")
-    pinecone_key = os.getenv("PINECONE_API_KEY")
-    anthropic_key = os.getenv("ANTHROPIC_API_KEY")
-    tavily_key = os.getenv("TAVILY_API_KEY")
-
-    embedder = Embedder(api_key=openai_key)
-    vectorstore = VectorStore(
-        api_key=pinecone_key,
-        index_name=os.getenv("PINECONE_INDEX_NAME", "akleao-research"),
-        dimension=embedder.dimensions
+    # Agents are cheap - the clients they wrap are shared per process
+    return Agent(
+        retriever=clients.get_retriever(),
+        client=clients.get_anthropic(),
+        tavily_api_key=os.getenv("TAVILY_API_KEY"),
+        version=version
     )
-    vectorstore.create_index_if_not_exists()
-    retriever = Retriever(embedder=embedder, vectorstore=vectorstore)
-
-    return Agent(retriever=retriever, api_key=anthropic_key, tavily_api_key=tavily_key, version=version)
 
 
 def _build_resources_list(db: Session, project_id: str) -> list[ResourceInfo]:
@@ -111,6 +101,7 @@ def _build_resources_list(db: Session, project_id: str) -> list[ResourceInfo]:
             summary=r.summary,  # LLM-generated summary (may be None)
             id=r.id,  # Resource ID for targeted searches
             file_path=r.source,  # Path to the file for analysis tools
+            content_hash=r.content_hash,  # Key of the parsed-document artifact
         )
 
         # Add data file metadata if available
@@ -136,15 +127,17 @@ def _build_resources_list(db: Session, project_id: str) -> list[ResourceInfo]:
     return resources
 
 
-def _get_resource_namespaces(db: Session, project_id: str) -> list[str]:
-    """Get unique namespaces from project resources.
+def _get_search_scope(db: Session, project_id: str) -> tuple[list[str], list[str]]:
+    """Get unique namespaces and ready resource IDs from project resources.
 
     Uses explicit query to ensure fresh data from database, avoiding stale
     lazy-loaded relationships.
 
     With the global resource model, each resource has its own namespace
     (resource_id). This handles backward compatibility for old resources
-    that may have been indexed with workspace/project IDs.
+    that may have been indexed with workspace/project IDs. Resources in the
+    shared namespace all map to that one namespace and are scoped by the
+    returned resource IDs instead.
     """
     # Explicitly query resources via ProjectResource join to ensure fresh data
     db_resources = db.query(Resource).join(
@@ -154,6 +147,7 @@ def _get_resource_namespaces(db: Session, project_id: str) -> list[str]:
     ).all()
 
     namespaces = set()
+    resource_ids = []
     for r in db_resources:
         if r.status.value == "ready":  # Only include indexed resources
             if r.pinecone_namespace:
@@ -162,7 +156,8 @@ def _get_resource_namespaces(db: Session, project_id: str) -> list[str]:
             else:
                 # Fallback to resource.id for resources without explicit namespace
                 namespaces.add(r.id)
-    return list(namespaces) if namespaces else []
+            resource_ids.append(r.id)
+    return list(namespaces), resource_ids
 
 
 def _build_parent_context(thread: Thread, db: Session, max_depth: int = 3) -> str | None:
@@ -283,7 +278,7 @@ def query_thread(
     ]
 
     # Get namespaces from project resources
-    namespaces = _get_resource_namespaces(db, project.id)
+    namespaces, resource_ids = _get_search_scope(db, project.id)
 
     # Build parent thread context for subthreads
     parent_context = _build_parent_context(thread, db)
@@ -304,7 +299,8 @@ def query_thread(
         top_k=request.top_k,
         has_documents=has_documents,
         resources=resources,
-        system_instructions=combined_instructions if combined_instructions else None
+        system_instructions=combined_instructions if combined_instructions else None,
+        resource_ids=resource_ids
     )
 
     # Update project's last_thread_id
@@ -386,7 +382,7 @@ def query_thread_stream(
     db.commit()
 
     # Get namespaces from project resources
-    namespaces = _get_resource_namespaces(db, project.id)
+    namespaces, resource_ids = _get_search_scope(db, project.id)
 
     # Build parent thread context for subthreads
     parent_context = _build_parent_context(thread, db)
@@ -435,6 +431,7 @@ def query_thread_stream(
                 save_finding_callback=save_finding_callback,
                 has_data_files=has_data_files,
                 has_images=has_images,
+                resource_ids=resource_ids,
             ):
                 event_q.put(event)
         except Exception as e:
@@ -537,18 +534,8 @@ def query_thread_stream(
 
 
 def get_retriever():
-    """Get retriever instance for semantic search."""
-    openai_key = os.getenv("OPENAI_API_KEY")
-    pinecone_key = os.getenv("PINECONE_API_KEY")
-
-    embedder = Embedder(api_key=openai_key)
-    vectorstore = VectorStore(
-        api_key=pinecone_key,
-        index_name=os.getenv("PINECONE_INDEX_NAME", "akleao-research"),
-        dimension=embedder.dimensions
-    )
-    vectorstore.create_index_if_not_exists()
-    return Retriever(embedder=embedder, vectorstore=vectorstore)
+    """Get the shared retriever instance for semantic search."""
+    return clients.get_retriever()
 
 
 @router.post("/projects/{project_id}/search", response_model=SemanticSearchResponse)
@@ -568,7 +555,7 @@ def semantic_search(
         raise HTTPException(status_code=404, detail="Project not found")
 
     # Get namespaces from project resources
-    namespaces = _get_resource_namespaces(db, project.id)
+    namespaces, resource_ids = _get_search_scope(db, project.id)
 
     if not namespaces:
         return SemanticSearchResponse(results=[], query=request.query)
@@ -578,7 +565,8 @@ def semantic_search(
     results = retriever.retrieve(
         query=request.query,
         top_k=request.top_k,
-        namespaces=namespaces
+        namespaces=namespaces,
+        resource_ids=resource_ids
     )
 
     # Convert to response format
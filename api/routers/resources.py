@@ -1,22 +1,26 @@
 """Resource API routes."""
 
 import os
+import base64
+import json
+import itertools
 import shutil
 import subprocess
 from pathlib import Path
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Response
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks, Response
 from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from api.database import get_db, Project, Resource, ResourceType, ResourceStatus, ProjectResource, DataResourceMetadata, ImageResourceMetadata, User
 from api.middleware.auth import get_current_user
-from api.schemas import ResourceResponse, UrlResourceCreate, GitRepoResourceCreate, TextResourceCreate, ResourceLinkRequest, GlobalResourceResponse, DataFileMetadata, ImageMetadata
+from api.schemas import ResourceResponse, UrlResourceCreate, GitRepoResourceCreate, TextResourceCreate, ResourceLinkRequest, GlobalResourceResponse, DataFileMetadata, ImageMetadata, UploadPreflightRequest, UploadPreflightResponse
 from api.utils.hashing import compute_content_hash, compute_url_hash, compute_git_hash
 from api.utils.file_types import detect_file_category, get_resource_type, is_allowed_extension, FileCategory, format_allowed_extensions
 from api.storage import get_storage
 from api.routers.query import invalidate_resource_cache
-from rag import RAGPipeline
+from api import clients
 
 router = APIRouter(prefix="/projects/{project_id}/resources", tags=["resources"])
 
@@ -32,10 +36,12 @@ GIT_CLONE_DIR.mkdir(exist_ok=True)
 
 
 def get_pipeline():
-    """Get RAG pipeline instance."""
-    pipeline = RAGPipeline()
-    pipeline.initialize()
-    return pipeline
+    """Get the shared RAG pipeline instance.
+
+    The pipeline's embedder caches chunk embeddings by content hash, so
+    reindexing unchanged text is free.
+    """
+    return clients.get_pipeline()
 
 
 def resource_to_response(resource: Resource) -> ResourceResponse:
@@ -94,16 +100,38 @@ def resource_to_response(resource: Resource) -> ResourceResponse:
     )
 
 
+def _set_namespace(vectorstore, resource: Resource, namespace: str) -> None:
+    """Record the namespace a resource was just indexed into.
+
+    Re-indexing after a VECTOR_LAYOUT change moves the resource to a new
+    namespace; its vectors and chunk records in the old one are deleted
+    here. Legacy namespaces shared with other resources are left alone.
+    """
+    from rag.vectorstore import SHARED_NAMESPACE
+
+    previous = resource.pinecone_namespace
+    if previous and previous != namespace and previous in (resource.id, SHARED_NAMESPACE):
+        try:
+            vectorstore.delete_resource(resource.id, previous)
+            print(f"[Index] Deleted vectors for {resource.id} left in namespace '{previous}'")
+        except Exception as e:
+            print(f"[Index] Failed to delete vectors for {resource.id} in namespace '{previous}': {e}")
+    resource.pinecone_namespace = namespace
+
+
 def index_document(resource_id: str, file_path: str):
     """Background task to index a document.
 
     Now uses resource_id as Pinecone namespace for global resource sharing.
-    Downloads file from storage (GCS or local) to a temp file for processing.
+    Reuses the stored parsed-document artifact when there is one, so only
+    chunking and embedding run; otherwise parses a local copy of the file
+    from storage (GCS or local).
     """
     from api.database import SessionLocal
+    from api.utils.parsed_documents import load_parsed_document, get_or_parse_document
+    from contextlib import ExitStack
     from datetime import datetime
     import time
-    import tempfile
 
     db = SessionLocal()
     try:
@@ -116,24 +144,33 @@ def index_document(resource_id: str, file_path: str):
 
         start_time = time.time()
         try:
-            # Download file from storage to temp location
-            storage = get_storage()
-            file_content = storage.read(file_path)
-
-            # Get file extension for temp file
-            ext = Path(file_path).suffix
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-                tmp.write(file_content)
-                local_path = tmp.name
+            local_path = None
+            document = load_parsed_document(resource.content_hash)
+
+            # Temp download (GCS) removed on exit; local files are used in place
+            with ExitStack() as local_files:
+                if document is None:
+                    local_path = local_files.enter_context(get_storage().local_copy(file_path))
+                    try:
+                        document = get_or_parse_document(
+                            resource.content_hash or compute_content_hash(file_path=local_path),
+                            local_path
+                        )
+                    except ValueError:
+                        # A type the document loader doesn't parse - ingest reports it
+                        document = None
+                else:
+                    print(f"[index_document] Reusing parsed document for {resource_id}")
 
-            try:
                 pipeline = get_pipeline()
-                # Use resource_id as Pinecone namespace for global resource sharing
+                # Per-resource namespace, or the shared namespace (VECTOR_LAYOUT)
+                namespace = pipeline.vectorstore.namespace_for(resource_id)
                 result = pipeline.ingest(
                     local_path,
-                    namespace=resource_id,  # Changed from project_id to resource_id
+                    namespace=namespace,
                     resource_id=resource_id,
-                    generate_summary=True
+                    generate_summary=True,
+                    documents=[document] if document is not None else None
                 )
 
                 # Calculate duration and record timing
@@ -141,16 +178,11 @@ def index_document(resource_id: str, file_path: str):
                 resource.status = ResourceStatus.READY
                 resource.indexed_at = datetime.utcnow()
                 resource.indexing_duration_ms = duration_ms
-                resource.pinecone_namespace = resource_id  # Track namespace (now resource-based)
+                _set_namespace(pipeline.vectorstore, resource, namespace)
                 # Save the generated summary
                 if result.get("summary"):
                     resource.summary = result["summary"]
                 db.commit()
-            finally:
-                # Clean up temp file
-                import os as temp_os
-                if temp_os.path.exists(local_path):
-                    temp_os.remove(local_path)
         except Exception as e:
             resource.status = ResourceStatus.FAILED
             resource.error_message = str(e)
@@ -498,11 +530,96 @@ def _link_resource_to_project(db: Session, resource: Resource, project_id: str):
         db.commit()
 
 
+def _find_user_resource_by_hash(db: Session, content_hash: str, user: User) -> Resource | None:
+    """A resource with this content that is already linked to one of the user's projects.
+
+    Used where the client only declares a hash. Matching resources the user
+    can't already reach would let anyone who knows a file's hash read it.
+    """
+    return db.query(Resource).join(
+        ProjectResource, ProjectResource.resource_id == Resource.id
+    ).join(
+        Project, Project.id == ProjectResource.project_id
+    ).filter(
+        Resource.content_hash == content_hash,
+        Project.user_id == user.id
+    ).first()
+
+
+# Statuses of a resource that can be linked instead of re-uploaded
+READY_STATUSES = (
+    ResourceStatus.READY,
+    ResourceStatus.INDEXED,
+    ResourceStatus.ANALYZED,
+    ResourceStatus.DESCRIBED
+)
+
+# Statuses of a resource whose processing hasn't finished yet
+IN_PROGRESS_STATUSES = (
+    ResourceStatus.PENDING,
+    ResourceStatus.UPLOADED,
+    ResourceStatus.EXTRACTING,
+    ResourceStatus.EXTRACTED,
+    ResourceStatus.INDEXING
+)
+
+
+@router.post("/preflight", response_model=UploadPreflightResponse)
+def preflight_upload(
+    project_id: str,
+    request: UploadPreflightRequest,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Check a file's hash before uploading it.
+
+    If one of the user's projects already has a processed resource with the
+    same content it is linked to this project and no upload is needed.
+    Otherwise returns an upload token to pass to the upload endpoint with
+    the file; files other users have uploaded are deduplicated there, once
+    the received bytes' hash has been checked.
+    """
+    from api.auth import create_upload_token
+    from api.utils.uploads import MAX_UPLOAD_BYTES
+
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == user.id
+    ).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    if not is_allowed_extension(request.filename):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed: {format_allowed_extensions()}"
+        )
+    sha256 = request.sha256.lower()
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        raise HTTPException(status_code=400, detail="sha256 must be a hex SHA-256 digest")
+    if request.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_UPLOAD_BYTES / (1024 * 1024):.0f} MB upload limit")
+
+    existing_resource = _find_user_resource_by_hash(db, sha256, user)
+    if existing_resource and existing_resource.status in READY_STATUSES:
+        # The user already has this file - link it, nothing to transfer
+        _link_resource_to_project(db, existing_resource, project_id)
+        db.refresh(existing_resource)
+        invalidate_resource_cache(project_id)
+        return UploadPreflightResponse(status="linked", resource=resource_to_response(existing_resource))
+
+    return UploadPreflightResponse(
+        status="upload_required",
+        upload_token=create_upload_token(user.id, project_id, sha256, request.size)
+    )
+
+
 @router.post("", response_model=ResourceResponse)
 async def add_resource(
     project_id: str,
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    upload_token: str | None = Form(None),
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
@@ -520,8 +637,11 @@ async def add_resource(
     - Documents (PDF, DOCX, MD, TXT): RAG indexed for semantic search
     - Data files (CSV, Excel, JSON): Schema extraction for analysis
     - Images (PNG, JPG, etc.): Vision description for visual analysis
+
+    upload_token (from /preflight) is optional; when given, the file must
+    match the hash it was issued for.
     """
-    from api.utils.extraction import detect_mime_type
+    from api.utils.uploads import stream_upload
 
     # Verify project exists and belongs to user
     project = db.query(Project).filter(
@@ -538,42 +658,49 @@ async def add_resource(
             detail=f"Unsupported file type. Allowed: {format_allowed_extensions()}"
         )
 
-    # === STAGE 1: Universal Metadata (synchronous) ===
+    token_payload = None
+    if upload_token:
+        from api.auth import decode_upload_token
+        import jwt
+        try:
+            token_payload = decode_upload_token(upload_token)
+        except jwt.InvalidTokenError:
+            raise HTTPException(status_code=401, detail="Invalid or expired upload token")
+        if token_payload["sub"] != user.id or token_payload["project_id"] != project_id:
+            raise HTTPException(status_code=403, detail="Upload token was issued for another project")
 
-    # Read file content
-    file_content = await file.read()
-    file_size = len(file_content)
+    # === STAGE 1: Universal Metadata (synchronous) ===
 
-    # Detect MIME type and file category
-    mime_type = detect_mime_type(file_content, file.filename)
+    # Stream the file into storage, hashing and sniffing the MIME type on the way
+    storage = get_storage()
+    upload = await stream_upload(file, storage, project_id, file.filename)
+    if token_payload and upload.content_hash != token_payload["sha256"]:
+        await run_in_threadpool(upload.discard)
+        raise HTTPException(status_code=400, detail="File does not match the hash sent to preflight")
+    file_size = upload.size
+    mime_type = upload.mime_type
+    content_hash = upload.content_hash
+
+    # Detect file category
     file_category = detect_file_category(file.filename)
     resource_type = get_resource_type(file.filename, file_category)
 
-    # Compute content hash for deduplication
-    content_hash = compute_content_hash(content=file_content)
-
     # Check if resource with same hash already exists and is fully processed
     existing_resource = db.query(Resource).filter(
         Resource.content_hash == content_hash
     ).first()
 
-    ready_statuses = (
-        ResourceStatus.READY,
-        ResourceStatus.INDEXED,
-        ResourceStatus.ANALYZED,
-        ResourceStatus.DESCRIBED
-    )
-    if existing_resource and existing_resource.status in ready_statuses:
+    if existing_resource and existing_resource.status in READY_STATUSES:
         # Resource already exists and is indexed - just link to this project
+        await run_in_threadpool(upload.discard)
         _link_resource_to_project(db, existing_resource, project_id)
         db.refresh(existing_resource)
         # V4: Invalidate resource cache since project now has new resource
         invalidate_resource_cache(project_id)
         return existing_resource
 
-    # Save uploaded file using storage abstraction
-    storage = get_storage()
-    file_path = storage.save(project_id, file.filename, file_content)
+    # Move the staged upload to its final storage path
+    file_path = await run_in_threadpool(upload.commit)
 
     # Create resource record with Stage 1 metadata
     # Status = UPLOADED means file is saved and visible, but not yet processed
@@ -628,13 +755,15 @@ def process_resource(resource_id: str, file_path: str, file_category: str):
         extract_image_metadata,
         is_extraction_successful
     )
+    from api.utils.parsed_documents import get_or_parse_document, parsed_document_metadata
     from datetime import datetime
+    from contextlib import ExitStack
     import time
     import json
-    import tempfile
     import traceback
 
     db = SessionLocal()
+    local_files = ExitStack()
     try:
         resource = db.query(Resource).filter(Resource.id == resource_id).first()
         if not resource:
@@ -647,21 +776,29 @@ def process_resource(resource_id: str, file_path: str, file_category: str):
 
         extraction_start = time.time()
         local_path = None
+        parsed_doc = None
 
         try:
-            # Download file from storage to temp location
+            # Local file to work on: the stored file itself for local storage,
+            # a streamed temp download otherwise (removed when processing ends)
             storage = get_storage()
-            file_content = storage.read(file_path)
-
-            # Get file extension for temp file
-            ext = Path(file_path).suffix
-            with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-                tmp.write(file_content)
-                local_path = tmp.name
+            local_path = local_files.enter_context(storage.local_copy(file_path))
 
             # Extract type-specific metadata
             if file_category == "rag":
-                extraction_meta = extract_document_metadata(local_path)
+                # Parse once; the artifact is reused for indexing, reindexing and reading
+                try:
+                    parsed_doc = get_or_parse_document(
+                        resource.content_hash or compute_content_hash(file_path=local_path),
+                        local_path
+                    )
+                except ValueError:
+                    # A type the document loader doesn't parse
+                    parsed_doc = None
+                if parsed_doc is not None:
+                    extraction_meta = parsed_document_metadata(parsed_doc, local_path)
+                else:
+                    extraction_meta = extract_document_metadata(local_path)
             elif file_category == "data":
                 extraction_meta = extract_data_metadata(local_path)
             elif file_category == "image":
@@ -710,7 +847,7 @@ def process_resource(resource_id: str, file_path: str, file_category: str):
         try:
             if file_category == "rag":
                 # Full RAG indexing with Pinecone
-                result = _enrich_document(resource_id, local_path, db, resource)
+                result = _enrich_document(resource_id, local_path, db, resource, document=parsed_doc)
                 resource.status = ResourceStatus.INDEXED
 
             elif file_category == "data":
@@ -743,27 +880,27 @@ def process_resource(resource_id: str, file_path: str, file_category: str):
             resource.error_stage = "indexing"
             db.commit()
 
-        finally:
-            # Clean up temp file
-            if local_path:
-                import os as temp_os
-                if temp_os.path.exists(local_path):
-                    temp_os.remove(local_path)
-
     finally:
+        # Remove the temp download, if one was made
+        local_files.close()
         db.close()
 
 
-def _enrich_document(resource_id: str, local_path: str, db, resource) -> dict:
-    """Stage 3 enrichment for RAG documents: chunk, embed, index in Pinecone."""
+def _enrich_document(resource_id: str, local_path: str, db, resource, document=None) -> dict:
+    """Stage 3 enrichment for RAG documents: chunk, embed, index in Pinecone.
+
+    document is the Document parsed in Stage 2; without it the file is parsed here.
+    """
     pipeline = get_pipeline()
+    namespace = pipeline.vectorstore.namespace_for(resource_id)
     result = pipeline.ingest(
         local_path,
-        namespace=resource_id,
+        namespace=namespace,
         resource_id=resource_id,
-        generate_summary=True
+        generate_summary=True,
+        documents=[document] if document is not None else None
     )
-    resource.pinecone_namespace = resource_id
+    _set_namespace(pipeline.vectorstore, resource, namespace)
     return {
         "summary": result.get("summary"),
         "chunk_count": result.get("chunks", 0)
@@ -856,10 +993,11 @@ def index_url(resource_id: str, url: str):
         start_time = time.time()
         try:
             pipeline = get_pipeline()
-            # Use resource_id as namespace for global resource sharing
+            # Per-resource namespace, or the shared namespace (VECTOR_LAYOUT)
+            namespace = pipeline.vectorstore.namespace_for(resource_id)
             result = pipeline.ingest_url(
                 url,
-                namespace=resource_id,  # Changed from project_id to resource_id
+                namespace=namespace,
                 resource_id=resource_id,
                 generate_summary=True
             )
@@ -869,7 +1007,7 @@ def index_url(resource_id: str, url: str):
             resource.status = ResourceStatus.READY
             resource.indexed_at = datetime.utcnow()
             resource.indexing_duration_ms = duration_ms
-            resource.pinecone_namespace = resource_id  # Track namespace (now resource-based)
+            _set_namespace(pipeline.vectorstore, resource, namespace)
             # Save the generated summary
             if result.get("summary"):
                 resource.summary = result["summary"]
@@ -914,10 +1052,11 @@ def index_text(resource_id: str, content: str):
 
             try:
                 pipeline = get_pipeline()
-                # Use resource_id as namespace for global resource sharing
+                # Per-resource namespace, or the shared namespace (VECTOR_LAYOUT)
+                namespace = pipeline.vectorstore.namespace_for(resource_id)
                 result = pipeline.ingest(
                     local_path,
-                    namespace=resource_id,
+                    namespace=namespace,
                     resource_id=resource_id,
                     generate_summary=True
                 )
@@ -927,7 +1066,7 @@ def index_text(resource_id: str, content: str):
                 resource.status = ResourceStatus.READY
                 resource.indexed_at = datetime.utcnow()
                 resource.indexing_duration_ms = duration_ms
-                resource.pinecone_namespace = resource_id
+                _set_namespace(pipeline.vectorstore, resource, namespace)
                 # Save the generated summary
                 if result.get("summary"):
                     resource.summary = result["summary"]
@@ -947,12 +1086,19 @@ def index_text(resource_id: str, content: str):
         db.close()
 
 
-def index_git_repository(resource_id: str, repo_url: str, branch: str | None):
-    """Background task to clone and index a git repository.
+def index_git_repository(resource_id: str, repo_url: str, branch: str | None, full: bool = True):
+    """Background task to fetch and index a git repository.
 
     Now uses resource_id as Pinecone namespace for global resource sharing.
+    The repository is kept in a cached bare mirror. With full=False and a
+    previously indexed commit, only files changed since that commit are
+    re-chunked and re-embedded, and vectors of deleted files are removed;
+    otherwise the whole tree is indexed.
     """
     from api.database import SessionLocal
+    from api.services import git_mirror
+    from api.services.chunk_store import DatabaseChunkStore
+    from rag.vectorstore import SHARED_NAMESPACE
     from datetime import datetime
     import time
     import traceback
@@ -963,63 +1109,95 @@ def index_git_repository(resource_id: str, repo_url: str, branch: str | None):
         if not resource:
             return
 
+        previous_commit = resource.commit_hash
+        previous_namespace = resource.pinecone_namespace
         resource.status = ResourceStatus.INDEXING
         db.commit()
 
         start_time = time.time()
 
-        # Create resource-specific clone directory (using resource_id)
-        clone_dir = GIT_CLONE_DIR / resource_id
-        clone_dir.parent.mkdir(parents=True, exist_ok=True)
+        # Files to index are exported from the mirror into a resource-specific directory
+        work_dir = GIT_CLONE_DIR / resource_id
+        shutil.rmtree(work_dir, ignore_errors=True)
 
         try:
-            # Clone the repository (shallow clone for speed)
-            clone_cmd = ["git", "clone", "--depth", "1"]
-            if branch:
-                clone_cmd.extend(["--branch", branch])
-            clone_cmd.extend([repo_url, str(clone_dir)])
-
-            print(f"[Git] Cloning repository: {repo_url}")
-            result = subprocess.run(
-                clone_cmd,
-                check=True,
-                capture_output=True,
-                timeout=300  # 5 minute timeout for clone
-            )
-
-            # Get commit hash
-            hash_result = subprocess.run(
-                ["git", "rev-parse", "HEAD"],
-                cwd=clone_dir,
-                capture_output=True,
-                text=True
-            )
-            commit_hash = hash_result.stdout.strip()[:12]  # Short hash
-            print(f"[Git] Cloned at commit: {commit_hash}")
+            if full:
+                # A full reindex also rebuilds the mirror
+                shutil.rmtree(git_mirror.mirror_path(resource_id), ignore_errors=True)
+            mirror, head, _ = git_mirror.sync_mirror(resource_id, repo_url, branch)
+            commit_hash = head[:12]  # Short hash
+            print(f"[Git] Fetched at commit: {commit_hash}")
 
-            # Load documents from repo with GitHub URL info
             pipeline = get_pipeline()
             loader = pipeline.loader
-            documents = loader.load_git_repository(
-                str(clone_dir),
-                repo_url=repo_url,
-                commit_hash=commit_hash
+            # Per-resource or shared namespace (VECTOR_LAYOUT)
+            namespace = pipeline.vectorstore.namespace_for(resource_id)
+
+            # Incremental sync needs the old commit and a chunk manifest to find old vectors by file
+            incremental = (
+                not full
+                and previous_commit
+                and previous_namespace == namespace
+                and git_mirror.has_commit(mirror, previous_commit)
+                and DatabaseChunkStore().count(namespace, resource_id) > 0
             )
-            print(f"[Git] Found {len(documents)} indexable files")
-
-            if not documents:
-                resource.status = ResourceStatus.FAILED
-                resource.error_message = "No indexable files found in repository"
-                db.commit()
-                return
 
-            # Ingest all documents - use resource_id as namespace
-            ingest_result = pipeline.ingest_documents(
-                documents,
-                namespace=resource_id,  # Changed from project_id to resource_id
-                resource_id=resource_id,
-                generate_summary=True
-            )
+            changes = git_mirror.diff_commits(mirror, previous_commit, head) if incremental else None
+            if changes is not None and changes.gitignore_changed:
+                print("[Git] .gitignore changed, reindexing the whole tree")
+                incremental = False
+
+            if incremental:
+                print(f"[Git] Incremental sync {previous_commit}..{commit_hash}: "
+                      f"{len(changes.changed)} changed, {len(changes.removed)} removed")
+                # The loader needs every .gitignore to skip ignored changed files
+                git_mirror.export_tree(
+                    mirror, head, work_dir,
+                    paths=sorted(set(changes.changed) | set(git_mirror.gitignore_paths(mirror, head)))
+                )
+                documents = loader.iter_git_repository(
+                    str(work_dir),
+                    repo_url=repo_url,
+                    commit_hash=commit_hash
+                )
+                ingest_result = pipeline.sync_documents(
+                    documents,
+                    changes.stale,
+                    namespace=namespace,
+                    resource_id=resource_id
+                )
+            else:
+                # Load documents from repo with GitHub URL info
+                git_mirror.export_tree(mirror, head, work_dir)
+                # Files are read lazily and stream straight into chunking
+                documents = loader.iter_git_repository(
+                    str(work_dir),
+                    repo_url=repo_url,
+                    commit_hash=commit_hash
+                )
+                first_document = next(documents, None)
+
+                if first_document is None:
+                    resource.status = ResourceStatus.FAILED
+                    resource.error_message = "No indexable files found in repository"
+                    db.commit()
+                    return
+
+                # The previous index stays searchable until the new one is in;
+                # vectors of files that no longer exist are deleted afterwards
+                ingest_result = pipeline.ingest_documents(
+                    itertools.chain([first_document], documents),
+                    namespace=namespace,
+                    resource_id=resource_id,
+                    generate_summary=True,
+                    replace=True
+                )
+                if previous_namespace and previous_namespace != namespace:
+                    if previous_namespace in (resource_id, SHARED_NAMESPACE):
+                        pipeline.vectorstore.delete_resource(resource_id, previous_namespace)
+                    else:
+                        # Legacy namespace shared with other resources
+                        pipeline.vectorstore.delete_resource_vectors(resource_id, previous_namespace)
 
             # Update resource
             duration_ms = int((time.time() - start_time) * 1000)
@@ -1027,22 +1205,22 @@ def index_git_repository(resource_id: str, repo_url: str, branch: str | None):
             resource.indexed_at = datetime.utcnow()
             resource.indexing_duration_ms = duration_ms
             resource.commit_hash = commit_hash
-            resource.pinecone_namespace = resource_id  # Track namespace (now resource-based)
+            resource.pinecone_namespace = namespace  # Track namespace
             if ingest_result.get("summary"):
                 resource.summary = ingest_result["summary"]
             db.commit()
             print(f"[Git] Indexing complete: {ingest_result['documents']} files, {ingest_result['chunks']} chunks")
 
         except subprocess.CalledProcessError as e:
-            error_msg = e.stderr.decode() if e.stderr else str(e)
-            print(f"[Git] Clone failed: {error_msg}")
+            error_msg = e.stderr.decode() if isinstance(e.stderr, bytes) else (e.stderr or str(e))
+            print(f"[Git] Fetch failed: {error_msg}")
             resource.status = ResourceStatus.FAILED
-            resource.error_message = f"Git clone failed: {error_msg}"
+            resource.error_message = f"Git fetch failed: {error_msg}"
             db.commit()
         except subprocess.TimeoutExpired:
-            print(f"[Git] Clone timed out for {repo_url}")
+            print(f"[Git] Fetch timed out for {repo_url}")
             resource.status = ResourceStatus.FAILED
-            resource.error_message = "Git clone timed out (5 minute limit)"
+            resource.error_message = "Git fetch timed out (5 minute limit)"
             db.commit()
         except Exception as e:
             print(f"[Git] Error indexing repository: {e}")
@@ -1051,10 +1229,10 @@ def index_git_repository(resource_id: str, repo_url: str, branch: str | None):
             resource.error_message = str(e)
             db.commit()
         finally:
-            # Clean up cloned repo to save disk space
-            if clone_dir.exists():
-                shutil.rmtree(clone_dir, ignore_errors=True)
-                print(f"[Git] Cleaned up clone directory")
+            # Clean up exported files to save disk space (the mirror is kept)
+            if work_dir.exists():
+                shutil.rmtree(work_dir, ignore_errors=True)
+                print(f"[Git] Cleaned up work directory")
     finally:
         db.close()
 
@@ -1457,10 +1635,15 @@ async def reindex_resource(
     project_id: str,
     resource_id: str,
     background_tasks: BackgroundTasks,
+    full: bool = False,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    """Reindex a resource."""
+    """Reindex a resource.
+
+    Git repositories are synced incrementally (only files changed since the
+    indexed commit) unless full=true.
+    """
     # Verify project exists and belongs to user
     project = db.query(Project).filter(
         Project.id == project_id,
@@ -1479,13 +1662,16 @@ async def reindex_resource(
         raise HTTPException(status_code=404, detail="Resource not found in this project")
 
     resource = link.resource
+    incremental_git = resource.type == ResourceType.GIT_REPOSITORY and not full
 
     # Reset status and clear previous indexing stats
     resource.status = ResourceStatus.PENDING
     resource.indexed_at = None
     resource.indexing_duration_ms = None
     resource.error_message = None
-    resource.summary = None
+    if not incremental_git:
+        # An incremental sync keeps the existing summary
+        resource.summary = None
     db.commit()
     db.refresh(resource)
 
@@ -1523,15 +1709,14 @@ async def reindex_resource(
         # For websites, re-fetch from the URL
         background_tasks.add_task(index_url, resource.id, resource.source)
     elif resource.type == ResourceType.GIT_REPOSITORY:
-        # For git repos, re-clone and re-index (use default branch on reindex)
-        resource.commit_hash = None  # Clear old commit hash
-        db.commit()
-        db.refresh(resource)
+        # For git repos, fetch and re-index the changes since resource.commit_hash
+        # (branch None: the branch the mirror was cloned for)
         background_tasks.add_task(
             index_git_repository,
             resource.id,
             resource.source,  # URL
-            None  # Use default branch on reindex
+            None,
+            full
         )
     elif resource.type == ResourceType.TEXT:
         # Text resources don't store the original content, so reindexing is not supported
@@ -1683,24 +1868,37 @@ def link_resource_to_project(
     return resource_to_response(resource)
 
 
+def _encode_chunk_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def _decode_chunk_cursor(cursor: str) -> tuple:
+    try:
+        source, chunk_index, vector_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return source, chunk_index, vector_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @global_router.get("/{resource_id}/chunks")
 def get_resource_chunks(
     resource_id: str,
-    limit: int = 500,
+    limit: int = 100,
+    cursor: str = None,
+    include_content: bool = True,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
     """Get the RAG chunks for a specific resource.
 
     Returns the chunks that were created during indexing, useful for debugging
-    how documents are being parsed and split.
+    how documents are being parsed and split. Chunks are served a page at a
+    time from the chunk manifest in the database; pass next_cursor back as
+    cursor for the next page. Resources indexed before the manifest existed
+    fall back to listing their vectors (first page only).
     """
-    import os
-    from dotenv import load_dotenv
-    from rag.embeddings import Embedder
-    from rag.vectorstore import VectorStore
-
-    load_dotenv()
+    from rag.vectorstore import SHARED_NAMESPACE
+    from api.services.chunk_store import DatabaseChunkStore
 
     # Verify resource exists
     resource = db.query(Resource).filter(Resource.id == resource_id).first()
@@ -1715,17 +1913,42 @@ def get_resource_chunks(
 
     # Get the namespace (resource_id based)
     namespace = resource.pinecone_namespace or resource_id
+    limit = max(1, min(limit, 500))
+
+    chunk_store = DatabaseChunkStore()
+    total = chunk_store.count(namespace, resource_id)
+    if total:
+        chunks, last_key = chunk_store.list_page(
+            namespace,
+            resource_id,
+            limit=limit,
+            after=_decode_chunk_cursor(cursor) if cursor else None,
+            include_content=include_content
+        )
+        return {
+            "resource_id": resource_id,
+            "namespace": namespace,
+            "total_chunks": total,
+            "chunks": chunks,
+            "next_cursor": _encode_chunk_cursor(last_key) if last_key else None
+        }
 
-    # Initialize vectorstore and fetch chunks
-    openai_key = os.getenv("OPENAI_API_KEY")
-    pinecone_key = os.getenv("PINECONE_API_KEY")
+    # Legacy resource without a manifest - scan its vectors
+    if cursor:
+        return {"resource_id": resource_id, "namespace": namespace, "total_chunks": 0, "chunks": [], "next_cursor": None}
 
-    embedder = Embedder(api_key=openai_key)
-    vectorstore = VectorStore(
-        api_key=pinecone_key,
-        index_name=os.getenv("PINECONE_INDEX_NAME", "akleao-research"),
-        dimension=embedder.dimensions
-    )
+    vectorstore = clients.get_vectorstore()
+
+    if namespace == SHARED_NAMESPACE:
+        # Shared namespace - the resource's vectors are keyed by ID prefix
+        chunks = vectorstore.list_vectors(namespace=namespace, limit=limit, prefix=f"{resource_id}#")
+        return {
+            "resource_id": resource_id,
+            "namespace": namespace,
+            "total_chunks": len(chunks),
+            "chunks": chunks,
+            "next_cursor": None
+        }
 
     chunks = vectorstore.list_vectors(namespace=namespace, limit=limit * 10)  # Fetch more to account for filtering
 
@@ -1745,7 +1968,8 @@ def get_resource_chunks(
         "resource_id": resource_id,
         "namespace": namespace,
         "total_chunks": len(filtered_chunks),
-        "chunks": filtered_chunks
+        "chunks": filtered_chunks,
+        "next_cursor": None
     }
 
 
@@ -1768,8 +1992,26 @@ def delete_global_resource(
     if resource.source:
         storage = get_storage()
         storage.delete(resource.source)
-
-    # TODO: Delete vectors from Pinecone for this resource
+    from api.utils.parsed_documents import delete_parsed_document
+    delete_parsed_document(resource.content_hash)
+
+    # Delete the resource's vectors and chunk records - chunk_records has no
+    # foreign key to resources, so nothing cascades
+    if resource.pinecone_namespace:
+        from rag.vectorstore import SHARED_NAMESPACE
+        vectorstore = clients.get_vectorstore()
+        try:
+            if resource.pinecone_namespace in (resource_id, SHARED_NAMESPACE):
+                vectorstore.delete_resource(resource_id, resource.pinecone_namespace)
+            else:
+                # Legacy namespace shared with other resources - only this one's vectors
+                vectorstore.delete_resource_vectors(resource_id, resource.pinecone_namespace)
+        except Exception as e:
+            print(f"[Resources] Failed to delete vectors for {resource_id}: {e}")
+    clients.get_lexical_store().delete(resource_id)
+    if resource.type == ResourceType.GIT_REPOSITORY:
+        from api.services.git_mirror import mirror_path
+        shutil.rmtree(mirror_path(resource_id), ignore_errors=True)
 
     # Delete resource (cascade will delete ProjectResource links)
     db.delete(resource)
@@ -0,0 +1,412 @@
+"""Resumable upload endpoints.
+
+Protocol:
+1. POST   /projects/{project_id}/resources/uploads                       -> session (or linked resource)
+2. PUT    /projects/{project_id}/resources/uploads/{id}/parts/{n}         raw bytes of part n (1-based)
+3. GET    /projects/{project_id}/resources/uploads/{id}                   received parts, to resume
+4. POST   /projects/{project_id}/resources/uploads/{id}/complete          -> resource (processing in background)
+   DELETE /projects/{project_id}/resources/uploads/{id}                   abort
+
+Each part is a short request, so a dropped connection only costs the part
+in flight and no request holds a worker for the whole file. Parts are kept
+through the storage backend; completion assembles them (GCS compose, or
+concatenated part files locally), verifies the SHA-256 and hands the file
+to process_resource.
+
+Sessions left open longer than UPLOAD_SESSION_TTL_HOURS expire: they are
+marked expired when read, and cleanup_expired_uploads (run in the
+background as new uploads start) deletes old sessions and their parts.
+"""
+
+import math
+import os
+import time
+from datetime import datetime, timedelta
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from api.database import get_db, SessionLocal, Project, Resource, ResourceStatus, UploadSession, UploadPart, User
+from api.middleware.auth import get_current_user
+from api.schemas import ResourceResponse, UploadSessionCreate, UploadSessionResponse
+from api.storage import get_storage
+from api.utils.file_types import detect_file_category, get_resource_type, is_allowed_extension, format_allowed_extensions
+from api.routers.query import invalidate_resource_cache
+from api.routers.resources import (
+    READY_STATUSES, IN_PROGRESS_STATUSES, process_resource, resource_to_response,
+    _link_resource_to_project, _find_user_resource_by_hash
+)
+
+router = APIRouter(prefix="/projects/{project_id}/resources/uploads", tags=["resources"])
+
+# Bytes per part (the last part may be shorter)
+UPLOAD_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE", str(8 * 1024 * 1024)))
+
+# Hours an upload may stay open before it expires and its parts are deleted
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+
+# Seconds between cleanup runs in one process
+_CLEANUP_INTERVAL = 600
+_last_cleanup = 0.0
+
+
+def _get_project(db: Session, project_id: str, user: User) -> Project:
+    project = db.query(Project).filter(
+        Project.id == project_id,
+        Project.user_id == user.id
+    ).first()
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+
+def _get_session(db: Session, project_id: str, upload_id: str, user: User) -> UploadSession:
+    session = db.query(UploadSession).filter(
+        UploadSession.id == upload_id,
+        UploadSession.project_id == project_id,
+        UploadSession.user_id == user.id
+    ).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if session.status == "open" and _is_expired(session):
+        session.status = "expired"
+        db.commit()
+        get_storage().delete_parts(session.id)
+    return session
+
+
+def _is_expired(session: UploadSession) -> bool:
+    return session.created_at < datetime.utcnow() - timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+
+
+def _check_not_in_progress(db: Session, sha256: str) -> None:
+    """409 if a resource with this content is still being processed."""
+    existing_resource = db.query(Resource).filter(Resource.content_hash == sha256).first()
+    if existing_resource and existing_resource.status in IN_PROGRESS_STATUSES:
+        raise HTTPException(status_code=409, detail="A resource with this content is already being processed")
+
+
+def _part_count(session: UploadSession) -> int:
+    return max(1, math.ceil(session.size / session.part_size))
+
+
+def _session_response(db: Session, session: UploadSession) -> UploadSessionResponse:
+    received = [n for (n,) in db.query(UploadPart.part_number).filter(
+        UploadPart.session_id == session.id
+    ).order_by(UploadPart.part_number)]
+    resource = None
+    if session.resource_id:
+        resource = db.query(Resource).filter(Resource.id == session.resource_id).first()
+    return UploadSessionResponse(
+        upload_id=session.id,
+        status=session.status,
+        part_size=session.part_size,
+        part_count=_part_count(session),
+        received_parts=received,
+        resource=resource_to_response(resource) if resource else None
+    )
+
+
+@router.post("", response_model=UploadSessionResponse)
+def create_upload(
+    project_id: str,
+    request: UploadSessionCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Start a resumable upload, or link the file if the user already has it.
+
+    Only the user's own resources are matched here - the hash is just the
+    client's claim. Files other users uploaded are deduplicated once the
+    assembled file's hash has been checked (finalize_upload). A file that is
+    still being processed is refused before any part is sent.
+    """
+    from api.utils.uploads import MAX_UPLOAD_BYTES
+
+    _get_project(db, project_id, user)
+    if not is_allowed_extension(request.filename):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file type. Allowed: {format_allowed_extensions()}"
+        )
+    sha256 = request.sha256.lower()
+    if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+        raise HTTPException(status_code=400, detail="sha256 must be a hex SHA-256 digest")
+    if request.size <= 0 or request.size > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"File size must be between 1 byte and {MAX_UPLOAD_BYTES / (1024 * 1024):.0f} MB")
+
+    existing_resource = _find_user_resource_by_hash(db, sha256, user)
+    if existing_resource and existing_resource.status in READY_STATUSES:
+        # The user already has this file - link it, nothing to transfer
+        _link_resource_to_project(db, existing_resource, project_id)
+        db.refresh(existing_resource)
+        invalidate_resource_cache(project_id)
+        return UploadSessionResponse(status="linked", resource=resource_to_response(existing_resource))
+    _check_not_in_progress(db, sha256)
+
+    session = UploadSession(
+        user_id=user.id,
+        project_id=project_id,
+        filename=request.filename,
+        size=request.size,
+        sha256=sha256,
+        part_size=UPLOAD_PART_SIZE
+    )
+    db.add(session)
+    db.commit()
+    db.refresh(session)
+
+    global _last_cleanup
+    if time.monotonic() - _last_cleanup > _CLEANUP_INTERVAL:
+        _last_cleanup = time.monotonic()
+        background_tasks.add_task(cleanup_expired_uploads)
+    return _session_response(db, session)
+
+
+@router.get("/{upload_id}", response_model=UploadSessionResponse)
+def get_upload(
+    project_id: str,
+    upload_id: str,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Upload state, including which parts have been received."""
+    return _session_response(db, _get_session(db, project_id, upload_id, user))
+
+
+@router.put("/{upload_id}/parts/{part_number}")
+async def upload_part(
+    project_id: str,
+    upload_id: str,
+    part_number: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Store one part (the raw request body). Re-sending a part replaces it."""
+    from api.utils.extraction import detect_mime_type
+    from api.utils.uploads import MIME_SNIFF_BYTES
+
+    session = _get_session(db, project_id, upload_id, user)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload is {session.status}")
+    part_count = _part_count(session)
+    if not 1 <= part_number <= part_count:
+        raise HTTPException(status_code=400, detail=f"Part number must be between 1 and {part_count}")
+    expected_size = min(session.part_size, session.size - (part_number - 1) * session.part_size)
+
+    storage = get_storage()
+    writer = await run_in_threadpool(storage.open_part_writer, upload_id, part_number)
+    head = b""
+    try:
+        async for block in request.stream():
+            if not block:
+                continue
+            if writer.size + len(block) > expected_size:
+                raise HTTPException(status_code=400, detail=f"Part {part_number} must be {expected_size} bytes")
+            if part_number == 1 and len(head) < MIME_SNIFF_BYTES:
+                head += block[:MIME_SNIFF_BYTES - len(head)]
+            await run_in_threadpool(writer.write, block)
+        if writer.size != expected_size:
+            raise HTTPException(status_code=400, detail=f"Part {part_number} must be {expected_size} bytes")
+        await run_in_threadpool(writer.commit)
+    except BaseException:
+        writer.abort()
+        raise
+
+    db.merge(UploadPart(session_id=upload_id, part_number=part_number, size=writer.size, created_at=datetime.utcnow()))
+    if part_number == 1:
+        session.mime_type = detect_mime_type(head, session.filename)
+    db.commit()
+    return {"part_number": part_number, "size": writer.size}
+
+
+@router.post("/{upload_id}/complete", response_model=ResourceResponse)
+def complete_upload(
+    project_id: str,
+    upload_id: str,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Finish an upload once every part is in.
+
+    Creates the resource right away (status UPLOADED); assembling the parts,
+    verifying the hash, deduplicating and processing happen in the
+    background (finalize_upload).
+    """
+    from api.utils.extraction import detect_mime_type
+
+    session = _get_session(db, project_id, upload_id, user)
+    if session.status == "completed" and session.resource_id:
+        # Retried completion - return the resource already created
+        resource = db.query(Resource).filter(Resource.id == session.resource_id).first()
+        if resource:
+            return resource_to_response(resource)
+    if session.status != "open":
+        raise HTTPException(status_code=409, detail=f"Upload is {session.status}")
+
+    part_count = _part_count(session)
+    received = {n for (n,) in db.query(UploadPart.part_number).filter(UploadPart.session_id == upload_id)}
+    missing = [n for n in range(1, part_count + 1) if n not in received]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing parts: {missing[:20]}")
+
+    _check_not_in_progress(db, session.sha256)
+    existing_resource = _find_user_resource_by_hash(db, session.sha256, user)
+    if existing_resource and existing_resource.status in READY_STATUSES:
+        # The user already has the file (another upload finished first) - link it
+        _link_resource_to_project(db, existing_resource, project_id)
+        session.status = "completed"
+        session.resource_id = existing_resource.id
+        session.completed_at = datetime.utcnow()
+        db.commit()
+        background_tasks.add_task(get_storage().delete_parts, upload_id)
+        invalidate_resource_cache(project_id)
+        return resource_to_response(existing_resource)
+
+    file_category = detect_file_category(session.filename)
+    storage = get_storage()
+    # source and content_hash are set once the file is assembled and verified
+    resource = Resource(
+        type=get_resource_type(session.filename, file_category),
+        source="",
+        filename=session.filename,
+        status=ResourceStatus.UPLOADED,
+        file_size_bytes=session.size,
+        mime_type=session.mime_type or detect_mime_type(b"", session.filename),
+        storage_backend=storage.backend_name if hasattr(storage, 'backend_name') else "local"
+    )
+    db.add(resource)
+    db.flush()
+    session.status = "completed"
+    session.resource_id = resource.id
+    session.completed_at = datetime.utcnow()
+    db.commit()
+    db.refresh(resource)
+    _link_resource_to_project(db, resource, project_id)
+
+    background_tasks.add_task(finalize_upload, upload_id, file_category.value)
+
+    invalidate_resource_cache(project_id)
+    return resource_to_response(resource)
+
+
+@router.delete("/{upload_id}")
+def abort_upload(
+    project_id: str,
+    upload_id: str,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user)
+):
+    """Abort an open upload and delete its parts."""
+    session = _get_session(db, project_id, upload_id, user)
+    if session.status == "completed":
+        raise HTTPException(status_code=409, detail="Upload is already completed")
+    session.status = "aborted"
+    db.commit()
+    get_storage().delete_parts(upload_id)
+    return {"status": "aborted"}
+
+
+def cleanup_expired_uploads():
+    """Delete upload sessions older than the TTL, with their parts.
+
+    Open sessions past the TTL were abandoned; finished ones are no longer
+    needed. Runs as a background task, at most every few minutes per process.
+    """
+    db = SessionLocal()
+    storage = get_storage()
+    try:
+        cutoff = datetime.utcnow() - timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+        sessions = db.query(UploadSession).filter(UploadSession.created_at < cutoff).limit(100).all()
+        for session in sessions:
+            if session.status != "completed":
+                storage.delete_parts(session.id)
+            db.query(UploadPart).filter(UploadPart.session_id == session.id).delete()
+            db.delete(session)
+        db.commit()
+        if sessions:
+            print(f"[Uploads] Cleaned up {len(sessions)} expired upload sessions")
+    except Exception as e:
+        print(f"[Uploads] Upload cleanup failed: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def finalize_upload(upload_id: str, file_category: str):
+    """Background task: assemble the parts, verify the hash, then process the file.
+
+    A hash mismatch marks the resource FAILED (error_stage "upload") and
+    discards the data. Once the hash is verified the file is deduplicated:
+    if another resource has the same content and didn't fail, it is linked
+    to the project in place of the new one. A FAILED or PARTIAL one hands
+    its content hash over and the new resource is processed.
+    """
+    from api.utils.hashing import compute_content_hash
+    import traceback
+
+    db = SessionLocal()
+    storage = get_storage()
+    try:
+        session = db.query(UploadSession).filter(UploadSession.id == upload_id).first()
+        resource = db.query(Resource).filter(Resource.id == session.resource_id).first() if session else None
+        if not resource:
+            return
+
+        try:
+            assembled = storage.assemble_parts(upload_id, _part_count(session))
+            with storage.local_copy(assembled) as local_path:
+                content_hash = compute_content_hash(file_path=local_path)
+
+            if content_hash != session.sha256:
+                print(f"[Uploads] Hash mismatch for {upload_id}: expected {session.sha256}, got {content_hash}")
+                resource.status = ResourceStatus.FAILED
+                resource.error_message = "Uploaded file does not match its SHA-256 - upload it again"
+                resource.error_stage = "upload"
+                db.commit()
+                return
+
+            existing_resource = db.query(Resource).filter(
+                Resource.content_hash == content_hash,
+                Resource.id != resource.id
+            ).first()
+            if existing_resource and existing_resource.status not in (ResourceStatus.FAILED, ResourceStatus.PARTIAL):
+                # The bytes prove the client has the file - link the existing resource
+                _link_resource_to_project(db, existing_resource, session.project_id)
+                session.resource_id = existing_resource.id
+                db.delete(resource)
+                db.commit()
+                invalidate_resource_cache(session.project_id)
+                print(f"[Uploads] {upload_id} matches resource {existing_resource.id}, linked it")
+                return
+            if existing_resource:
+                # A failed earlier attempt - this upload replaces it as the file's resource
+                existing_resource.content_hash = None
+                db.flush()  # Free the unique hash before the new resource takes it
+
+            file_path = storage.move(assembled, session.project_id, session.filename)
+            resource.source = str(file_path)
+            resource.content_hash = content_hash
+            db.commit()
+            print(f"[Uploads] Assembled {upload_id} into {file_path}")
+        except Exception as e:
+            print(f"[Uploads] Failed to assemble {upload_id}: {e}")
+            traceback.print_exc()
+            resource.status = ResourceStatus.FAILED
+            resource.error_message = f"Upload assembly failed: {e}"
+            resource.error_stage = "upload"
+            db.commit()
+            return
+        finally:
+            storage.delete_parts(upload_id)
+
+        resource_id = resource.id
+    finally:
+        db.close()
+
+    # === STAGE 2 + 3: Extraction and Enrichment ===
+    process_resource(resource_id=resource_id, file_path=file_path, file_category=file_category)
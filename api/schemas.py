@@ -105,6 +105,37 @@ class ResourceResponse(BaseModel):
         from_attributes = True
 
 
+class UploadPreflightRequest(BaseModel):
+    """Hash of a file the client is about to upload."""
+    filename: str
+    sha256: str  # Hex SHA-256 of the file content
+    size: int  # Bytes
+
+
+class UploadPreflightResponse(BaseModel):
+    """Either the already-known resource (now linked) or a token to upload with."""
+    status: str  # "linked" (no upload needed) or "upload_required"
+    resource: ResourceResponse | None = None
+    upload_token: str | None = None
+
+
+class UploadSessionCreate(BaseModel):
+    """Start a resumable upload."""
+    filename: str
+    size: int  # Bytes
+    sha256: str  # Hex SHA-256 of the whole file, verified after assembly
+
+
+class UploadSessionResponse(BaseModel):
+    """State of a resumable upload - received_parts tells a client where to resume."""
+    upload_id: str | None = None
+    status: str  # open, completed, aborted, or linked (file already in the library)
+    part_size: int | None = None
+    part_count: int | None = None
+    received_parts: list[int] = []
+    resource: ResourceResponse | None = None
+
+
 class ResourceLinkRequest(BaseModel):
     """Request to link an existing resource to a project."""
     resource_id: str
@@ -0,0 +1,201 @@
+"""Database-backed chunk store."""
+
+import json
+import zlib
+
+from sqlalchemy import tuple_
+from sqlalchemy.exc import IntegrityError
+
+from api.database import SessionLocal, ChunkRecord
+from rag.chunk_store import ChunkStore
+
+
+class DatabaseChunkStore(ChunkStore):
+    """Stores chunk content (zlib-compressed) and metadata in the chunk_records table."""
+
+    # Keep IN (...) lists well under database parameter limits
+    BATCH_SIZE = 500
+
+    @staticmethod
+    def _to_row(namespace: str, record: dict) -> ChunkRecord:
+        metadata = record["metadata"]
+        return ChunkRecord(
+            namespace=namespace,
+            vector_id=record["id"],
+            resource_id=metadata.get("resource_id"),
+            source=metadata.get("source"),
+            chunk_index=metadata.get("chunk_index"),
+            page_ref=metadata.get("page_ref"),
+            char_count=len(record["content"]),
+            content=zlib.compress(record["content"].encode("utf-8")),
+            metadata_json=json.dumps(metadata)
+        )
+
+    def put_many(self, namespace: str, records: list[dict]) -> None:
+        if not records:
+            return
+
+        db = SessionLocal()
+        try:
+            for i in range(0, len(records), self.BATCH_SIZE):
+                batch = records[i:i + self.BATCH_SIZE]
+                # Replace existing rows (reindexing rewrites the same vector IDs)
+                db.query(ChunkRecord).filter(
+                    ChunkRecord.namespace == namespace,
+                    ChunkRecord.vector_id.in_([r["id"] for r in batch])
+                ).delete(synchronize_session=False)
+                db.add_all([self._to_row(namespace, r) for r in batch])
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # A concurrent writer inserted some of these rows - overwrite them
+                    db.rollback()
+                    for r in batch:
+                        db.merge(self._to_row(namespace, r))
+                    db.commit()
+        finally:
+            db.close()
+
+    def get_many(self, namespace: str, ids: list[str]) -> dict[str, dict]:
+        found = {}
+        db = SessionLocal()
+        try:
+            for i in range(0, len(ids), self.BATCH_SIZE):
+                rows = db.query(ChunkRecord.vector_id, ChunkRecord.content, ChunkRecord.metadata_json).filter(
+                    ChunkRecord.namespace == namespace,
+                    ChunkRecord.vector_id.in_(ids[i:i + self.BATCH_SIZE])
+                ).all()
+                for vector_id, content, metadata_json in rows:
+                    found[vector_id] = {
+                        "content": zlib.decompress(content).decode("utf-8"),
+                        "metadata": json.loads(metadata_json) if metadata_json else {}
+                    }
+        finally:
+            db.close()
+        return found
+
+    def count(self, namespace: str, resource_id: str) -> int:
+        """Number of chunks stored for a resource."""
+        db = SessionLocal()
+        try:
+            return db.query(ChunkRecord).filter(
+                ChunkRecord.namespace == namespace,
+                ChunkRecord.resource_id == resource_id
+            ).count()
+        finally:
+            db.close()
+
+    def list_page(
+        self,
+        namespace: str,
+        resource_id: str,
+        limit: int = 100,
+        after: tuple = None,
+        include_content: bool = True
+    ) -> tuple[list[dict], tuple | None]:
+        """One page of a resource's chunks in document order.
+
+        Args:
+            namespace: Vector namespace of the resource
+            resource_id: Resource to list
+            limit: Page size
+            after: (source, chunk_index, vector_id) of the last chunk on the
+                previous page, or None for the first page
+            include_content: Decompress and return chunk bodies for this page
+
+        Returns:
+            (chunks, key of the last chunk if there are more pages, else None)
+        """
+        order = (ChunkRecord.source, ChunkRecord.chunk_index, ChunkRecord.vector_id)
+        columns = [*order, ChunkRecord.page_ref, ChunkRecord.char_count, ChunkRecord.metadata_json]
+        if include_content:
+            columns.append(ChunkRecord.content)
+
+        db = SessionLocal()
+        try:
+            query = db.query(*columns).filter(
+                ChunkRecord.namespace == namespace,
+                ChunkRecord.resource_id == resource_id
+            )
+            if after:
+                query = query.filter(tuple_(*order) > tuple_(*after))
+            rows = query.order_by(*order).limit(limit + 1).all()
+        finally:
+            db.close()
+
+        has_more = len(rows) > limit
+        chunks = []
+        for row in rows[:limit]:
+            source, chunk_index, vector_id, page_ref, char_count, metadata_json = row[:6]
+            chunks.append({
+                "id": vector_id,
+                "content": zlib.decompress(row[6]).decode("utf-8") if include_content else None,
+                "source": source,
+                "chunk_index": chunk_index,
+                "metadata": {
+                    **(json.loads(metadata_json) if metadata_json else {}),
+                    "page_ref": page_ref,
+                    "char_count": char_count
+                }
+            })
+
+        last = chunks[-1] if has_more else None
+        return chunks, (last["source"], last["chunk_index"], last["id"]) if last else None
+
+    @staticmethod
+    def _scoped(query, namespace: str, resource_id: str = None, sources: list[str] = None):
+        query = query.filter(ChunkRecord.namespace == namespace)
+        if resource_id:
+            query = query.filter(ChunkRecord.resource_id == resource_id)
+        if sources is not None:
+            query = query.filter(ChunkRecord.source.in_(sources))
+        return query
+
+    def list_ids(self, namespace: str, resource_id: str = None, sources: list[str] = None) -> list[str]:
+        ids = []
+        db = SessionLocal()
+        try:
+            if sources is None:
+                return [r[0] for r in self._scoped(db.query(ChunkRecord.vector_id), namespace, resource_id).all()]
+            for i in range(0, len(sources), self.BATCH_SIZE):
+                query = self._scoped(
+                    db.query(ChunkRecord.vector_id), namespace, resource_id, sources[i:i + self.BATCH_SIZE]
+                )
+                ids.extend(r[0] for r in query.all())
+        finally:
+            db.close()
+        return ids
+
+    def delete(
+        self,
+        namespace: str,
+        resource_id: str = None,
+        source: str = None,
+        sources: list[str] = None
+    ) -> None:
+        if source:
+            sources = [source, *(sources or [])]
+        db = SessionLocal()
+        try:
+            batches = [None] if sources is None else [
+                sources[i:i + self.BATCH_SIZE] for i in range(0, len(sources), self.BATCH_SIZE)
+            ]
+            for batch in batches:
+                self._scoped(db.query(ChunkRecord), namespace, resource_id, batch).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def delete_ids(self, namespace: str, ids: list[str]) -> None:
+        if not ids:
+            return
+        db = SessionLocal()
+        try:
+            for i in range(0, len(ids), self.BATCH_SIZE):
+                db.query(ChunkRecord).filter(
+                    ChunkRecord.namespace == namespace,
+                    ChunkRecord.vector_id.in_(ids[i:i + self.BATCH_SIZE])
+                ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
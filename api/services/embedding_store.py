@@ -0,0 +1,57 @@
+"""Database-backed chunk embedding store."""
+
+from api.database import SessionLocal, ChunkEmbedding
+from rag.embedding_cache import ChunkEmbeddingStore, pack_vector, unpack_vector
+
+
+class DatabaseEmbeddingStore(ChunkEmbeddingStore):
+    """Stores chunk embeddings in the chunk_embeddings table.
+
+    Shared by the API and Celery workers, so a chunk embedded once is reused
+    by every later reindex or re-upload containing the same text.
+    """
+
+    # Keep IN (...) lists well under database parameter limits
+    BATCH_SIZE = 500
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        found = {}
+        db = SessionLocal()
+        try:
+            for i in range(0, len(hashes), self.BATCH_SIZE):
+                batch = hashes[i:i + self.BATCH_SIZE]
+                rows = db.query(ChunkEmbedding.content_hash, ChunkEmbedding.embedding).filter(
+                    ChunkEmbedding.model == model,
+                    ChunkEmbedding.content_hash.in_(batch)
+                ).all()
+                for content_hash, embedding in rows:
+                    found[content_hash] = unpack_vector(embedding)
+        finally:
+            db.close()
+        return found
+
+    def put_many(self, model: str, embeddings: dict[str, list[float]]) -> None:
+        if not embeddings:
+            return
+
+        db = SessionLocal()
+        try:
+            # INSERT ... ON CONFLICT DO NOTHING (PostgreSQL and SQLite), so rows a
+            # concurrent worker stored first are skipped and the rest still go in
+            if db.get_bind().dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+
+            hashes = list(embeddings)
+            for i in range(0, len(hashes), self.BATCH_SIZE):
+                batch = hashes[i:i + self.BATCH_SIZE]
+                db.execute(
+                    insert(ChunkEmbedding).values([
+                        {"model": model, "content_hash": h, "embedding": pack_vector(embeddings[h])}
+                        for h in batch
+                    ]).on_conflict_do_nothing(index_elements=["model", "content_hash"])
+                )
+                db.commit()
+        finally:
+            db.close()
@@ -0,0 +1,121 @@
+"""Cached bare git mirrors for incremental repository indexing."""
+
+import os
+import subprocess
+import tarfile
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Bare mirrors persist between indexing runs (one per resource)
+GIT_MIRROR_DIR = Path(os.getenv("GIT_MIRROR_DIR", "git_repos/mirrors"))
+
+# Paths per `git archive` call, to stay under argument length limits
+ARCHIVE_BATCH_SIZE = 500
+
+
+@dataclass
+class RepoChanges:
+    """Files that differ between two commits."""
+    changed: list[str] = field(default_factory=list)  # Added or modified - re-index these
+    removed: list[str] = field(default_factory=list)  # Deleted (renames count as delete + add)
+
+    @property
+    def gitignore_changed(self) -> bool:
+        """Whether ignore rules changed, which can (un)ignore untouched files."""
+        return any(path.rsplit("/", 1)[-1] == ".gitignore" for path in self.changed + self.removed)
+
+    @property
+    def stale(self) -> list[str]:
+        """Sources whose existing vectors must be deleted."""
+        return sorted(set(self.changed) | set(self.removed))
+
+
+def mirror_path(resource_id: str) -> Path:
+    return GIT_MIRROR_DIR / f"{resource_id}.git"
+
+
+def _git(args: list[str], cwd: Path = None, timeout: int = 300, text: bool = True) -> subprocess.CompletedProcess:
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=text, timeout=timeout)
+
+
+def sync_mirror(resource_id: str, repo_url: str, branch: str | None = None, timeout: int = 300) -> tuple[Path, str, bool]:
+    """Clone or fetch the resource's bare mirror.
+
+    Args:
+        resource_id: Resource the mirror belongs to
+        repo_url: Repository URL
+        branch: Branch to index (None: the branch the mirror was cloned
+            for, or the remote's default branch for a new mirror)
+        timeout: Seconds allowed for the clone or fetch
+
+    Returns:
+        (mirror path, full commit SHA of the branch head, whether the mirror already existed)
+    """
+    mirror = mirror_path(resource_id)
+    existed = (mirror / "HEAD").exists()
+
+    if existed:
+        # The mirror's HEAD remembers the branch it was cloned for
+        branch = branch or _git(["symbolic-ref", "--short", "HEAD"], cwd=mirror).stdout.strip()
+        print(f"[Git] Fetching {branch} into mirror: {repo_url}")
+        _git(["fetch", repo_url, f"+refs/heads/{branch}:refs/heads/{branch}"], cwd=mirror, timeout=timeout)
+    else:
+        print(f"[Git] Cloning mirror: {repo_url}")
+        mirror.parent.mkdir(parents=True, exist_ok=True)
+        clone_cmd = ["clone", "--bare"]
+        if branch:
+            clone_cmd.extend(["--branch", branch, "--single-branch"])
+        _git([*clone_cmd, repo_url, str(mirror)], timeout=timeout)
+
+    head = _git(["rev-parse", f"refs/heads/{branch}" if branch else "HEAD"], cwd=mirror).stdout.strip()
+    return mirror, head, existed
+
+
+def has_commit(mirror: Path, commit: str) -> bool:
+    """Whether the mirror contains a commit (e.g. the last indexed one)."""
+    try:
+        _git(["cat-file", "-e", f"{commit}^{{commit}}"], cwd=mirror)
+        return True
+    except subprocess.CalledProcessError:
+        return False
+
+
+def diff_commits(mirror: Path, old: str, new: str) -> RepoChanges:
+    """Files changed between two commits, from `git diff --name-status`."""
+    output = _git(["diff", "--name-status", "--no-renames", "-z", old, new], cwd=mirror).stdout
+    fields = output.split("\0")
+    changes = RepoChanges()
+    # -z output alternates status and path: "M\0path\0D\0path\0..."
+    for status, path in zip(fields[0::2], fields[1::2]):
+        if status.startswith("D"):
+            changes.removed.append(path)
+        else:
+            changes.changed.append(path)
+    return changes
+
+
+def gitignore_paths(mirror: Path, commit: str) -> list[str]:
+    """Paths of every .gitignore file in a commit."""
+    output = _git(["ls-tree", "-r", "--name-only", "-z", commit], cwd=mirror).stdout
+    return [path for path in output.split("\0") if path.rsplit("/", 1)[-1] == ".gitignore"]
+
+
+def export_tree(mirror: Path, commit: str, dest: Path, paths: list[str] = None) -> None:
+    """Write a commit's files (or only the given paths) into dest without a checkout."""
+    dest.mkdir(parents=True, exist_ok=True)
+    batches = [None] if paths is None else [
+        paths[i:i + ARCHIVE_BATCH_SIZE] for i in range(0, len(paths), ARCHIVE_BATCH_SIZE)
+    ]
+    for batch in batches:
+        cmd = ["git", "archive", "--format=tar", commit]
+        if batch:
+            cmd.extend(["--", *batch])
+        process = subprocess.Popen(cmd, cwd=mirror, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+            # Git only writes regular files, directories and symlinks; skip links
+            for member in archive:
+                if member.isfile() or member.isdir():
+                    archive.extract(member, dest, set_attrs=False)
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, cmd, stderr=stderr)
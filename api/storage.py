@@ -9,13 +9,48 @@ Usage:
     path = storage.save(project_id, filename, content)
     url = storage.get_download_url(path)
     storage.delete(path)
+
+Large files are written incrementally with open_writer() and read through
+a local file with local_copy(), so they never sit in memory whole.
+Resumable uploads store numbered parts (open_part_writer), assemble them
+(assemble_parts) and move the result into place (move).
 """
 
 import os
+import shutil
+import uuid
+import tempfile
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import timedelta
-from typing import BinaryIO
+from typing import BinaryIO, Iterator
+
+
+class StorageWriter(ABC):
+    """Incremental write of one file.
+
+    Data goes to a temporary location; nothing appears at the final path
+    until commit(), so an aborted upload never replaces an existing file.
+    """
+
+    def __init__(self):
+        self.size = 0  # Bytes written so far
+
+    @abstractmethod
+    def write(self, data: bytes) -> None:
+        """Append a block of data."""
+        pass
+
+    @abstractmethod
+    def commit(self) -> str:
+        """Move the data to its final path and return the storage path/key."""
+        pass
+
+    @abstractmethod
+    def abort(self) -> None:
+        """Discard everything written."""
+        pass
 
 
 class StorageBackend(ABC):
@@ -26,6 +61,11 @@ class StorageBackend(ABC):
         """Save file content and return the storage path/key."""
         pass
 
+    @abstractmethod
+    def path_for(self, project_id: str, filename: str) -> str:
+        """Storage path/key that save(project_id, filename, ...) writes to."""
+        pass
+
     @abstractmethod
     def get_download_url(self, path: str, filename: str | None = None) -> str:
         """Get a URL for downloading the file.
@@ -58,6 +98,99 @@ class StorageBackend(ABC):
         """Check if a file exists."""
         pass
 
+    @abstractmethod
+    def open_writer(self, project_id: str, filename: str) -> StorageWriter:
+        """Start an incremental write to the path save(project_id, filename, ...) uses."""
+        pass
+
+    @abstractmethod
+    def open_part_writer(self, upload_id: str, part_number: int) -> StorageWriter:
+        """Start writing one part of a resumable upload (re-writing a part replaces it)."""
+        pass
+
+    @abstractmethod
+    def assemble_parts(self, upload_id: str, part_count: int) -> str:
+        """Concatenate parts 1..part_count into a staging file and return its path."""
+        pass
+
+    @abstractmethod
+    def move(self, path: str, project_id: str, filename: str) -> str:
+        """Move a stored file to a project file path and return the new path."""
+        pass
+
+    @abstractmethod
+    def delete_parts(self, upload_id: str) -> None:
+        """Remove an upload's parts and staging file."""
+        pass
+
+    @contextmanager
+    def local_copy(self, path: str) -> Iterator[str]:
+        """Local file with a stored file's contents, for tools that need a path.
+
+        Temporary copies are removed on exit.
+        """
+        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(path).suffix) as tmp:
+            tmp.write(self.read(path))
+            local_path = tmp.name
+        try:
+            yield local_path
+        finally:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+
+
+class LocalStorageWriter(StorageWriter):
+    """Writes to a hidden part file beside the target, renamed into place on commit."""
+
+    def __init__(self, final_path: Path):
+        super().__init__()
+        self.final_path = final_path
+        self.part_path = final_path.with_name(f".{final_path.name}.{uuid.uuid4().hex}.part")
+        self._file = open(self.part_path, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self) -> str:
+        self._file.close()
+        os.replace(self.part_path, self.final_path)
+        return str(self.final_path)
+
+    def abort(self) -> None:
+        self._file.close()
+        self.part_path.unlink(missing_ok=True)
+
+
+class GCSStorageWriter(StorageWriter):
+    """Streams to a temporary blob with a resumable upload, renamed into place on commit."""
+
+    # Upload chunk size (a multiple of 256KB) - the most buffered in memory per upload
+    CHUNK_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, bucket, final_name: str):
+        super().__init__()
+        self.bucket = bucket
+        self.final_name = final_name
+        self.temp_blob = bucket.blob(f"uploads/_incoming/{uuid.uuid4().hex}")
+        self._file = self.temp_blob.open("wb", chunk_size=self.CHUNK_SIZE)
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self) -> str:
+        self._file.close()
+        self.bucket.rename_blob(self.temp_blob, self.final_name)
+        return self.final_name
+
+    def abort(self) -> None:
+        try:
+            self._file.close()
+            self.temp_blob.delete()
+        except Exception:
+            pass
+
 
 class LocalStorage(StorageBackend):
     """Local filesystem storage for development."""
@@ -66,6 +199,10 @@ class LocalStorage(StorageBackend):
         self.base_dir = Path(base_dir)
         self.base_dir.mkdir(exist_ok=True)
 
+    def path_for(self, project_id: str, filename: str) -> str:
+        """Return the local file path for a project file."""
+        return str(self.base_dir / project_id / filename)
+
     def save(self, project_id: str, filename: str, content: bytes) -> str:
         """Save file to local filesystem."""
         project_dir = self.base_dir / project_id
@@ -106,6 +243,48 @@ class LocalStorage(StorageBackend):
         """Check if file exists on local filesystem."""
         return os.path.exists(path)
 
+    def open_writer(self, project_id: str, filename: str) -> StorageWriter:
+        """Start an incremental write into the project directory."""
+        project_dir = self.base_dir / project_id
+        project_dir.mkdir(exist_ok=True)
+        return LocalStorageWriter(project_dir / filename)
+
+    @contextmanager
+    def local_copy(self, path: str) -> Iterator[str]:
+        """Files are already local - use them in place."""
+        yield path
+
+    def _parts_dir(self, upload_id: str) -> Path:
+        return self.base_dir / "_uploads" / upload_id
+
+    def open_part_writer(self, upload_id: str, part_number: int) -> StorageWriter:
+        """Part files go in uploads/_uploads/<upload_id>/."""
+        parts_dir = self._parts_dir(upload_id)
+        parts_dir.mkdir(parents=True, exist_ok=True)
+        return LocalStorageWriter(parts_dir / f"{part_number:05d}")
+
+    def assemble_parts(self, upload_id: str, part_count: int) -> str:
+        """Concatenate the part files into one staging file."""
+        parts_dir = self._parts_dir(upload_id)
+        assembled = parts_dir / "assembled"
+        with open(assembled, "wb") as out:
+            for part_number in range(1, part_count + 1):
+                with open(parts_dir / f"{part_number:05d}", "rb") as part:
+                    shutil.copyfileobj(part, out, 1024 * 1024)
+        return str(assembled)
+
+    def move(self, path: str, project_id: str, filename: str) -> str:
+        """Rename a file into the project directory."""
+        project_dir = self.base_dir / project_id
+        project_dir.mkdir(exist_ok=True)
+        final_path = project_dir / filename
+        os.replace(path, final_path)
+        return str(final_path)
+
+    def delete_parts(self, upload_id: str) -> None:
+        """Remove the upload's part directory."""
+        shutil.rmtree(self._parts_dir(upload_id), ignore_errors=True)
+
 
 class GCSStorage(StorageBackend):
     """Google Cloud Storage backend for production."""
@@ -121,6 +300,10 @@ class GCSStorage(StorageBackend):
         """Generate blob name (path in GCS)."""
         return f"uploads/{project_id}/{filename}"
 
+    def path_for(self, project_id: str, filename: str) -> str:
+        """Return the blob name for a project file."""
+        return self._get_blob_name(project_id, filename)
+
     def save(self, project_id: str, filename: str, content: bytes) -> str:
         """Save file to GCS and return the blob name."""
         blob_name = self._get_blob_name(project_id, filename)
@@ -171,6 +354,57 @@ class GCSStorage(StorageBackend):
         blob = self.bucket.blob(path)
         return blob.exists()
 
+    def open_writer(self, project_id: str, filename: str) -> StorageWriter:
+        """Start a streaming upload to the project's blob."""
+        return GCSStorageWriter(self.bucket, self._get_blob_name(project_id, filename))
+
+    # Most source objects GCS accepts in one compose request
+    COMPOSE_LIMIT = 32
+
+    def _parts_prefix(self, upload_id: str) -> str:
+        return f"uploads/_uploads/{upload_id}/"
+
+    def open_part_writer(self, upload_id: str, part_number: int) -> StorageWriter:
+        """Part blobs go under uploads/_uploads/<upload_id>/."""
+        return GCSStorageWriter(self.bucket, f"{self._parts_prefix(upload_id)}{part_number:05d}")
+
+    def assemble_parts(self, upload_id: str, part_count: int) -> str:
+        """Compose the part blobs server-side - no data passes through the API.
+
+        Compose takes at most 32 sources, so the first 32 parts are composed
+        and each further request appends up to 31 more to the result.
+        """
+        prefix = self._parts_prefix(upload_id)
+        parts = [self.bucket.blob(f"{prefix}{n:05d}") for n in range(1, part_count + 1)]
+        assembled = self.bucket.blob(f"{prefix}assembled")
+        assembled.compose(parts[:self.COMPOSE_LIMIT])
+        for i in range(self.COMPOSE_LIMIT, len(parts), self.COMPOSE_LIMIT - 1):
+            assembled.compose([assembled] + parts[i:i + self.COMPOSE_LIMIT - 1])
+        return assembled.name
+
+    def move(self, path: str, project_id: str, filename: str) -> str:
+        """Rename a blob to the project's blob name."""
+        final_name = self._get_blob_name(project_id, filename)
+        self.bucket.rename_blob(self.bucket.blob(path), final_name)
+        return final_name
+
+    def delete_parts(self, upload_id: str) -> None:
+        """Delete the upload's part and staging blobs."""
+        for blob in self.client.list_blobs(self.bucket, prefix=self._parts_prefix(upload_id)):
+            blob.delete()
+
+    @contextmanager
+    def local_copy(self, path: str) -> Iterator[str]:
+        """Download the blob to a temp file (streamed, not held in memory)."""
+        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(path).suffix) as tmp:
+            local_path = tmp.name
+        try:
+            self.bucket.blob(path).download_to_filename(local_path)
+            yield local_path
+        finally:
+            if os.path.exists(local_path):
+                os.remove(local_path)
+
 
 # Singleton storage instance
 _storage_instance: StorageBackend | None = None
@@ -6,6 +6,7 @@ import time
 import uuid
 import redis
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -109,6 +110,7 @@ def publish_job_event(job_id: str, event_type: str, data: dict = None):
             "tool": tool_name,
             "query": query,
             "input": data.get("input"),
+            "tool_call_id": data.get("tool_call_id"),
         })
         pipe.hset(state_key, mapping={
             "current_phase": "searching",
@@ -220,7 +222,7 @@ celery_app = Celery(
     "akleao_tasks",
     broker=redis_url,
     backend=redis_url,
-    include=["api.tasks.conversation"],  # Include task modules
+    include=["api.tasks.conversation", "api.tasks.compaction", "api.tasks.vector_migration"],  # Include task modules
 )
 
 # Celery configuration
@@ -248,3 +250,24 @@ celery_app.conf.update(
     worker_prefetch_multiplier=1,  # Process one task at a time
     worker_concurrency=4,  # 4 workers by default
 )
+
+
+@worker_init.connect
+def disable_docling_pool(**kwargs):
+    """Workers convert PDFs in-process - no Docling process pool.
+
+    Set in the main worker process (solo and thread pools run tasks there)
+    and inherited by prefork children; worker_process_init sets it again.
+    """
+    from rag.docling_pool import disable_process_pool
+    disable_process_pool()
+
+
+@worker_process_init.connect
+def warmup_worker_clients(**kwargs):
+    """Build shared API clients in each worker process, after the fork."""
+    from api.clients import warmup
+    from rag.docling_pool import disable_process_pool, warmup_docling
+    disable_process_pool()
+    warmup()
+    warmup_docling()
@@ -0,0 +1,169 @@
+"""Rolling conversation compaction.
+
+The agent gets a thread's history as its rolling summary plus the most
+recent turns: at most HISTORY_KEEP_TURNS user turns, cut further (oldest
+first) to fit HISTORY_TOKEN_BUDGET. Turns that fall out of that window are
+folded into the thread's summary by compact_thread_task, which runs after
+each completed conversation job, so per-turn input stays roughly constant
+however long the thread gets.
+"""
+
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+
+from api.tasks import celery_app, redis_client
+from api.database import SessionLocal, Message, MessageRole, Thread
+
+load_dotenv()
+
+# Token budget for the history sent to the agent (summary included)
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "12000"))
+
+# Most recent user turns (with their replies) kept verbatim
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+
+# Model that writes the summaries
+COMPACTION_MODEL = os.getenv("COMPACTION_MODEL", "claude-3-5-haiku-latest")
+
+# Characters of each message passed to the summarizer
+COMPACTION_MESSAGE_CHARS = 4000
+
+SUMMARY_PREFIX = "[Summary of the earlier conversation in this thread]"
+
+
+def _message_tokens(message: dict) -> int:
+    from rag.embeddings import estimate_tokens
+    return estimate_tokens(message["content"]) + 4  # Role and framing
+
+
+def split_history(messages: list[Message], summary: str | None = None) -> tuple[list[Message], list[Message]]:
+    """Split unsummarized messages into (to compact, to keep verbatim).
+
+    The kept window is the last HISTORY_KEEP_TURNS user turns, trimmed from
+    the front until it fits HISTORY_TOKEN_BUDGET (minus the summary) and
+    starts with a user message. The newest turn is always kept.
+    """
+    from rag.embeddings import estimate_tokens
+
+    messages = [m for m in messages if m.content and m.content.strip()]
+
+    # Start of the last HISTORY_KEEP_TURNS user turns
+    start = len(messages)
+    user_turns = 0
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].role == MessageRole.USER:
+            user_turns += 1
+            start = i
+            if user_turns >= HISTORY_KEEP_TURNS:
+                break
+    if user_turns == 0:
+        start = 0
+
+    budget = HISTORY_TOKEN_BUDGET - (estimate_tokens(summary) if summary else 0)
+    total = sum(_message_tokens({"content": m.content}) for m in messages[start:])
+    last_user = max((i for i, m in enumerate(messages) if m.role == MessageRole.USER), default=0)
+    while start < last_user and total > budget:
+        total -= _message_tokens({"content": messages[start].content})
+        start += 1
+
+    # The window must open with a user turn
+    while start < len(messages) and messages[start].role != MessageRole.USER:
+        start += 1
+
+    return messages[:start], messages[start:]
+
+
+def build_history(db, thread: Thread, exclude_message_id: str = None) -> list[dict]:
+    """Conversation history for the agent: summary plus the recent window.
+
+    Args:
+        db: Database session
+        thread: Thread whose history to build
+        exclude_message_id: Message left out (the job's own user message,
+            which the agent appends itself)
+
+    Returns:
+        Messages in Anthropic format, starting with a user turn
+    """
+    query = db.query(Message).filter(Message.thread_id == thread.id)
+    if thread.summary_through:
+        query = query.filter(Message.created_at > thread.summary_through)
+    if exclude_message_id:
+        query = query.filter(Message.id != exclude_message_id)
+    messages = query.order_by(Message.created_at).all()
+
+    _, window = split_history(messages, thread.summary)
+    history = [{"role": m.role.value, "content": m.content} for m in window]
+    if thread.summary:
+        # A user turn of its own; the API merges it with the window's first user turn
+        history.insert(0, {"role": "user", "content": f"{SUMMARY_PREFIX}\n{thread.summary}"})
+    return history
+
+
+def _summarize(previous_summary: str | None, messages: list[Message]) -> str:
+    """Fold messages into the running summary with the compaction model."""
+    from api import clients
+
+    transcript = []
+    for m in messages:
+        role = "User" if m.role == MessageRole.USER else "Assistant"
+        content = m.content
+        if len(content) > COMPACTION_MESSAGE_CHARS:
+            content = content[:COMPACTION_MESSAGE_CHARS] + "..."
+        transcript.append(f"{role}: {content}")
+
+    response = clients.get_anthropic().messages.create(
+        model=COMPACTION_MODEL,
+        max_tokens=1024,
+        messages=[{
+            "role": "user",
+            "content": f"""You maintain a running summary of a research conversation between a user and an assistant.
+
+Existing summary:
+{previous_summary or "(none yet)"}
+
+New turns to fold in:
+{chr(10).join(transcript)}
+
+Write the updated summary. Keep the user's goals, questions, decisions and preferences, facts and figures the assistant found (with the documents or sources they came from), and any open questions. Drop greetings and filler. Use concise bullet points, under 400 words. Respond with the summary only."""
+        }]
+    )
+    return response.content[0].text.strip()
+
+
+@celery_app.task(name="compact_thread")
+def compact_thread_task(thread_id: str):
+    """Fold turns that left a thread's history window into its summary.
+
+    Idempotent, and skipped while another compaction of the same thread runs.
+    """
+    lock_key = f"compact:{thread_id}"
+    if not redis_client.set(lock_key, "1", nx=True, ex=300):
+        return {"status": "skipped", "reason": "compaction already running"}
+
+    db = SessionLocal()
+    try:
+        thread = db.query(Thread).filter(Thread.id == thread_id).first()
+        if not thread:
+            return {"status": "error", "message": "Thread not found"}
+
+        query = db.query(Message).filter(Message.thread_id == thread.id)
+        if thread.summary_through:
+            query = query.filter(Message.created_at > thread.summary_through)
+        messages = query.order_by(Message.created_at).all()
+
+        older, _ = split_history(messages, thread.summary)
+        if not older:
+            return {"status": "skipped", "reason": "nothing to compact"}
+
+        summary = _summarize(thread.summary, older)
+        thread.summary = summary
+        thread.summary_through = older[-1].created_at
+        thread.summary_updated_at = datetime.utcnow()
+        db.commit()
+        print(f"[Compaction] Folded {len(older)} messages into summary of thread {thread_id}")
+        return {"status": "completed", "compacted": len(older)}
+    finally:
+        db.close()
+        redis_client.delete(lock_key)
@@ -11,33 +11,22 @@ from api.database import (
     SessionLocal, ConversationJob, Message, Notification, Thread, Project, Finding,
     JobStatus, NotificationType, MessageRole, Resource, ProjectResource
 )
-from rag.embeddings import Embedder
-from rag.vectorstore import VectorStore
-from rag.retriever import Retriever
 from rag.agent import Agent, ResourceInfo
+from api import clients
 from rag.tools import ToolContext
+from api.tasks.compaction import build_history, compact_thread_task
 
 # Load environment
 load_dotenv()
 
 
 def get_agent():
-    """Get agent instance with retriever."""
-    openai_key = os.getenv("OPENAI_API_KEY")
-    pinecone_key = os.getenv("PINECONE_API_KEY")
-    anthropic_key = os.getenv("ANTHROPIC_API_KEY")
-    tavily_key = os.getenv("TAVILY_API_KEY")
-
-    embedder = Embedder(api_key=openai_key)
-    vectorstore = VectorStore(
-        api_key=pinecone_key,
-        index_name=os.getenv("PINECONE_INDEX_NAME", "akleao-research"),
-        dimension=embedder.dimensions
+    """Get agent instance with retriever (clients are shared per worker process)."""
+    return Agent(
+        retriever=clients.get_retriever(),
+        client=clients.get_anthropic(),
+        tavily_api_key=os.getenv("TAVILY_API_KEY")
     )
-    vectorstore.create_index_if_not_exists()
-    retriever = Retriever(embedder=embedder, vectorstore=vectorstore)
-
-    return Agent(retriever=retriever, api_key=anthropic_key, tavily_api_key=tavily_key)
 
 
 def _build_resources_list(db, project_id: str) -> list[ResourceInfo]:
@@ -74,6 +63,7 @@ def _build_resources_list(db, project_id: str) -> list[ResourceInfo]:
             summary=r.summary,
             id=r.id,
             file_path=r.source,
+            content_hash=r.content_hash,
         )
 
         # Add data file metadata if available
@@ -99,10 +89,11 @@ def _build_resources_list(db, project_id: str) -> list[ResourceInfo]:
     return resources
 
 
-def _get_resource_namespaces(db, project_id: str) -> list[str]:
-    """Get unique namespaces from project resources.
+def _get_search_scope(db, project_id: str) -> tuple[list[str], list[str]]:
+    """Get unique namespaces and ready resource IDs from project resources.
 
-    Uses explicit query to ensure fresh data from database.
+    Uses explicit query to ensure fresh data from database. Resource IDs
+    scope searches of the shared namespace.
     """
     # Explicitly query resources via ProjectResource join to ensure fresh data
     db_resources = db.query(Resource).join(
@@ -112,13 +103,15 @@ def _get_resource_namespaces(db, project_id: str) -> list[str]:
     ).all()
 
     namespaces = set()
+    resource_ids = []
     for r in db_resources:
         if r.status.value == "ready":
             if r.pinecone_namespace:
                 namespaces.add(r.pinecone_namespace)
             else:
                 namespaces.add(r.id)
-    return list(namespaces) if namespaces else []
+            resource_ids.append(r.id)
+    return list(namespaces), resource_ids
 
 
 def _build_parent_context(thread: Thread, db, max_depth: int = 3) -> str | None:
@@ -234,23 +227,16 @@ def process_conversation_task(self, job_id: str):
 
         # Build resources list and namespaces
         resources = _build_resources_list(db, project.id)
-        namespaces = _get_resource_namespaces(db, project.id)
+        namespaces, resource_ids = _get_search_scope(db, project.id)
 
         # Check resource types
         has_documents = any(r.type in ("document", "website", "git_repository") for r in resources)
         has_data_files = any(r.type == "data_file" for r in resources)
         has_images = any(r.type == "image" for r in resources)
 
-        # Load conversation history from thread messages
-        messages = db.query(Message).filter(
-            Message.thread_id == job.thread_id
-        ).order_by(Message.created_at).all()
-
-        history = [
-            {"role": msg.role.value, "content": msg.content}
-            for msg in messages
-            if msg.content.strip()
-        ]
+        # Conversation history: rolling summary plus the recent turns. The
+        # job's own message is left out - the agent appends it as the query.
+        history = build_history(db, thread, exclude_message_id=job.user_message_id)
 
         # Build parent context for subthreads
         parent_context = _build_parent_context(thread, db)
@@ -270,10 +256,12 @@ def process_conversation_task(self, job_id: str):
         # This gives tools direct access to DB, API clients, and project info
         tool_context = ToolContext(
             db=db,
+            db_factory=SessionLocal,
             project_id=job.project_id,
             thread_id=job.thread_id,
             retriever=agent.retriever,
             namespaces=namespaces,
+            resource_ids=resource_ids,
             anthropic_client=agent.client,
             anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"),
             tavily_api_key=os.getenv("TAVILY_API_KEY"),
@@ -353,14 +341,14 @@ def process_conversation_task(self, job_id: str):
             if activity:
                 # Process activity into structured tool call records
                 tool_calls = []
-                tool_call_map = {}  # Map tool names to their in-progress data
+                tool_call_map = {}  # Map tool call IDs to their in-progress data
 
                 for item in activity:
                     if item.get("type") == "tool_call":
                         tool_name = item.get("name") or item.get("tool")
                         if tool_name:
-                            tool_call_map[tool_name] = {
-                                "id": item.get("id", ""),
+                            tool_call_map[item.get("tool_call_id") or item.get("id") or tool_name] = {
+                                "id": item.get("tool_call_id") or item.get("id", ""),
                                 "tool": tool_name,
                                 "query": item.get("query", ""),
                                 "timestamp": item.get("timestamp", 0),
@@ -368,16 +356,21 @@ def process_conversation_task(self, job_id: str):
                             }
 
                     elif item.get("type") == "tool_result":
+                        # Concurrent calls finish in any order - match by call ID,
+                        # falling back to the oldest open call of the same tool
                         tool_name = item.get("tool")
-                        if tool_name and tool_name in tool_call_map:
-                            call_data = tool_call_map[tool_name]
+                        key = item.get("tool_call_id")
+                        if key not in tool_call_map:
+                            key = next((k for k, c in tool_call_map.items() if c["tool"] == tool_name), None)
+                        if key is not None:
+                            call_data = tool_call_map[key]
                             found_count = item.get("found", 0)
                             call_data["status"] = "complete" if found_count > 0 else "empty"
                             call_data["found"] = found_count
                             if call_data["timestamp"]:
                                 call_data["duration_ms"] = int((item.get("timestamp", 0) - call_data["timestamp"]) * 1000)
                             tool_calls.append(call_data)
-                            del tool_call_map[tool_name]
+                            del tool_call_map[key]
 
                 # Add any tool calls that didn't get results
                 for call_data in tool_call_map.values():
@@ -423,6 +416,12 @@ def process_conversation_task(self, job_id: str):
         # Publish to global channel (for app-level WebSocket)
         publish_global_job_update(job.project_id, job.thread_id, job_id, "completed")
 
+        # Fold turns that left the history window into the thread summary
+        try:
+            compact_thread_task.delay(job.thread_id)
+        except Exception as e:
+            print(f"[Compaction] Could not queue compaction for thread {job.thread_id}: {e}")
+
         # Create notification ONLY if user isn't watching
         # If job was polled within last 10 seconds, user is watching
         should_notify = True
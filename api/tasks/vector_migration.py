@@ -0,0 +1,90 @@
+"""Background migration of resource vectors into the shared namespace.
+
+Moves resources indexed with one Pinecone namespace per resource into the
+shared namespace, where a project search is a single query scoped by a
+resource_id filter instead of one query per resource. Set
+VECTOR_LAYOUT=shared first so newly indexed resources land there too.
+
+Run with the worker:
+    celery -A api.tasks call migrate_vector_layout
+or directly:
+    python -m api.tasks.vector_migration
+"""
+
+from dotenv import load_dotenv
+
+from api.tasks import celery_app
+from api.database import SessionLocal, Resource
+from rag.vectorstore import SHARED_NAMESPACE
+
+# Load environment
+load_dotenv()
+
+
+def migrate_to_shared_namespace(limit: int = None, delete_source: bool = True) -> dict:
+    """Move per-resource namespaces into the shared namespace.
+
+    Each resource is copied, repointed to the shared namespace, and only then
+    has its old namespace deleted, so searches keep working throughout.
+    Resources indexed into legacy workspace/project namespaces (shared by
+    several resources) are skipped, since their vectors can't be attributed
+    to a single resource by namespace.
+
+    Args:
+        limit: Maximum number of resources to migrate in this run
+        delete_source: Delete the old namespace after a successful copy
+
+    Returns:
+        Dict with migrated/skipped/failed counts and vectors copied
+    """
+    from api.clients import get_vectorstore
+
+    vectorstore = get_vectorstore()
+    db = SessionLocal()
+    stats = {"migrated": 0, "skipped": 0, "failed": 0, "vectors": 0}
+
+    try:
+        pending = db.query(Resource).filter(
+            Resource.pinecone_namespace.isnot(None),
+            Resource.pinecone_namespace != SHARED_NAMESPACE
+        )
+        # Legacy namespaces are excluded in the query, so a limited run never
+        # spends its limit on resources it would skip
+        stats["skipped"] = pending.filter(Resource.pinecone_namespace != Resource.id).count()
+        query = pending.filter(Resource.pinecone_namespace == Resource.id).order_by(Resource.id)
+        if limit:
+            query = query.limit(limit)
+
+        for resource in query.all():
+            source_namespace = resource.pinecone_namespace
+            try:
+                copied = vectorstore.move_to_shared(resource.id, source_namespace)
+                resource.pinecone_namespace = SHARED_NAMESPACE
+                db.commit()
+
+                if delete_source:
+                    vectorstore.delete_resource(resource.id, source_namespace)
+
+                stats["migrated"] += 1
+                stats["vectors"] += copied
+                print(f"[Migration] Moved {copied} vectors for resource {resource.id} into '{SHARED_NAMESPACE}'")
+            except Exception as e:
+                db.rollback()
+                stats["failed"] += 1
+                print(f"[Migration] Failed to migrate resource {resource.id}: {e}")
+    finally:
+        db.close()
+
+    print(f"[Migration] Vector layout migration complete: {stats}")
+    return stats
+
+
+# Migrations outlive the 10 minute conversation limit; use `limit` to batch
+@celery_app.task(bind=True, name="migrate_vector_layout", time_limit=3600, soft_time_limit=3540)
+def migrate_vector_layout_task(self, limit: int = None, delete_source: bool = True):
+    """Celery task wrapper for migrate_to_shared_namespace."""
+    return migrate_to_shared_namespace(limit=limit, delete_source=delete_source)
+
+
+if __name__ == "__main__":
+    migrate_to_shared_namespace()
@@ -81,27 +81,24 @@ def extract_document_metadata(file_path: str) -> dict:
 
 
 def _extract_pdf_metadata(file_path: str) -> dict:
-    """Extract metadata from PDF files."""
+    """Extract metadata from PDF files.
+
+    Words are counted on every page; large PDFs are read in page shards
+    in parallel.
+    """
     try:
         import pypdf
+        from rag.docling_pool import map_page_shards, page_stats
+
         reader = pypdf.PdfReader(file_path)
         page_count = len(reader.pages)
 
-        # Extract text and count words (sample first 10 pages for speed)
         word_count = 0
         has_images = False
-        sample_pages = min(10, page_count)
-
-        for i in range(sample_pages):
-            page = reader.pages[i]
-            text = page.extract_text() or ""
-            word_count += len(text.split())
-            if page.images:
-                has_images = True
-
-        # Extrapolate word count if we only sampled
-        if sample_pages < page_count:
-            word_count = int(word_count * (page_count / sample_pages))
+        if page_count:
+            for shard_words, shard_images in map_page_shards(page_stats, file_path, page_count):
+                word_count += shard_words
+                has_images = has_images or shard_images
 
         return {
             "page_count": page_count,
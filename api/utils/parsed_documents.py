@@ -0,0 +1,155 @@
+"""Parsed-document artifacts shared by extraction, indexing and reading.
+
+A file is parsed (Docling for PDFs) once; the resulting Document with its
+page-aware TextSegments is stored gzip-compressed in the storage backend
+under the _parsed folder, keyed by the file's content hash and the parser
+version. Metadata extraction, chunking, summaries, reindexing and the
+read_resource tool all load the artifact instead of parsing again.
+"""
+
+import gzip
+import json
+from pathlib import Path
+
+from rag.ingest import Document, DocumentLoader, TextSegment
+
+# Bump when DocumentLoader output changes, so stale artifacts are re-parsed
+PARSER_VERSION = 1
+
+# Storage folder (in place of a project ID) holding the artifacts
+PARSED_FOLDER = "_parsed"
+
+
+def _artifact_name(content_hash: str) -> str:
+    return f"{content_hash}-v{PARSER_VERSION}.json.gz"
+
+
+def serialize_document(doc: Document) -> bytes:
+    """Compress a Document and its segments to gzip JSON."""
+    payload = {
+        "content": doc.content,
+        "source": doc.source,
+        "doc_type": doc.doc_type,
+        "metadata": doc.metadata,
+        # Segments as [text, page_number, section] to keep the artifact small
+        "segments": [[s.text, s.page_number, s.section] for s in doc.segments],
+    }
+    return gzip.compress(json.dumps(payload, ensure_ascii=False).encode("utf-8"), compresslevel=6)
+
+
+def deserialize_document(data: bytes) -> Document:
+    """Inverse of serialize_document."""
+    payload = json.loads(gzip.decompress(data).decode("utf-8"))
+    return Document(
+        content=payload["content"],
+        source=payload["source"],
+        doc_type=payload["doc_type"],
+        metadata=payload.get("metadata") or {},
+        segments=[TextSegment(text=t, page_number=p, section=s) for t, p, s in payload.get("segments", [])]
+    )
+
+
+def load_parsed_document(content_hash: str | None) -> Document | None:
+    """Load the stored artifact for a content hash, or None if there isn't one."""
+    if not content_hash:
+        return None
+    from api.storage import get_storage
+
+    storage = get_storage()
+    path = storage.path_for(PARSED_FOLDER, _artifact_name(content_hash))
+    try:
+        if not storage.exists(path):
+            return None
+        return deserialize_document(storage.read(path))
+    except Exception as e:
+        print(f"[ParsedDocs] Could not load artifact {path}: {e}")
+        return None
+
+
+def save_parsed_document(content_hash: str, doc: Document) -> str | None:
+    """Store a parsed document's artifact. Returns its path, or None on failure."""
+    from api.storage import get_storage
+
+    try:
+        data = serialize_document(doc)
+        path = get_storage().save(PARSED_FOLDER, _artifact_name(content_hash), data)
+        print(f"[ParsedDocs] Saved artifact {path} ({len(data)} bytes)")
+        return path
+    except Exception as e:
+        print(f"[ParsedDocs] Could not save artifact: {e}")
+        return None
+
+
+def delete_parsed_document(content_hash: str | None) -> None:
+    """Remove a content hash's artifact, if any."""
+    if not content_hash:
+        return
+    from api.storage import get_storage
+
+    storage = get_storage()
+    storage.delete(storage.path_for(PARSED_FOLDER, _artifact_name(content_hash)))
+
+
+def get_or_parse_document(content_hash: str | None, local_path: str) -> Document:
+    """The parsed document for a file, from its artifact or by parsing it once.
+
+    Args:
+        content_hash: SHA256 of the file (None skips the artifact)
+        local_path: Local copy of the file, parsed on a cache miss
+
+    Raises:
+        ValueError: If the loader doesn't support the file type
+    """
+    doc = load_parsed_document(content_hash)
+    if doc is not None:
+        print(f"[ParsedDocs] Reusing parsed document for {content_hash[:12]}")
+        return doc
+
+    doc = DocumentLoader().load(local_path)[0]
+    if content_hash:
+        save_parsed_document(content_hash, doc)
+    return doc
+
+
+def parsed_document_metadata(doc: Document, local_path: str | None = None) -> dict:
+    """Stage 2 metadata for a RAG document, derived from its parsed form.
+
+    Args:
+        doc: Parsed document
+        local_path: Local copy of the file, for PDF page count and version
+
+    Returns:
+        Dict in the shape of extract_document_metadata's
+    """
+    if doc.doc_type == "docx":
+        # Table and paragraph counts aren't kept in the parsed form
+        from api.utils.extraction import extract_document_metadata
+        return extract_document_metadata(local_path)
+
+    lines = doc.content.split("\n")
+    metadata = {
+        "word_count": len(doc.content.split()),
+        "page_count": None,
+    }
+
+    if doc.doc_type == "pdf":
+        pages = [s.page_number for s in doc.segments if s.page_number]
+        metadata["page_count"] = max(pages) if pages else None
+        # Docling's markdown marks pictures with an image comment and
+        # renders tables as pipe rows
+        metadata["has_images"] = "<!-- image -->" in doc.content
+        metadata["has_tables"] = any(line.lstrip().startswith("|") for line in lines)
+        metadata["pdf_version"] = None
+        if local_path and Path(local_path).exists():
+            try:
+                import pypdf
+                reader = pypdf.PdfReader(local_path)
+                metadata["page_count"] = len(reader.pages)
+                metadata["pdf_version"] = reader.pdf_header if hasattr(reader, 'pdf_header') else None
+            except Exception:
+                pass
+    else:
+        metadata["line_count"] = len(lines)
+        metadata["char_count"] = len(doc.content)
+
+    return metadata
@@ -0,0 +1,92 @@
+"""Streaming file uploads - hash, sniff and store in fixed-size blocks."""
+
+import hashlib
+import os
+from dataclasses import dataclass
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from api.storage import StorageBackend, StorageWriter
+from api.utils.extraction import detect_mime_type
+
+# Bytes read from the upload per block
+UPLOAD_BLOCK_SIZE = 1024 * 1024
+
+# Largest accepted upload (bytes)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(1024 * 1024 * 1024)))
+
+# Bytes of the file's start used for MIME detection
+MIME_SNIFF_BYTES = 2048
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(status_code=413, detail=f"File exceeds the {max_bytes / (1024 * 1024):.0f} MB upload limit")
+
+
+@dataclass
+class StreamedUpload:
+    """An upload staged in storage, with its Stage 1 metadata.
+
+    The file only appears at its final path once commit() is called, so a
+    duplicate upload can be discarded without touching an existing file.
+    """
+    writer: StorageWriter
+    size: int
+    content_hash: str
+    mime_type: str
+
+    def commit(self) -> str:
+        """Move the file to its final path and return the storage path/key."""
+        return self.writer.commit()
+
+    def discard(self) -> None:
+        """Drop the staged file."""
+        self.writer.abort()
+
+
+async def stream_upload(
+    file: UploadFile,
+    storage: StorageBackend,
+    project_id: str,
+    filename: str,
+    max_bytes: int = None
+) -> StreamedUpload:
+    """Stage an upload in storage block by block.
+
+    SHA-256 and the MIME type are computed as the blocks pass through, so
+    memory use stays at one block per upload whatever the file size.
+    Storage writes run in the threadpool to keep the event loop free.
+
+    Returns:
+        The staged upload - commit() or discard() it
+
+    Raises:
+        HTTPException: 413 if the upload is larger than max_bytes
+            (default MAX_UPLOAD_BYTES); nothing is stored
+    """
+    max_bytes = max_bytes or MAX_UPLOAD_BYTES
+    if file.size is not None and file.size > max_bytes:
+        raise _too_large(max_bytes)
+
+    sha256 = hashlib.sha256()
+    head = b""
+    writer = await run_in_threadpool(storage.open_writer, project_id, filename)
+    try:
+        while block := await file.read(UPLOAD_BLOCK_SIZE):
+            if writer.size + len(block) > max_bytes:
+                raise _too_large(max_bytes)
+            if len(head) < MIME_SNIFF_BYTES:
+                head += block[:MIME_SNIFF_BYTES - len(head)]
+            sha256.update(block)
+            await run_in_threadpool(writer.write, block)
+    except BaseException:
+        writer.abort()
+        raise
+
+    return StreamedUpload(
+        writer=writer,
+        size=writer.size,
+        content_hash=sha256.hexdigest(),
+        mime_type=detect_mime_type(head, filename)
+    )
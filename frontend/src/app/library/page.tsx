@@ -302,6 +302,8 @@ export default function LibraryPage() {
   const [chunks, setChunks] = useState<ResourceChunk[]>([]);
   const [chunksLoading, setChunksLoading] = useState(false);
   const [chunksError, setChunksError] = useState<string | null>(null);
+  const [chunksTotal, setChunksTotal] = useState(0);
+  const [chunksCursor, setChunksCursor] = useState<string | null>(null);
   const [activeTab, setActiveTab] = useState("details");
 
   const fetchData = async () => {
@@ -371,12 +373,14 @@ export default function LibraryPage() {
     return project?.name || projectId.slice(0, 8);
   };
 
-  const loadChunks = async (resourceId: string) => {
+  const loadChunks = async (resourceId: string, cursor?: string) => {
     setChunksLoading(true);
     setChunksError(null);
     try {
-      const response = await getResourceChunks(resourceId);
-      setChunks(response.chunks);
+      const response = await getResourceChunks(resourceId, 100, cursor);
+      setChunks(prev => (cursor ? [...prev, ...response.chunks] : response.chunks));
+      setChunksTotal(response.total_chunks);
+      setChunksCursor(response.next_cursor);
     } catch (error) {
       console.error("Failed to load chunks:", error);
       setChunksError(error instanceof Error ? error.message : "Failed to load chunks");
@@ -811,7 +815,7 @@ export default function LibraryPage() {
               </TabsContent>
 
               <TabsContent value="chunks" className="mt-4">
-                {chunksLoading ? (
+                {chunksLoading && chunks.length === 0 ? (
                   <div className="flex items-center justify-center py-8">
                     <p className="text-muted-foreground">Loading chunks...</p>
                   </div>
@@ -837,7 +841,7 @@ export default function LibraryPage() {
                 ) : (
                   <div className="space-y-4">
                     <div className="text-sm text-muted-foreground">
-                      {chunks.length} chunk{chunks.length !== 1 ? "s" : ""} from RAG indexing
+                      {chunksCursor ? `${chunks.length} of ${chunksTotal}` : chunks.length} chunk{chunksTotal !== 1 ? "s" : ""} from RAG indexing
                     </div>
                     <div className="space-y-3 max-h-[400px] overflow-y-auto">
                       {chunks.map((chunk, index) => (
@@ -872,6 +876,17 @@ export default function LibraryPage() {
                         </div>
                       ))}
                     </div>
+                    {chunksCursor && selectedResource && (
+                      <Button
+                        variant="outline"
+                        size="sm"
+                        className="w-full"
+                        disabled={chunksLoading}
+                        onClick={() => loadChunks(selectedResource.id, chunksCursor)}
+                      >
+                        {chunksLoading ? "Loading..." : "Load more chunks"}
+                      </Button>
+                    )}
                   </div>
                 )}
               </TabsContent>
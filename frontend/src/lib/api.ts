@@ -1,3 +1,5 @@
+import { Sha256 } from "@/lib/sha256";
+
 // Hardcode production URL as fallback since env var isn't being picked up correctly
 const API_BASE = process.env.NEXT_PUBLIC_API_URL ||
   (typeof window !== "undefined" && window.location.hostname === "akleao.com"
@@ -243,12 +245,137 @@ export async function generateThreadTitle(
 }
 
 // Resources
+// Files above this size are hashed slice by slice instead of read whole
+const HASH_SLICE_SIZE = 8 * 1024 * 1024;
+
+async function sha256Hex(file: File): Promise<string> {
+  // crypto.subtle is only available in secure contexts, and needs the whole file in memory
+  if (file.size <= HASH_SLICE_SIZE && typeof crypto !== "undefined" && crypto.subtle) {
+    const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    return Array.from(new Uint8Array(digest))
+      .map((b) => b.toString(16).padStart(2, "0"))
+      .join("");
+  }
+  const hasher = new Sha256();
+  for (let offset = 0; offset < file.size; offset += HASH_SLICE_SIZE) {
+    const slice = file.slice(offset, offset + HASH_SLICE_SIZE);
+    hasher.update(new Uint8Array(await slice.arrayBuffer()));
+  }
+  return hasher.digestHex();
+}
+
+interface UploadPreflight {
+  status: "linked" | "upload_required";
+  resource: Resource | null;
+  upload_token: string | null;
+}
+
+interface UploadSession {
+  upload_id: string | null;
+  status: "open" | "completed" | "aborted" | "linked";
+  part_size: number | null;
+  part_count: number | null;
+  received_parts: number[];
+  resource: Resource | null;
+}
+
+// Files above this size go through resumable chunked uploads
+const RESUMABLE_UPLOAD_THRESHOLD = 64 * 1024 * 1024;
+const PART_RETRIES = 3;
+
+async function uploadResourceResumable(
+  projectId: string,
+  file: File,
+  sha256: string
+): Promise<Resource> {
+  const base = `${API_BASE}/projects/${projectId}/resources/uploads`;
+  // Remember the session so a reload can resume where it stopped
+  const storageKey = `upload:${projectId}:${sha256}`;
+  let session: UploadSession | null = null;
+
+  const savedId = localStorage.getItem(storageKey);
+  if (savedId) {
+    const res = await fetchWithAuth(`${base}/${savedId}`);
+    if (res.ok) {
+      session = await res.json();
+      if (session?.status !== "open") session = null;
+    }
+  }
+  if (!session) {
+    const res = await fetchWithAuth(base, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ filename: file.name, sha256, size: file.size }),
+    });
+    if (!res.ok) {
+      const errorData = await res.json().catch(() => ({}));
+      throw new Error(errorData.detail || "Failed to start upload");
+    }
+    session = await res.json();
+  }
+  if (session!.status === "linked" && session!.resource) return session!.resource;
+
+  const { upload_id, part_size, part_count } = session as UploadSession & {
+    upload_id: string;
+    part_size: number;
+    part_count: number;
+  };
+  localStorage.setItem(storageKey, upload_id);
+
+  const received = new Set(session!.received_parts);
+  for (let part = 1; part <= part_count; part++) {
+    if (received.has(part)) continue;
+    const body = file.slice((part - 1) * part_size, part * part_size);
+    for (let attempt = 1; ; attempt++) {
+      const res = await fetchWithAuth(`${base}/${upload_id}/parts/${part}`, {
+        method: "PUT",
+        headers: { "Content-Type": "application/octet-stream" },
+        body,
+      }).catch(() => null);
+      if (res?.ok) break;
+      if (attempt >= PART_RETRIES) throw new Error(`Upload failed at part ${part} of ${part_count}`);
+    }
+  }
+
+  const res = await fetchWithAuth(`${base}/${upload_id}/complete`, { method: "POST" });
+  if (!res.ok) {
+    const errorData = await res.json().catch(() => ({}));
+    throw new Error(errorData.detail || "Failed to complete upload");
+  }
+  localStorage.removeItem(storageKey);
+  return res.json();
+}
+
 export async function uploadResource(
   projectId: string,
   file: File
 ): Promise<Resource> {
+  // Send the hash first - a file the library already has is linked without uploading it
+  let uploadToken: string | null = null;
+  const sha256 = await sha256Hex(file).catch(() => null);
+  if (sha256 && file.size > RESUMABLE_UPLOAD_THRESHOLD) {
+    // Large files: chunked upload that survives dropped connections
+    return uploadResourceResumable(projectId, file, sha256);
+  }
+  if (sha256) {
+    const preflight = await fetchWithAuth(
+      `${API_BASE}/projects/${projectId}/resources/preflight`,
+      {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ filename: file.name, sha256, size: file.size }),
+      }
+    );
+    if (preflight.ok) {
+      const result: UploadPreflight = await preflight.json();
+      if (result.status === "linked" && result.resource) return result.resource;
+      uploadToken = result.upload_token;
+    }
+  }
+
   const formData = new FormData();
   formData.append("file", file);
+  if (uploadToken) formData.append("upload_token", uploadToken);
 
   const res = await fetchWithAuth(`${API_BASE}/projects/${projectId}/resources`, {
     method: "POST",
@@ -440,15 +567,18 @@ export interface ResourceChunksResponse {
   namespace: string;
   total_chunks: number;
   chunks: ResourceChunk[];
+  next_cursor: string | null;
 }
 
 // Get the RAG chunks for a resource (for debugging)
 export async function getResourceChunks(
   resourceId: string,
-  limit: number = 500
+  limit: number = 100,
+  cursor?: string
 ): Promise<ResourceChunksResponse> {
   const params = new URLSearchParams();
   params.set("limit", limit.toString());
+  if (cursor) params.set("cursor", cursor);
 
   const res = await fetchWithAuth(`${API_BASE}/resources/${resourceId}/chunks?${params.toString()}`);
   if (!res.ok) {
@@ -469,7 +599,7 @@ export interface ConversationMessage {
 
 // Tool call event for streaming
 export interface ToolCallEvent {
-  id?: string;
+  tool_call_id?: string;
   tool?: string;
   name?: string;
   query?: string;
@@ -494,6 +624,9 @@ export interface FindingSavedEvent {
 export interface UsageEvent {
   input_tokens: number;
   output_tokens: number;
+  // Prompt-cache tokens (not included in input_tokens)
+  cache_read_input_tokens?: number;
+  cache_creation_input_tokens?: number;
   total_tokens: number;
 }
 
@@ -598,6 +731,8 @@ export async function queryThreadStream(
           onUsage({
             input_tokens: data.input_tokens,
             output_tokens: data.output_tokens,
+            cache_read_input_tokens: data.cache_read_input_tokens,
+            cache_creation_input_tokens: data.cache_creation_input_tokens,
             total_tokens: data.total_tokens,
           });
         } else if (data.type === "sources") {
@@ -49,7 +49,7 @@ export interface ActivityItem {
   tool?: string;  // Tool name
   query?: string; // Search query or resource name for display
   input?: Record<string, unknown>;
-  // For tool results:
+  // For tool calls and results (pairs a result with its call):
   tool_call_id?: string;
   found?: number;
   // For phase changes:
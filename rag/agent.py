@@ -5,15 +5,19 @@ import os
 import re
 import requests
 from typing import Iterator, Callable, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from anthropic import Anthropic
 
 from .retriever import Retriever, RetrievalResult
-from .tools import ToolContext, ToolExecutor, get_registry
+from .tools import ToolCall, ToolContext, ToolExecutor, SpeculativeSearch, get_registry
+from .intent_router import IntentMatch, get_intent_router, get_plan_cache, ACKNOWLEDGMENTS as INTENT_ACKNOWLEDGMENTS
 
 # Beta header for interleaved thinking with tool use
 INTERLEAVED_THINKING_BETA = "interleaved-thinking-2025-05-14"
 
+# Prompt-cache breakpoint: the request prefix up to the marked block is cached
+CACHE_CONTROL = {"type": "ephemeral"}
+
 
 @dataclass
 class AgentResponse:
@@ -80,6 +84,9 @@ class RequestPlanV3(RequestPlanV2):
     # Proactive suggestions (for exploratory mode)
     suggested_followups: list[str] | None = None  # Questions/directions to explore
 
+    # Which tier produced the plan: "regex", "cache", "local", "llm" or "fallback"
+    route_source: str = "llm"
+
 
 # Patterns for simple queries that don't need thinking
 SIMPLE_QUERY_PATTERNS = [
@@ -153,7 +160,8 @@ def pre_route(message: str) -> RequestPlanV3 | None:
                             needs_tools=False,
                             direct_response=text,
                             intent_mode="action",
-                            response_style="conversational"
+                            response_style="conversational",
+                            route_source="regex"
                         )
                     else:
                         # Tool patterns: text is acknowledgment
@@ -166,7 +174,8 @@ def pre_route(message: str) -> RequestPlanV3 | None:
                             needs_tools=True,
                             direct_response=None,
                             intent_mode="action",
-                            response_style="structured"
+                            response_style="structured",
+                            route_source="regex"
                         )
 
     return None  # Fall through to LLM router
@@ -498,9 +507,10 @@ class ResourceInfo:
     file_path: str | None = None  # Path to the file for analysis
     # For images
     dimensions: str | None = None  # e.g., "1920x1080"
+    content_hash: str | None = None  # Key of the parsed-document artifact (documents)
 
 
-def build_system_prompt(
+def _system_prompt_sections(
     has_documents: bool,
     has_web_search: bool,
     resources: list[ResourceInfo] = None,
@@ -508,9 +518,15 @@ def build_system_prompt(
     context_only: bool = False,
     has_data_files: bool = False,
     has_images: bool = False,
-    response_style: str = None,  # V4 Feature: "conversational", "structured", "report"
-) -> str:
-    """Build system prompt based on available tools, resources, and user instructions."""
+    response_style: str = None,
+) -> list[list[str]]:
+    """System prompt parts, grouped from most to least stable.
+
+    Returns [instructions, resource catalog, response style]: the first
+    changes only with workspace settings, the second when resources change,
+    the third can change every turn. Resources are listed in name order so
+    the same workspace always produces the same text.
+    """
     prompt_parts = [BASE_SYSTEM_PROMPT]
 
     # Add context-only mode instructions (highest priority constraint)
@@ -543,8 +559,10 @@ You are in CONTEXT-ONLY mode. This means:
     if tools_desc:
         prompt_parts.append(f"Available tools: {', '.join(tools_desc)}.")
 
+    catalog_parts = []
     # Add workspace resources section, grouped by type for clarity
     if resources:
+        resources = sorted(resources, key=lambda r: ((r.name or "").lower(), r.id or ""))
         ready_resources = [r for r in resources if r.status == "ready"]
         pending_resources = [r for r in resources if r.status in ("pending", "indexing")]
 
@@ -588,15 +606,92 @@ You are in CONTEXT-ONLY mode. This means:
                 for r in pending_resources:
                     resource_section += f"\n  - {r.name} ({r.type})"
 
-            prompt_parts.append(resource_section)
+            catalog_parts.append(resource_section)
     elif has_documents is False and has_data_files is False and has_images is False:
-        prompt_parts.append("\n\nWorkspace Resources: None yet. The user hasn't uploaded any files.")
+        catalog_parts.append("\n\nWorkspace Resources: None yet. The user hasn't uploaded any files.")
 
+    style_parts = []
     # V4 Feature: Add response style instructions
     if response_style and response_style in STYLE_INSTRUCTIONS:
-        prompt_parts.append(STYLE_INSTRUCTIONS[response_style])
+        style_parts.append(STYLE_INSTRUCTIONS[response_style])
+
+    return [prompt_parts, catalog_parts, style_parts]
+
+
+def build_system_prompt(
+    has_documents: bool,
+    has_web_search: bool,
+    resources: list[ResourceInfo] = None,
+    system_instructions: str = None,
+    context_only: bool = False,
+    has_data_files: bool = False,
+    has_images: bool = False,
+    response_style: str = None,  # V4 Feature: "conversational", "structured", "report"
+) -> str:
+    """Build system prompt based on available tools, resources, and user instructions."""
+    sections = _system_prompt_sections(
+        has_documents, has_web_search, resources, system_instructions,
+        context_only, has_data_files, has_images, response_style
+    )
+    return "\n".join(part for section in sections for part in section)
+
 
-    return "\n".join(prompt_parts)
+def build_system_blocks(
+    has_documents: bool,
+    has_web_search: bool,
+    resources: list[ResourceInfo] = None,
+    system_instructions: str = None,
+    context_only: bool = False,
+    has_data_files: bool = False,
+    has_images: bool = False,
+    response_style: str = None,
+) -> list[dict]:
+    """The system prompt as text blocks with a prompt-cache breakpoint.
+
+    Same text as build_system_prompt. The breakpoint goes after the
+    resource catalog, so the tools, instructions and catalog are read from
+    the cache; the per-turn response style follows it uncached.
+    """
+    instructions, catalog, style = _system_prompt_sections(
+        has_documents, has_web_search, resources, system_instructions,
+        context_only, has_data_files, has_images, response_style
+    )
+    blocks = [{"type": "text", "text": "\n".join(instructions + catalog)}]
+    blocks[-1]["cache_control"] = CACHE_CONTROL
+    if style:
+        blocks.append({"type": "text", "text": "\n".join(style)})
+    return blocks
+
+
+def with_cache_breakpoints(messages: list[dict], history_len: int = 0) -> list[dict]:
+    """Copy of messages with prompt-cache breakpoints for one API call.
+
+    Marks the last message (so the next loop iteration reads this call's
+    prefix) and the last message of the prior conversation (so the next
+    turn of the thread reads it). The input list is not modified, which
+    keeps breakpoints from accumulating across iterations (the API allows 4,
+    two of which go to the tools and system prompt).
+
+    Args:
+        messages: Messages for the call
+        history_len: Number of leading messages from earlier turns
+    """
+    marked = list(messages)
+    for index in {len(marked) - 1, history_len - 1}:
+        if index < 0 or index >= len(marked):
+            continue
+        message = marked[index]
+        content = message.get("content")
+        if isinstance(content, str):
+            if not content:
+                continue
+            content = [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+        elif isinstance(content, list) and content and isinstance(content[-1], dict):
+            content = content[:-1] + [{**content[-1], "cache_control": CACHE_CONTROL}]
+        else:
+            continue
+        marked[index] = {**message, "content": content}
+    return marked
 
 
 def build_tools(
@@ -1167,14 +1262,15 @@ class Agent:
         max_tokens: int = 16000,  # Increased for extended thinking
         tavily_api_key: str = None,
         thinking_budget: int = 4096,  # Budget for extended thinking tokens
-        version: str = None  # Agent version: "v1" or "v2"
+        version: str = None,  # Agent version: "v1" or "v2"
+        client: Anthropic = None  # Shared client - avoids per-request setup
     ):
         self.retriever = retriever
         self.model = model
         self.max_tokens = max_tokens
         self.thinking_budget = thinking_budget
         self.anthropic_api_key = api_key or os.getenv("ANTHROPIC_API_KEY")
-        self.client = Anthropic(api_key=self.anthropic_api_key)
+        self.client = client or Anthropic(api_key=self.anthropic_api_key)
         self.tavily_api_key = tavily_api_key or os.getenv("TAVILY_API_KEY")
         self.version = version or AGENT_VERSION
 
@@ -1530,6 +1626,50 @@ class Agent:
                 is_followup=has_history
             )
 
+    def _thinking_budget_v3(self, complexity: str, intent_mode: str) -> int:
+        """Thinking budget for a V3 plan's complexity and intent."""
+        if complexity in ("instant", "simple"):
+            return 0
+        if complexity == "complex":
+            return self.thinking_budget * 2
+        if intent_mode == "exploratory":
+            # Exploratory queries benefit from more thinking
+            return int(self.thinking_budget * 1.5)
+        return self.thinking_budget
+
+    def _plan_from_intent(
+        self,
+        message: str,
+        match: IntentMatch,
+        resources: list[ResourceInfo] = None
+    ) -> RequestPlanV3:
+        """Build a V3 plan from a local intent router match."""
+        label = match.label
+
+        # Python-first resource matching, as the LLM router gets
+        matched_resource, matched_resource_id, resource_confidence = None, None, 0.0
+        if resources and label.search_strategy != "none":
+            name, resource_id, confidence = match_query_to_resource(message, resources)
+            if name and confidence >= 0.7:
+                matched_resource, matched_resource_id, resource_confidence = name, resource_id, confidence
+
+        return RequestPlanV3(
+            category=label.category,
+            acknowledgment=INTENT_ACKNOWLEDGMENTS.get(label.category, ""),
+            thinking_budget=self._thinking_budget_v3(label.complexity, label.intent_mode),
+            search_strategy=label.search_strategy,
+            complexity=label.complexity,
+            needs_tools=label.search_strategy != "none" or label.category == "resource_query",
+            matched_resource=matched_resource,
+            matched_resource_id=matched_resource_id,
+            resource_confidence=resource_confidence,
+            direct_response=match.direct_response,
+            intent_mode=label.intent_mode,
+            intent_confidence=match.confidence,
+            response_style=label.response_style,
+            route_source="local"
+        )
+
     def _plan_request_v3(
         self,
         message: str,
@@ -1599,17 +1739,7 @@ class Agent:
 
             # Determine thinking budget based on complexity and intent
             intent_mode = plan_data.get("intent_mode", "action")
-            if complexity == "instant":
-                thinking_budget = 0
-            elif complexity == "simple":
-                thinking_budget = 0
-            elif complexity == "complex":
-                thinking_budget = self.thinking_budget * 2
-            elif intent_mode == "exploratory":
-                # Exploratory queries benefit from more thinking
-                thinking_budget = int(self.thinking_budget * 1.5)
-            else:
-                thinking_budget = self.thinking_budget
+            thinking_budget = self._thinking_budget_v3(complexity, intent_mode)
 
             # Determine if tools are needed
             search_strategy = plan_data.get("search_strategy", "none")
@@ -1684,7 +1814,8 @@ class Agent:
                         needs_tools=True,
                         intent_mode="action",
                         intent_confidence=0.9,
-                        response_style="structured"
+                        response_style="structured",
+                        route_source="fallback"
                     )
 
             # Check for social patterns
@@ -1702,7 +1833,8 @@ class Agent:
                         is_followup=False,
                         intent_mode="action",
                         intent_confidence=0.9,
-                        response_style="conversational"
+                        response_style="conversational",
+                        route_source="fallback"
                     )
 
             # Detect exploratory vs action from patterns
@@ -1737,9 +1869,67 @@ class Agent:
                 is_followup=has_history,
                 intent_mode="exploratory" if is_exploratory else "action",
                 intent_confidence=0.5,
-                response_style="conversational" if is_exploratory else "structured"
+                response_style="conversational" if is_exploratory else "structured",
+                route_source="fallback"
             )
 
+    def _plan_request_v3_cached(
+        self,
+        message: str,
+        has_documents: bool = True,
+        has_web_search: bool = False,
+        resources: list[ResourceInfo] = None,
+        conversation_history: list[dict] = None,
+        router_model: str = "claude-3-5-haiku-latest"
+    ) -> RequestPlanV3:
+        """V3 routing through the plan cache and the local intent router.
+
+        Order: cached plan for the same message, resources and recent turns;
+        then a confident nearest-neighbour match over exemplar embeddings;
+        then the Haiku router, whose plan is learned as a new exemplar.
+        """
+        plan_cache = get_plan_cache()
+        cache_key = plan_cache.key(
+            message, resources, has_documents, has_web_search, conversation_history
+        )
+        cached = plan_cache.get(cache_key)
+        if cached:
+            plan = RequestPlanV3(**{**cached, "route_source": "cache"})
+            print(f"[Router V3] Plan cache hit: category={plan.category}")
+            return plan
+
+        router = None
+        embedder = getattr(self.retriever, "embedder", None)
+        if embedder is not None:
+            try:
+                router = get_intent_router(embedder)
+                match = router.route(message, has_documents, has_web_search)
+            except Exception as e:
+                print(f"[Router V3] Local router failed: {e}")
+                match = None
+            if match:
+                plan = self._plan_from_intent(message, match, resources)
+                plan.is_followup = False
+                print(f"[Router V3] Local route: category={plan.category} (similarity={match.similarity}, agreement={match.confidence})")
+                plan_cache.put(cache_key, asdict(plan))
+                return plan
+
+        plan = self._plan_request_v3(
+            message=message,
+            has_documents=has_documents,
+            has_web_search=has_web_search,
+            resources=resources,
+            conversation_history=conversation_history,
+            router_model=router_model
+        )
+        if plan.route_source == "llm":
+            # The cache is shared across projects; a written reply is this user's
+            if not plan.direct_response:
+                plan_cache.put(cache_key, asdict(plan))
+            if router is not None:
+                router.learn(message, plan)
+        return plan
+
     def plan_request(
         self,
         message: str,
@@ -1763,7 +1953,7 @@ class Agent:
                 print(f"[Pre-Router] No match for: {message[:50]!r}")
 
         if self.version == "v3":
-            return self._plan_request_v3(
+            return self._plan_request_v3_cached(
                 message=message,
                 has_documents=has_documents,
                 has_web_search=has_web_search,
@@ -1798,7 +1988,8 @@ class Agent:
         top_k: int = 5,
         has_documents: bool = True,
         resources: list[ResourceInfo] = None,
-        system_instructions: str = None
+        system_instructions: str = None,
+        resource_ids: list[str] = None
     ) -> AgentResponse:
         """Have a conversation turn with the agent."""
         messages = list(conversation_history or [])
@@ -1835,7 +2026,8 @@ class Agent:
                                 query=query,
                                 top_k=top_k,
                                 namespace=namespace,
-                                namespaces=namespaces
+                                namespaces=namespaces,
+                                resource_ids=resource_ids
                             )
                             all_sources.extend(results)
                             tool_results.append({
@@ -1886,6 +2078,7 @@ class Agent:
         has_data_files: bool = False,
         has_images: bool = False,
         fetch_resources_callback: Callable[[], list[ResourceInfo]] = None,
+        resource_ids: list[str] = None,
     ) -> Iterator[AgentEvent]:
         """Stream a conversation turn with events for UI updates.
 
@@ -1895,6 +2088,8 @@ class Agent:
         Args:
             tool_context: ToolContext with database session, project info, and API clients.
                           Required for tool execution. If not provided, tools won't work.
+            resource_ids: Ready resource IDs, used to scope searches of the shared
+                          vector namespace (legacy search path only).
         """
         messages = list(conversation_history or [])
         messages.append({"role": "user", "content": message})
@@ -1928,6 +2123,18 @@ class Agent:
             tools = build_tools(has_documents, has_web_search, can_save_findings, has_data_files, has_images, version=self.version)
             executor = None
 
+        # Search the documents for the raw message while the router runs; the
+        # first matching search_documents call is served from it
+        if tool_context:
+            tool_context.speculative_search = None
+            instant_plan = pre_route(message) if self.version == "v3" else None
+            can_search = any(tool["name"] == "search_documents" for tool in tools)
+            if can_search and not (instant_plan and not instant_plan.needs_tools):
+                try:
+                    tool_context.speculative_search = SpeculativeSearch(message, tool_context)
+                except Exception as e:
+                    print(f"[Agent] Speculative search not started: {e}")
+
         # Step 1: Plan the request using the router
         plan = self.plan_request(
             message=message,
@@ -1962,6 +2169,7 @@ class Agent:
             plan_event_data["intent_confidence"] = plan.intent_confidence
             plan_event_data["response_style"] = plan.response_style
             plan_event_data["suggested_followups"] = plan.suggested_followups
+            plan_event_data["route_source"] = plan.route_source
 
         yield AgentEvent("plan", plan_event_data)
 
@@ -2092,11 +2300,16 @@ class Agent:
         response_style = None
         if isinstance(plan, RequestPlanV3):
             response_style = plan.response_style
-        system_prompt = build_system_prompt(
+        system_prompt = build_system_blocks(
             has_documents, has_web_search, resources, system_instructions,
             context_only, has_data_files, has_images, response_style
         )
 
+        # Prompt caching: the tools are the first part of the cached prefix
+        if tools:
+            tools = tools[:-1] + [{**tools[-1], "cache_control": CACHE_CONTROL}]
+        history_len = len(conversation_history or [])
+
         # Build thinking config based on the plan's complexity
         thinking_config = None
         if enable_thinking and plan.thinking_budget > 0:
@@ -2108,6 +2321,8 @@ class Agent:
         # Token usage tracking across the agentic loop
         total_input_tokens = 0
         total_output_tokens = 0
+        total_cache_read_tokens = 0
+        total_cache_write_tokens = 0
 
         # Agentic loop
         while True:
@@ -2125,7 +2340,7 @@ class Agent:
                 "model": self.model,
                 "max_tokens": self.max_tokens,
                 "system": system_prompt,
-                "messages": messages,
+                "messages": with_cache_breakpoints(messages, history_len),
             }
             if tools:
                 api_kwargs["tools"] = tools
@@ -2182,38 +2397,45 @@ class Agent:
                 if hasattr(final_response, 'usage') and final_response.usage:
                     total_input_tokens += final_response.usage.input_tokens
                     total_output_tokens += final_response.usage.output_tokens
+                    # input_tokens excludes the cached prefix, read or written
+                    total_cache_read_tokens += getattr(final_response.usage, "cache_read_input_tokens", None) or 0
+                    total_cache_write_tokens += getattr(final_response.usage, "cache_creation_input_tokens", None) or 0
 
             if stop_reason == "tool_use":
                 # Process tool calls
                 tool_results = []
                 thinking_blocks = []
 
+                # Use new ToolExecutor if available: the turn's tool calls run
+                # concurrently and events stream as each one finishes
+                executed_calls = {}
+                if executor:
+                    calls = [
+                        ToolCall(block.name, block.id, block.input)
+                        for block in response_content
+                        if block.type == "tool_use"
+                    ]
+                    for event in executor.execute_many(calls):
+                        yield AgentEvent(event.type, event.data)
+                    executed_calls = {call.tool_use_id: call for call in calls}
+
                 for block in response_content:
                     # Preserve thinking blocks for the conversation
                     if block.type == "thinking":
                         thinking_blocks.append(block)
                     elif block.type == "tool_use":
-                        # Use new ToolExecutor if available
                         if executor:
-                            result_content, events, metadata = executor.execute(
-                                block.name,
-                                block.id,
-                                block.input
-                            )
-
-                            # Emit events
-                            for event in events:
-                                yield AgentEvent(event.type, event.data)
+                            call = executed_calls[block.id]
 
                             # Handle sources from document search
-                            if block.name == "search_documents" and "sources" in metadata:
-                                all_sources.extend(metadata["sources"])
+                            if block.name == "search_documents" and "sources" in call.metadata:
+                                all_sources.extend(call.metadata["sources"])
 
-                            # Append tool result
+                            # Append tool result (in Claude's original order)
                             tool_results.append({
                                 "type": "tool_result",
                                 "tool_use_id": block.id,
-                                "content": result_content
+                                "content": call.content
                             })
 
                         # Legacy fallback (when no tool_context provided)
@@ -2230,7 +2452,8 @@ class Agent:
                                 query=query,
                                 top_k=top_k,
                                 namespace=namespace,
-                                namespaces=namespaces
+                                namespaces=namespaces,
+                                resource_ids=resource_ids
                             )
                             all_sources.extend(results)
 
@@ -2705,14 +2928,21 @@ class Agent:
                                             result_content = f"'{resource_name}' is an image file. Use the view_image tool with a question to analyze its content."
 
                                         else:
-                                            # For documents/text files, read the content
-                                            with open(resource_info.file_path, "r", encoding="utf-8", errors="ignore") as f:
-                                                lines = []
-                                                for i, line in enumerate(f):
-                                                    if i >= preview_lines:
-                                                        break
-                                                    lines.append(line.rstrip())
+                                            # For documents, prefer the parsed text (e.g. a PDF's markdown)
+                                            from api.utils.parsed_documents import load_parsed_document
+                                            document = load_parsed_document(resource_info.content_hash)
+                                            if document is not None:
+                                                lines = [line.rstrip() for line in document.content.split("\n")[:preview_lines]]
                                                 content = "\n".join(lines)
+                                            else:
+                                                # For text files, read the content
+                                                with open(resource_info.file_path, "r", encoding="utf-8", errors="ignore") as f:
+                                                    lines = []
+                                                    for i, line in enumerate(f):
+                                                        if i >= preview_lines:
+                                                            break
+                                                        lines.append(line.rstrip())
+                                                    content = "\n".join(lines)
 
                                             result_content = f"## {resource_name}\n\n**Content preview ({len(lines)} lines):**\n```\n{content}\n```"
 
@@ -2796,10 +3026,15 @@ class Agent:
                 yield AgentEvent("status", {"status": "responding"})
 
                 # Emit token usage
+                print(f"[Agent] Prompt cache: {total_cache_read_tokens} tokens read, {total_cache_write_tokens} written")
                 yield AgentEvent("usage", {
                     "input_tokens": total_input_tokens,
                     "output_tokens": total_output_tokens,
-                    "total_tokens": total_input_tokens + total_output_tokens
+                    "cache_read_input_tokens": total_cache_read_tokens,
+                    "cache_creation_input_tokens": total_cache_write_tokens,
+                    "total_tokens": (
+                        total_input_tokens + total_cache_read_tokens + total_cache_write_tokens + total_output_tokens
+                    )
                 })
 
                 yield AgentEvent("done", {})
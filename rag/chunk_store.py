@@ -0,0 +1,89 @@
+"""Chunk store - chunk text and rich metadata kept outside the vector index."""
+
+from abc import ABC, abstractmethod
+
+# Metadata kept on vectors so searches can filter and results can be fused;
+# everything else (content, page refs, repository info...) is in the chunk store
+VECTOR_METADATA_FIELDS = ("source", "doc_id", "chunk_index", "resource_id")
+
+
+class ChunkStore(ABC):
+    """Stores chunk content and metadata keyed by (namespace, vector ID).
+
+    The vector index only holds the fields in VECTOR_METADATA_FIELDS, so
+    queries return small payloads and large chunks stay clear of the index's
+    metadata size limit. Retrieval hydrates just the matches it returns.
+    """
+
+    @abstractmethod
+    def put_many(self, namespace: str, records: list[dict]) -> None:
+        """Insert or replace chunks.
+
+        Args:
+            namespace: Vector namespace the chunks were upserted to
+            records: Dicts with id (vector ID), content and metadata
+        """
+        pass
+
+    @abstractmethod
+    def get_many(self, namespace: str, ids: list[str]) -> dict[str, dict]:
+        """Fetch chunks.
+
+        Returns:
+            Dict of vector ID -> {content, metadata} for the IDs that were found
+        """
+        pass
+
+    @abstractmethod
+    def list_ids(self, namespace: str, resource_id: str = None, sources: list[str] = None) -> list[str]:
+        """Vector IDs in a namespace, optionally only one resource's or some sources'."""
+        pass
+
+    @abstractmethod
+    def delete(
+        self,
+        namespace: str,
+        resource_id: str = None,
+        source: str = None,
+        sources: list[str] = None
+    ) -> None:
+        """Delete a namespace's chunks, optionally only one resource's or some sources'."""
+        pass
+
+    @abstractmethod
+    def delete_ids(self, namespace: str, ids: list[str]) -> None:
+        """Delete chunks by vector ID."""
+        pass
+
+
+def slim_metadata(metadata: dict) -> dict:
+    """Reduce vector metadata to the fields stored in the index."""
+    return {k: metadata[k] for k in VECTOR_METADATA_FIELDS if metadata.get(k) is not None}
+
+
+def hydrate_matches(store: ChunkStore, matches: list[dict]) -> list[dict]:
+    """Fill in content and metadata for vector matches stored without them.
+
+    Matches must carry "id" and "namespace". Matches that already have
+    content (vectors indexed before the chunk store existed) are unchanged.
+    One lookup is made per namespace.
+    """
+    missing: dict[str, list[str]] = {}
+    for match in matches:
+        if not match.get("content") and match.get("id"):
+            missing.setdefault(match.get("namespace", ""), []).append(match["id"])
+    if not missing:
+        return matches
+
+    found = {}
+    for namespace, ids in missing.items():
+        for vector_id, record in store.get_many(namespace, ids).items():
+            found[(namespace, vector_id)] = record
+
+    for match in matches:
+        record = found.get((match.get("namespace", ""), match.get("id")))
+        if record:
+            match["content"] = record["content"]
+            match["metadata"] = {**record["metadata"], **match.get("metadata", {})}
+            match["source"] = match["metadata"].get("source", match.get("source", ""))
+    return matches
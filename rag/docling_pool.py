@@ -0,0 +1,312 @@
+"""PDF conversion - cached Docling converters and a bounded process pool.
+
+Building a DocumentConverter loads Docling's layout (and table) models,
+which costs far more than converting a small PDF. Converters are cached
+per process, keyed by pipeline options, and can be preloaded with
+warmup_docling() when a process starts.
+
+Conversions are CPU-heavy and hold the GIL for long stretches, so in the
+API process they run in a pool of DOCLING_PROCESS_POOL_SIZE spawned worker
+processes (each with its own warm converters). Celery workers call
+disable_process_pool() at startup and convert in-process - their prefork
+children are daemonic and can't start a pool.
+
+PDFs longer than PDF_SHARD_PAGES are split into page ranges that are
+converted in parallel across the pool and stitched back in page order.
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# (do_ocr, do_table_structure) -> DocumentConverter
+_converters: dict[tuple[bool, bool], object] = {}
+_converter_locks: dict[tuple[bool, bool], threading.Lock] = {}
+_lock = threading.Lock()
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+_pool_disabled = False
+
+# Pages per shard when a large PDF is split across the pool
+PDF_SHARD_PAGES = int(os.getenv("PDF_SHARD_PAGES", "50"))
+
+
+def _options_key(fast_mode: bool) -> tuple[bool, bool]:
+    # OCR stays off; fast mode skips table structure for a ~3-5x speedup
+    return (False, not fast_mode)
+
+
+def get_converter(fast_mode: bool = False):
+    """This process's DocumentConverter for the given options, built on first use."""
+    key = _options_key(fast_mode)
+    converter = _converters.get(key)
+    if converter is not None:
+        return converter
+
+    with _lock:
+        converter = _converters.get(key)
+        if converter is None:
+            from docling.document_converter import DocumentConverter, PdfFormatOption
+            from docling.datamodel.base_models import InputFormat
+            from docling.datamodel.pipeline_options import PdfPipelineOptions
+
+            do_ocr, do_table_structure = key
+            pipeline_options = PdfPipelineOptions()
+            pipeline_options.do_ocr = do_ocr
+            pipeline_options.do_table_structure = do_table_structure
+
+            converter = DocumentConverter(
+                format_options={
+                    InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+                }
+            )
+            # Load the models now rather than inside the first convert()
+            converter.initialize_pipeline(InputFormat.PDF)
+            _converter_locks[key] = threading.Lock()
+            _converters[key] = converter
+            print(f"[Docling] Loaded converter (table_structure={do_table_structure})")
+    return converter
+
+
+def convert_pdf(
+    path: str,
+    fast_mode: bool = False,
+    page_range: tuple[int, int] | None = None
+) -> tuple[str, list]:
+    """Convert a PDF (or a range of its pages) with this process's cached converter.
+
+    Top-level (picklable) so it can run in the process pool.
+
+    Args:
+        path: PDF file path
+        fast_mode: Skip table structure recognition
+        page_range: First and last page (1-based, inclusive), or None for all
+
+    Returns:
+        tuple of (full_markdown_content, list_of_segments_with_page_numbers)
+    """
+    from .ingest import TextSegment
+
+    converter = get_converter(fast_mode)
+    # Threads share one converter; its models aren't safe to run concurrently
+    with _converter_locks[_options_key(fast_mode)]:
+        if page_range:
+            result = converter.convert(str(path), page_range=page_range)
+        else:
+            result = converter.convert(str(path))
+    doc = result.document
+
+    # Extract segments with page numbers
+    segments = []
+    current_section = None
+
+    for item, level in doc.iterate_items():
+        # Track section headers
+        if type(item).__name__ == 'SectionHeaderItem':
+            current_section = getattr(item, 'text', None)
+
+        # Get text content
+        text = getattr(item, 'text', None)
+        if not text:
+            # For tables, try to get markdown representation
+            if type(item).__name__ == 'TableItem':
+                try:
+                    text = item.export_to_markdown()
+                except:
+                    continue
+            else:
+                continue
+
+        # Get page number from provenance
+        page_no = None
+        if hasattr(item, 'prov') and item.prov:
+            prov = item.prov[0]  # Take first provenance item
+            if hasattr(prov, 'page_no'):
+                page_no = prov.page_no
+
+        segments.append(TextSegment(
+            text=text.strip(),
+            page_number=page_no,
+            section=current_section
+        ))
+
+    # Export as markdown for full content (preserves table structure)
+    return doc.export_to_markdown(), segments
+
+
+def _init_pool_process() -> None:
+    """Pool worker initializer: load the default converter before any work arrives.
+
+    Must not raise - a failing initializer breaks the whole pool. If Docling
+    can't load, conversions raise the error themselves.
+    """
+    try:
+        get_converter(fast_mode=False)
+    except Exception as e:
+        print(f"[Docling] Pool process could not preload converter: {e}")
+
+
+def _ready() -> bool:
+    return True
+
+
+def _pool_size() -> int:
+    return int(os.getenv("DOCLING_PROCESS_POOL_SIZE", "2"))
+
+
+def disable_process_pool() -> None:
+    """Convert in-process from now on (set in Celery workers at startup)."""
+    global _pool_disabled
+    _pool_disabled = True
+
+
+def get_process_pool() -> ProcessPoolExecutor | None:
+    """Shared conversion pool, or None if disabled or unavailable in this process."""
+    global _pool
+    size = _pool_size()
+    if size <= 0 or _pool_disabled or multiprocessing.current_process().daemon:
+        return None
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Spawn, not fork: the API process runs threads
+                _pool = ProcessPoolExecutor(
+                    max_workers=size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_pool_process
+                )
+    return _pool
+
+
+def pdf_page_count(path: str) -> int | None:
+    """Number of pages in a PDF, or None if pypdf can't read it."""
+    try:
+        from pypdf import PdfReader
+        return len(PdfReader(str(path)).pages)
+    except Exception:
+        return None
+
+
+def page_ranges(page_count: int, shard_pages: int = None) -> list[tuple[int, int]]:
+    """Split pages 1..page_count into (first, last) shards of shard_pages pages."""
+    shard_pages = shard_pages or PDF_SHARD_PAGES
+    return [
+        (first, min(first + shard_pages - 1, page_count))
+        for first in range(1, page_count + 1, shard_pages)
+    ]
+
+
+def _run_all(fn, calls: list[tuple]) -> list:
+    """Run fn(*args) for each args tuple in the pool (or in-process), results in order."""
+    global _pool
+    pool = get_process_pool()
+    if pool is None:
+        return [fn(*args) for args in calls]
+
+    try:
+        futures = [pool.submit(fn, *args) for args in calls]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory) - start a fresh pool next time
+        print("[Docling] Process pool broke, converting in-process")
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        return [fn(*args) for args in calls]
+
+
+def map_page_shards(fn, path: str, page_count: int, *args) -> list:
+    """Run fn(path, (first, last), *args) over the PDF's page shards.
+
+    Shards run in parallel in the process pool when there is more than one,
+    otherwise in this process. fn must be a top-level function.
+
+    Returns:
+        fn's results in page order
+    """
+    calls = [(str(path), page_range, *args) for page_range in page_ranges(page_count)]
+    if len(calls) == 1:
+        return [fn(*calls[0])]
+    return _run_all(fn, calls)
+
+
+def _convert_shard(path: str, page_range: tuple[int, int], fast_mode: bool) -> tuple[str, list]:
+    return convert_pdf(path, fast_mode, page_range)
+
+
+def run_conversion(path: str, fast_mode: bool = False) -> tuple[str, list]:
+    """Convert a PDF in the process pool, or in-process if there is none.
+
+    PDFs longer than PDF_SHARD_PAGES are converted as page shards in
+    parallel. Segments come back in page order; a shard's segments before
+    its first section header take the section that was open at the end of
+    the previous shard.
+    """
+    page_count = pdf_page_count(path)
+    if page_count and page_count > PDF_SHARD_PAGES:
+        shards = map_page_shards(_convert_shard, path, page_count, fast_mode)
+        print(f"[Docling] Converted {page_count} pages in {len(shards)} shards")
+    else:
+        shards = _run_all(convert_pdf, [(str(path), fast_mode)])
+
+    markdown_parts = []
+    segments = []
+    current_section = None
+    for shard_markdown, shard_segments in shards:
+        markdown_parts.append(shard_markdown)
+        for segment in shard_segments:
+            if segment.section is None:
+                segment.section = current_section
+            else:
+                current_section = segment.section
+            segments.append(segment)
+
+    return "\n\n".join(part for part in markdown_parts if part), segments
+
+
+def extract_text_pages(path: str, page_range: tuple[int, int]) -> list[str]:
+    """Extract plain text per page with pypdf (the fallback when Docling fails)."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    first, last = page_range
+    return [reader.pages[i].extract_text() or "" for i in range(first - 1, last)]
+
+
+def page_stats(path: str, page_range: tuple[int, int]) -> tuple[int, bool]:
+    """Word count and whether any page has images, for a range of pages."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    first, last = page_range
+    word_count = 0
+    has_images = False
+    for i in range(first - 1, last):
+        page = reader.pages[i]
+        word_count += len((page.extract_text() or "").split())
+        if not has_images and page.images:
+            has_images = True
+    return word_count, has_images
+
+
+def warmup_docling() -> None:
+    """Preload Docling models at API or worker start.
+
+    With a process pool, starts every pool process (each loads its models
+    in the background); otherwise builds this process's default converter.
+    Failures are logged, not raised - converters are built on first use.
+    """
+    try:
+        pool = get_process_pool()
+        if pool is None:
+            get_converter(fast_mode=False)
+        else:
+            for _ in range(_pool_size()):
+                pool.submit(_ready)
+        print("[Docling] Warmup started" if pool else "[Docling] Warmed up converter")
+    except Exception as e:
+        print(f"[Docling] Warmup failed, converters will be built on first use: {e}")
@@ -0,0 +1,177 @@
+"""Embedding caches - query embedding LRU/Redis cache and chunk embedding store."""
+
+import hashlib
+import os
+import threading
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache keys (collapse whitespace, ignore case)."""
+    return " ".join(text.split()).casefold()
+
+
+def text_hash(text: str) -> str:
+    """SHA-256 hex digest of text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pack_vector(vector: list[float]) -> bytes:
+    """Pack an embedding as float32 bytes (4 bytes per dimension)."""
+    return array("f", vector).tobytes()
+
+
+def unpack_vector(data: bytes) -> list[float]:
+    """Unpack float32 bytes produced by pack_vector."""
+    vector = array("f")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache keyed by model and normalized text hash.
+
+    The first tier is a size-bounded LRU local to the process. The second is
+    Redis, shared by every API process and Celery worker, with entries
+    expiring after a TTL. Vectors are stored as float32 bytes in both tiers.
+    Redis errors are logged and treated as misses, so a Redis outage only
+    costs the extra OpenAI calls.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        ttl_seconds: int = 86400,
+        redis_url: str = None,
+        key_prefix: str = "emb"
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._local: OrderedDict[str, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "redis_errors": 0}
+
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.from_url(redis_url)
+            except Exception as e:
+                print(f"[EmbeddingCache] Redis tier disabled: {e}")
+
+    def key(self, model: str, text: str) -> str:
+        """Cache key for a model and text."""
+        return f"{self.key_prefix}:{model}:{text_hash(normalize_text(text))}"
+
+    def get(self, model: str, text: str) -> list[float] | None:
+        """Look up an embedding, checking the local tier before Redis."""
+        key = self.key(model, text)
+
+        with self._lock:
+            data = self._local.get(key)
+            if data is not None:
+                self._local.move_to_end(key)
+                self._stats["local_hits"] += 1
+                return unpack_vector(data)
+
+        if self._redis is not None:
+            try:
+                data = self._redis.get(key)
+            except Exception as e:
+                data = None
+                self._record_redis_error(e)
+            if data is not None:
+                self._store_local(key, data)
+                with self._lock:
+                    self._stats["redis_hits"] += 1
+                return unpack_vector(data)
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, model: str, text: str, vector: list[float]) -> None:
+        """Store an embedding in both tiers."""
+        key = self.key(model, text)
+        data = pack_vector(vector)
+        self._store_local(key, data)
+
+        if self._redis is not None:
+            try:
+                self._redis.set(key, data, ex=self.ttl_seconds)
+            except Exception as e:
+                self._record_redis_error(e)
+
+    def _store_local(self, key: str, data: bytes) -> None:
+        with self._lock:
+            self._local[key] = data
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _record_redis_error(self, error: Exception) -> None:
+        with self._lock:
+            self._stats["redis_errors"] += 1
+            first = self._stats["redis_errors"] == 1
+        if first:
+            print(f"[EmbeddingCache] Redis error (treating as miss): {error}")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process, for sizing the cache."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["local_entries"] = len(self._local)
+        lookups = stats["local_hits"] + stats["redis_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        stats["ttl_seconds"] = self.ttl_seconds
+        stats["redis_enabled"] = self._redis is not None
+        return stats
+
+
+class ChunkEmbeddingStore(ABC):
+    """Persistent, content-addressed store for chunk embeddings.
+
+    Entries are keyed by (embedding model, SHA-256 of the exact chunk text),
+    so unchanged chunks are never re-embedded on reindex or re-upload.
+    """
+
+    @abstractmethod
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        """Fetch stored embeddings.
+
+        Returns:
+            Dict of content hash -> embedding for the hashes that were found
+        """
+        pass
+
+    @abstractmethod
+    def put_many(self, model: str, embeddings: dict[str, list[float]]) -> None:
+        """Store embeddings keyed by content hash (existing entries are kept)."""
+        pass
+
+
+# Global cache instance (lazy initialized)
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process-wide query embedding cache.
+
+    Configured from EMBEDDING_CACHE_SIZE (LRU entries), EMBEDDING_CACHE_TTL
+    (seconds) and REDIS_URL (shared tier, omitted if unset).
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+                    ttl_seconds=int(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+                    redis_url=os.getenv("REDIS_URL")
+                )
+    return _cache
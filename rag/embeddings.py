@@ -1,9 +1,114 @@
 """Embedding module - converts text to vectors using OpenAI."""
 
+import asyncio
+import random
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from openai import OpenAI, RateLimitError
+from openai import (
+    OpenAI, AsyncOpenAI, RateLimitError, APITimeoutError, APIConnectionError, InternalServerError
+)
 from .chunker import Chunk
+from .embedding_cache import EmbeddingCache, ChunkEmbeddingStore, text_hash
+
+# OpenAI embedding request limits
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300_000
+
+# Errors worth retrying - everything else is a bug or a bad input
+TRANSIENT_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+_encoding = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text.
+
+    Uses tiktoken when it is installed, otherwise ~4 characters per token.
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def backoff_delay(attempt: int, base_delay: float = 1.0, max_delay: float = 30.0) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class AIMDController:
+    """Additive-increase/multiplicative-decrease concurrency limit.
+
+    The limit grows by roughly one slot per window of successful requests
+    and halves on a 429. Responses slower than the latency target shrink it
+    by one slot, backing off before the account starts returning 429s.
+    Decreases are rate limited so a burst of concurrent failures from the
+    same window only counts once.
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 32,
+        latency_target: float = 20.0,
+        cooldown: float = 2.0
+    ):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.cooldown = cooldown
+        self._limit = float(initial)
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def on_success(self, latency: float) -> None:
+        with self._lock:
+            if latency > self.latency_target:
+                self._decrease(self._limit - 1)
+            else:
+                self._limit = min(self.maximum, self._limit + 1 / self._limit)
+
+    def on_rate_limit(self) -> None:
+        with self._lock:
+            self._decrease(self._limit / 2)
+
+    def _decrease(self, new_limit: float) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(self.minimum, new_limit)
+
+
+class _AsyncLimiter:
+    """Caps in-flight requests at the controller's current limit."""
+
+    def __init__(self, controller: AIMDController):
+        self.controller = controller
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._cond:
+            await self._cond.wait_for(lambda: self._in_flight < self.controller.limit)
+            self._in_flight += 1
+
+    async def __aexit__(self, *exc):
+        async with self._cond:
+            self._in_flight -= 1
+            # The limit may have grown, so wake every waiter to re-check
+            self._cond.notify_all()
 
 
 class Embedder:
@@ -12,10 +117,21 @@ class Embedder:
     def __init__(
         self,
         api_key: str = None,
-        model: str = "text-embedding-3-small"
+        model: str = "text-embedding-3-small",
+        cache: EmbeddingCache = None,
+        chunk_store: ChunkEmbeddingStore = None
     ):
+        self.api_key = api_key
         self.client = OpenAI(api_key=api_key)
         self.model = model
+        # Concurrency for the async batch path, learned across calls
+        self.concurrency = AIMDController()
+        # Leave headroom for token estimation error
+        self.max_batch_tokens = int(MAX_TOKENS_PER_REQUEST * 0.8)
+        # Optional cache for single-text (query) embeddings
+        self.cache = cache
+        # Optional persistent store for chunk embeddings, keyed by content hash
+        self.chunk_store = chunk_store
         # Dimensions for different models
         self._dimensions = {
             "text-embedding-3-small": 1536,
@@ -30,23 +146,51 @@ class Embedder:
 
     def embed_text(self, text: str) -> list[float]:
         """Generate embedding for a single text."""
+        if self.cache:
+            cached = self.cache.get(self.model, text)
+            if cached is not None:
+                return cached
+
         response = self.client.embeddings.create(
             model=self.model,
             input=text
         )
-        return response.data[0].embedding
+        embedding = response.data[0].embedding
+
+        if self.cache:
+            self.cache.put(self.model, text, embedding)
+        return embedding
+
+    def _pack_batches(self, texts: list[str]) -> list[tuple[int, list[str]]]:
+        """Group texts into request-sized batches by estimated token count.
+
+        Returns:
+            List of (start offset into texts, batch texts)
+        """
+        batches = []
+        start = 0
+        batch: list[str] = []
+        batch_tokens = 0
+
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text)
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= MAX_INPUTS_PER_REQUEST):
+                batches.append((start, batch))
+                start, batch, batch_tokens = i, [], 0
+            batch.append(text)
+            batch_tokens += tokens
+
+        if batch:
+            batches.append((start, batch))
+        return batches
 
     def _embed_batch(
         self,
         batch: list[str],
-        batch_index: int,
         max_retries: int = 5,
         base_delay: float = 1.0
-    ) -> tuple[int, list[list[float]]]:
-        """Embed a single batch and return with its index for ordering.
-
-        Includes exponential backoff retry logic for rate limit errors.
-        """
+    ) -> list[list[float]]:
+        """Embed a single batch, retrying transient errors with jittered backoff."""
         for attempt in range(max_retries):
             try:
                 response = self.client.embeddings.create(
@@ -55,63 +199,124 @@ class Embedder:
                 )
                 # Sort by index to maintain order within batch
                 sorted_data = sorted(response.data, key=lambda x: x.index)
-                return batch_index, [d.embedding for d in sorted_data]
-            except RateLimitError as e:
+                return [d.embedding for d in sorted_data]
+            except TRANSIENT_ERRORS as e:
                 if attempt == max_retries - 1:
                     raise  # Re-raise on final attempt
-                # Exponential backoff: 1s, 2s, 4s, 8s, 16s
-                delay = base_delay * (2 ** attempt)
-                print(f"[Embedder] Rate limited, waiting {delay:.1f}s before retry ({attempt + 1}/{max_retries})")
+                delay = backoff_delay(attempt, base_delay)
+                print(f"[Embedder] {type(e).__name__}, waiting {delay:.1f}s before retry ({attempt + 1}/{max_retries})")
                 time.sleep(delay)
 
+    async def _aembed_batch(
+        self,
+        client: AsyncOpenAI,
+        limiter: _AsyncLimiter,
+        batch: list[str],
+        max_retries: int = 8,
+        base_delay: float = 1.0
+    ) -> list[list[float]]:
+        """Embed a single batch on the async client under the AIMD limit."""
+        for attempt in range(max_retries):
+            try:
+                async with limiter:
+                    started = time.monotonic()
+                    response = await client.embeddings.create(
+                        model=self.model,
+                        input=batch
+                    )
+                self.concurrency.on_success(time.monotonic() - started)
+                sorted_data = sorted(response.data, key=lambda x: x.index)
+                return [d.embedding for d in sorted_data]
+            except TRANSIENT_ERRORS as e:
+                if isinstance(e, RateLimitError):
+                    self.concurrency.on_rate_limit()
+                if attempt == max_retries - 1:
+                    raise
+                delay = backoff_delay(attempt, base_delay)
+                print(f"[Embedder] {type(e).__name__}, concurrency now {self.concurrency.limit}, "
+                      f"retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+                await asyncio.sleep(delay)
+
+    async def aembed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for multiple texts on the async OpenAI client.
+
+        Texts are packed into batches by estimated token count, and batches
+        run concurrently up to an AIMD limit driven by 429s and latency.
+        """
+        if not texts:
+            return []
+
+        batches = self._pack_batches(texts)
+        embeddings: list[list[float]] = [None] * len(texts)
+        limiter = _AsyncLimiter(self.concurrency)
+
+        async with AsyncOpenAI(api_key=self.api_key) as client:
+            results = await asyncio.gather(*[
+                self._aembed_batch(client, limiter, batch)
+                for _, batch in batches
+            ])
+
+        for (start, batch), batch_embeddings in zip(batches, results):
+            embeddings[start:start + len(batch)] = batch_embeddings
+        return embeddings
+
     def embed_texts(self, texts: list[str], parallel: bool = True) -> list[list[float]]:
-        """Generate embeddings for multiple texts (batched).
+        """Generate embeddings for multiple texts (batched by token count).
 
         Args:
             texts: List of texts to embed
-            parallel: If True, process batches in parallel (faster for large docs)
+            parallel: If True, run batches concurrently on the async client
         """
         if not texts:
             return []
 
-        # OpenAI supports up to 2048 texts per call, but we use 500 for safety
-        # to avoid token limits while still being efficient
-        batch_size = 500
+        batches = self._pack_batches(texts)
 
-        # Create batches
-        batches = []
-        for i in range(0, len(texts), batch_size):
-            batches.append((i // batch_size, texts[i:i + batch_size]))
+        if parallel and len(batches) > 1:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                # No loop in this thread - safe to run our own
+                return asyncio.run(self.aembed_texts(texts))
 
-        if not parallel or len(batches) == 1:
-            # Sequential processing
-            all_embeddings = []
-            for batch_idx, batch in batches:
-                _, embeddings = self._embed_batch(batch, batch_idx)
-                all_embeddings.extend(embeddings)
-            return all_embeddings
+        # Sequential processing (single batch, or called from inside an event loop)
+        all_embeddings = []
+        for _, batch in batches:
+            all_embeddings.extend(self._embed_batch(batch))
+        return all_embeddings
 
-        # Parallel processing for multiple batches
-        all_embeddings = [None] * len(batches)
+    def embed_chunks(self, chunks: list[Chunk], parallel: bool = True) -> list[tuple[Chunk, list[float]]]:
+        """Generate embeddings for chunks, returning (chunk, embedding) pairs.
 
-        # Use up to 5 parallel workers (OpenAI rate limits)
-        max_workers = min(5, len(batches))
+        With a chunk store configured, stored embeddings are looked up in bulk
+        and only chunks whose text hasn't been embedded before hit the API.
+        """
+        if not self.chunk_store:
+            texts = [chunk.content for chunk in chunks]
+            embeddings = self.embed_texts(texts, parallel=parallel)
+            return list(zip(chunks, embeddings))
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = {
-                executor.submit(self._embed_batch, batch, idx): idx
-                for idx, batch in batches
-            }
+        hashes = [text_hash(chunk.content) for chunk in chunks]
 
-            for future in as_completed(futures):
-                batch_idx, embeddings = future.result()
-                all_embeddings[batch_idx] = embeddings
+        try:
+            known = self.chunk_store.get_many(self.model, list(set(hashes)))
+        except Exception as e:
+            print(f"[Embedder] Chunk store lookup failed, embedding everything: {e}")
+            known = {}
 
-        # Flatten the results maintaining order
-        return [emb for batch_embs in all_embeddings for emb in batch_embs]
+        # Embed each distinct missing text once
+        missing = {}
+        for chunk, h in zip(chunks, hashes):
+            if h not in known and h not in missing:
+                missing[h] = chunk.content
 
-    def embed_chunks(self, chunks: list[Chunk], parallel: bool = True) -> list[tuple[Chunk, list[float]]]:
-        """Generate embeddings for chunks, returning (chunk, embedding) pairs."""
-        texts = [chunk.content for chunk in chunks]
-        embeddings = self.embed_texts(texts, parallel=parallel)
-        return list(zip(chunks, embeddings))
+        if missing:
+            new_embeddings = dict(zip(missing, self.embed_texts(list(missing.values()), parallel=parallel)))
+            try:
+                self.chunk_store.put_many(self.model, new_embeddings)
+            except Exception as e:
+                print(f"[Embedder] Failed to persist chunk embeddings: {e}")
+            known.update(new_embeddings)
+
+        print(f"[Embedder] Reused {len(chunks) - len(missing)}/{len(chunks)} chunk embeddings, embedded {len(missing)}")
+        return [(chunk, known[h]) for chunk, h in zip(chunks, hashes)]
@@ -7,6 +7,7 @@ import hashlib
 import tempfile
 import requests
 import os
+import re
 from urllib.parse import urlparse
 
 
@@ -37,11 +38,113 @@ class Document:
         self.id = hashlib.md5(self.content.encode()).hexdigest()[:12]
 
 
+class _GitignoreRules:
+    """Patterns from one .gitignore file, matched relative to its directory."""
+
+    def __init__(self, base: str, lines: list[str]):
+        self.base = base  # Directory of the .gitignore, relative to the repo root ("" for the root)
+        self.rules: list[tuple[re.Pattern, bool, bool]] = []  # (regex, negated, directories only)
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash anywhere but the end anchors the pattern to this directory
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if not line:
+                continue
+            body = self._translate(line)
+            regex = re.compile(f"^{body}$" if anchored else f"^(?:.*/)?{body}$")
+            self.rules.append((regex, negated, dir_only))
+
+    @staticmethod
+    def _translate(pattern: str) -> str:
+        """Convert a gitignore glob to a regex body."""
+        out, i = [], 0
+        while i < len(pattern):
+            if pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+            elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+                out.append("/.*")
+                i += 3
+            elif pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+            elif pattern[i] == "*":
+                out.append("[^/]*")
+                i += 1
+            elif pattern[i] == "?":
+                out.append("[^/]")
+                i += 1
+            elif pattern[i] == "[" and "]" in pattern[i + 1:]:
+                end = pattern.index("]", i + 1)
+                out.append("[" + pattern[i + 1:end].replace("!", "^", 1) + "]")
+                i = end + 1
+            else:
+                out.append(re.escape(pattern[i]))
+                i += 1
+        return "".join(out)
+
+    def match(self, rel_path: str, is_dir: bool) -> bool | None:
+        """True if ignored, False if re-included, None if no pattern matches."""
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        result = None
+        # The last matching pattern wins
+        for regex, negated, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negated
+        return result
+
+
+def _is_ignored(rules: list[_GitignoreRules], rel_path: str, is_dir: bool) -> bool:
+    """Whether a path is ignored; deeper .gitignore files override shallower ones."""
+    ignored = False
+    for file_rules in rules:
+        result = file_rules.match(rel_path, is_dir)
+        if result is not None:
+            ignored = result
+    return ignored
+
+
 class DocumentLoader:
     """Loads documents from various sources."""
 
     SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".md", ".txt", ".markdown"}
 
+    # Binary file extensions skipped in git repositories
+    GIT_BINARY_EXTENSIONS = {
+        '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.webp', '.bmp', '.tiff',
+        '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+        '.zip', '.tar', '.gz', '.rar', '.7z', '.bz2', '.xz',
+        '.exe', '.dll', '.so', '.dylib', '.a', '.lib',
+        '.mp3', '.mp4', '.wav', '.avi', '.mov', '.mkv', '.flv', '.wmv',
+        '.ttf', '.otf', '.woff', '.woff2', '.eot',
+        '.pyc', '.pyo', '.class', '.o', '.obj',
+        '.db', '.sqlite', '.sqlite3',
+        '.lock', '.bin', '.dat', '.pack', '.idx',
+        '.jar', '.war', '.ear',
+    }
+
+    # Directories skipped in git repositories
+    GIT_SKIP_DIRS = {
+        '.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env',
+        'dist', 'build', '.next', '.cache', 'coverage', '.nyc_output',
+        '.idea', '.vscode', '.DS_Store', '.pytest_cache', '.mypy_cache',
+        'vendor', 'target', 'out', 'bin', 'obj',
+        '.eggs', '*.egg-info', '.tox', '.nox',
+    }
+
     def __init__(self, fast_mode: bool = False):
         """Initialize document loader.
 
@@ -114,82 +217,33 @@ class DocumentLoader:
             return content, []
 
     def _load_pdf_basic(self, file_path: Path) -> str:
-        """Basic PDF extraction using pypdf (fallback)."""
+        """Basic PDF extraction using pypdf (fallback).
+
+        Large PDFs are extracted in page shards across the conversion pool.
+        """
         from pypdf import PdfReader
+        from .docling_pool import map_page_shards, extract_text_pages
 
-        reader = PdfReader(file_path)
+        page_count = len(PdfReader(file_path).pages)
         text_parts = []
 
-        for page_num, page in enumerate(reader.pages):
-            text = page.extract_text()
-            if text:
-                text_parts.append(text)
+        for shard in map_page_shards(extract_text_pages, str(file_path), page_count):
+            text_parts.extend(text for text in shard if text)
 
         return "\n\n".join(text_parts)
 
     def _load_pdf_with_docling(self, file_path: Path) -> tuple[str, list[TextSegment]]:
         """Extract text from PDF using Docling - handles tables and images.
 
+        Uses the process's cached converter (or the conversion process pool),
+        so models are loaded once rather than per PDF.
+
         Returns:
             tuple of (full_markdown_content, list_of_segments_with_page_numbers)
         """
-        from docling.document_converter import DocumentConverter
-        from docling.datamodel.base_models import InputFormat
-        from docling.document_converter import PdfFormatOption
-        from docling.datamodel.pipeline_options import PdfPipelineOptions
-
-        # Configure Docling - skip table structure in fast mode for ~3-5x speedup
-        pipeline_options = PdfPipelineOptions()
-        pipeline_options.do_ocr = False  # Disable OCR for faster processing
-        pipeline_options.do_table_structure = not self.fast_mode  # Skip in fast mode
-
-        converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-            }
-        )
-
-        result = converter.convert(str(file_path))
-        doc = result.document
-
-        # Extract segments with page numbers
-        segments = []
-        current_section = None
-
-        for item, level in doc.iterate_items():
-            # Track section headers
-            if type(item).__name__ == 'SectionHeaderItem':
-                current_section = getattr(item, 'text', None)
-
-            # Get text content
-            text = getattr(item, 'text', None)
-            if not text:
-                # For tables, try to get markdown representation
-                if type(item).__name__ == 'TableItem':
-                    try:
-                        text = item.export_to_markdown()
-                    except:
-                        continue
-                else:
-                    continue
+        from .docling_pool import run_conversion
 
-            # Get page number from provenance
-            page_no = None
-            if hasattr(item, 'prov') and item.prov:
-                prov = item.prov[0]  # Take first provenance item
-                if hasattr(prov, 'page_no'):
-                    page_no = prov.page_no
-
-            segments.append(TextSegment(
-                text=text.strip(),
-                page_number=page_no,
-                section=current_section
-            ))
-
-        # Export as markdown for full content (preserves table structure)
-        full_content = doc.export_to_markdown()
-
-        return full_content, segments
+        return run_conversion(str(file_path), self.fast_mode)
 
     def _load_docx(self, file_path: Path) -> str:
         """Extract text from Word document."""
@@ -341,34 +395,18 @@ class DocumentLoader:
 
     def _load_pdf_from_bytes_with_docling(self, content: bytes, source: str) -> Document:
         """Extract text from PDF bytes using Docling - handles tables and images."""
-        from docling.document_converter import DocumentConverter
-        from docling.datamodel.base_models import InputFormat
-        from docling.document_converter import PdfFormatOption
-        from docling.datamodel.pipeline_options import PdfPipelineOptions
-        from docling.datamodel.document import DocumentStream
+        from .docling_pool import run_conversion
         import tempfile
         import os
 
-        # Configure Docling - skip table structure in fast mode for ~3-5x speedup
-        pipeline_options = PdfPipelineOptions()
-        pipeline_options.do_ocr = False  # Disable OCR for faster processing
-        pipeline_options.do_table_structure = not self.fast_mode  # Skip in fast mode
-
-        converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-            }
-        )
-
         # Save to temp file since Docling needs a file path
         with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
             tmp.write(content)
             tmp_path = tmp.name
 
         try:
-            result = converter.convert(tmp_path)
             # Export as markdown - this preserves table structure
-            markdown_content = result.document.export_to_markdown()
+            markdown_content, _ = run_conversion(tmp_path, self.fast_mode)
         finally:
             os.unlink(tmp_path)
 
@@ -515,92 +553,162 @@ class DocumentLoader:
         Returns:
             List of Document objects for each text file found
         """
-        documents = []
+        return list(self.iter_git_repository(repo_path, repo_url=repo_url, commit_hash=commit_hash))
+
+    def iter_git_repository(
+        self,
+        repo_path: str,
+        repo_url: str | None = None,
+        commit_hash: str | None = None,
+        max_workers: int = 8,
+        max_total_bytes: int | None = None
+    ) -> Iterator[Document]:
+        """Lazily load indexable text files from a git repository.
+
+        Files are read by a thread pool a bounded number ahead of the
+        consumer and yielded in walk order, so ingestion can start chunking
+        and embedding the first files while the rest are still being read.
+        Files matched by .gitignore are skipped, and binary files are
+        detected from content (a NUL byte or invalid UTF-8 in the first
+        block) rather than extension alone.
+
+        Args:
+            repo_path: Path to the repository root
+            repo_url: Original repository URL (for generating GitHub links)
+            commit_hash: Commit hash at time of cloning (for GitHub links)
+            max_workers: Threads reading files
+            max_total_bytes: Stop after this many bytes of files have been
+                read (default: env GIT_MAX_TOTAL_BYTES, 200MB)
+
+        Yields:
+            Document objects for each text file found
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from collections import deque
+
+        if max_total_bytes is None:
+            max_total_bytes = int(os.getenv("GIT_MAX_TOTAL_BYTES", str(200 * 1024 * 1024)))
 
         # Convert git clone URL to browse URL for GitHub links
         github_base_url = None
         if repo_url:
             github_base_url = self._git_url_to_browse_url(repo_url, commit_hash)
 
-        # Binary file extensions to skip
-        BINARY_EXTENSIONS = {
-            '.png', '.jpg', '.jpeg', '.gif', '.ico', '.svg', '.webp', '.bmp', '.tiff',
-            '.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
-            '.zip', '.tar', '.gz', '.rar', '.7z', '.bz2', '.xz',
-            '.exe', '.dll', '.so', '.dylib', '.a', '.lib',
-            '.mp3', '.mp4', '.wav', '.avi', '.mov', '.mkv', '.flv', '.wmv',
-            '.ttf', '.otf', '.woff', '.woff2', '.eot',
-            '.pyc', '.pyo', '.class', '.o', '.obj',
-            '.db', '.sqlite', '.sqlite3',
-            '.lock', '.bin', '.dat', '.pack', '.idx',
-            '.jar', '.war', '.ear',
-            '.min.js', '.min.css',  # Minified files
-        }
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="git-load")
+        pending = deque()
+        total_bytes = 0
+        try:
+            for file_path, size in self._walk_git_repository(repo_path):
+                if total_bytes + size > max_total_bytes:
+                    print(f"[Git] Byte budget of {max_total_bytes} reached, skipping remaining files")
+                    break
+                total_bytes += size
+                pending.append(executor.submit(
+                    self._read_repository_file, repo_path, file_path, github_base_url
+                ))
+                # Bounded read-ahead keeps memory flat however large the repo is
+                while len(pending) >= max_workers * 4:
+                    doc = pending.popleft().result()
+                    if doc:
+                        yield doc
+
+            while pending:
+                doc = pending.popleft().result()
+                if doc:
+                    yield doc
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
 
-        # Directories to skip
-        SKIP_DIRS = {
-            '.git', 'node_modules', '__pycache__', '.venv', 'venv', 'env',
-            'dist', 'build', '.next', '.cache', 'coverage', '.nyc_output',
-            '.idea', '.vscode', '.DS_Store', '.pytest_cache', '.mypy_cache',
-            'vendor', 'target', 'out', 'bin', 'obj',
-            '.eggs', '*.egg-info', '.tox', '.nox',
-        }
+    def _walk_git_repository(self, repo_path: str) -> Iterator[tuple[str, int]]:
+        """Yield (path, size) of candidate files, honoring .gitignore files."""
+        rules_by_dir: dict[str, list[_GitignoreRules]] = {}
 
         for root, dirs, files in os.walk(repo_path):
-            # Skip ignored directories (modify in-place to prevent descent)
-            dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+            rel_root = os.path.relpath(root, repo_path).replace(os.sep, "/")
+            rel_root = "" if rel_root == "." else rel_root
 
-            for filename in files:
-                file_path = os.path.join(root, filename)
-                ext = os.path.splitext(filename)[1].lower()
+            # Rules from parent directories plus this directory's .gitignore
+            rules = rules_by_dir.pop(root, [])
+            if ".gitignore" in files:
+                try:
+                    with open(os.path.join(root, ".gitignore"), "r", encoding="utf-8", errors="replace") as f:
+                        rules = rules + [_GitignoreRules(rel_root, f.read().splitlines())]
+                except OSError:
+                    pass
 
-                # Skip binary files
-                if ext in BINARY_EXTENSIONS:
-                    continue
+            def ignored(name: str, is_dir: bool) -> bool:
+                rel_path = f"{rel_root}/{name}" if rel_root else name
+                return _is_ignored(rules, rel_path, is_dir)
+
+            # Skip ignored directories (modify in-place to prevent descent)
+            dirs[:] = sorted(
+                d for d in dirs
+                if d not in self.GIT_SKIP_DIRS and not d.startswith('.') and not ignored(d, True)
+            )
+            for d in dirs:
+                rules_by_dir[os.path.join(root, d)] = rules
 
+            for filename in sorted(files):
                 # Skip hidden files
                 if filename.startswith('.'):
                     continue
 
+                # Skip known binary types without opening them
+                ext = os.path.splitext(filename)[1].lower()
+                if ext in self.GIT_BINARY_EXTENSIONS or filename.endswith(('.min.js', '.min.css')):
+                    continue
+
+                if ignored(filename, False):
+                    continue
+
+                file_path = os.path.join(root, filename)
                 # Skip very large files (> 1MB)
                 try:
-                    if os.path.getsize(file_path) > 1_000_000:
-                        continue
+                    size = os.path.getsize(file_path)
                 except OSError:
                     continue
+                if 0 < size <= 1_000_000:
+                    yield file_path, size
 
-                try:
-                    # Try to read as text
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-
-                    # Skip empty files
-                    if not content.strip():
-                        continue
-
-                    # Get relative path from repo root
-                    rel_path = os.path.relpath(file_path, repo_path)
-
-                    metadata = {
-                        'filename': filename,
-                        'file_path': rel_path,
-                        'repository': True,
-                    }
-                    # Add GitHub URL info if available
-                    if github_base_url:
-                        metadata['github_base_url'] = github_base_url
-
-                    documents.append(Document(
-                        content=content,
-                        source=rel_path,  # Use relative path as source
-                        doc_type=self._detect_doc_type_from_ext(ext, filename),
-                        metadata=metadata
-                    ))
-                except (UnicodeDecodeError, IOError):
-                    # Skip files that can't be read as text
-                    continue
+    def _read_repository_file(self, repo_path: str, file_path: str, github_base_url: str | None) -> Document | None:
+        """Read one repository file, or None if it is binary, empty or unreadable."""
+        import codecs
+
+        try:
+            with open(file_path, 'rb') as f:
+                head = f.read(8192)
+                # NUL bytes or invalid UTF-8 in the first block: binary file
+                if b"\0" in head:
+                    return None
+                codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+                content = (head + f.read()).decode("utf-8")
+        except (UnicodeDecodeError, OSError):
+            return None
+
+        # Skip empty files
+        if not content.strip():
+            return None
+
+        # Get relative path from repo root
+        rel_path = os.path.relpath(file_path, repo_path)
+        filename = os.path.basename(file_path)
+        ext = os.path.splitext(filename)[1].lower()
+
+        metadata = {
+            'filename': filename,
+            'file_path': rel_path,
+            'repository': True,
+        }
+        # Add GitHub URL info if available
+        if github_base_url:
+            metadata['github_base_url'] = github_base_url
 
-        return documents
+        return Document(
+            content=content,
+            source=rel_path,  # Use relative path as source
+            doc_type=self._detect_doc_type_from_ext(ext, filename),
+            metadata=metadata
+        )
 
     def _detect_doc_type_from_ext(self, ext: str, filename: str) -> str:
         """Detect document type based on file extension."""
@@ -0,0 +1,440 @@
+"""Local intent routing - nearest-neighbour plans and a router plan cache.
+
+Two tiers sit between the regex pre-router and the Haiku router call:
+
+- PlanCache: recent router plans keyed by the normalized message, a
+  fingerprint of the project's resources and the conversation context the
+  router saw. An in-process LRU in front of Redis, like EmbeddingCache.
+- IntentRouter: classifies a message by its nearest labelled exemplars in
+  embedding space. Exemplars are seeded from the regex pattern families in
+  rag.agent and grow with the Haiku router's own outputs, which are shared
+  through Redis. A message is routed locally only when its neighbours are
+  close (INTENT_ROUTER_THRESHOLD) and agree on one label; everything else
+  goes to the LLM router as before. Learned exemplars keep only the label:
+  social replies always come from the seeds' canned text, never from a
+  reply the LLM wrote for another user.
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+
+import numpy as np
+
+from .embedding_cache import normalize_text, text_hash
+
+# Cosine similarity the nearest exemplar needs for a local route
+INTENT_ROUTER_THRESHOLD = float(os.getenv("INTENT_ROUTER_THRESHOLD", "0.85"))
+
+# Neighbours that vote: up to this many, within the margin of the nearest's
+# similarity. The winning label needs this share of their similarity.
+INTENT_ROUTER_NEIGHBORS = 5
+INTENT_ROUTER_MARGIN = 0.05
+INTENT_ROUTER_MIN_AGREEMENT = 0.8
+
+# Router outputs kept as exemplars (oldest dropped first)
+INTENT_ROUTER_MAX_LEARNED = int(os.getenv("INTENT_ROUTER_MAX_LEARNED", "2000"))
+
+# Categories the local tier can route. Others (factual, clarification,
+# image/data queries) still count as neighbours, so a message close to
+# them is left to the LLM router.
+LOCAL_CATEGORIES = {"social", "resource_query", "doc_search", "web_search", "research"}
+
+# Acknowledgments for locally routed plans (the LLM writes message-specific ones)
+ACKNOWLEDGMENTS = {
+    "social": "",
+    "resource_query": "Let's see what files we have",
+    "doc_search": "Let's search the documents...",
+    "web_search": "Let's look that up...",
+    "research": "Let's dig into this carefully...",
+}
+
+
+@dataclass(frozen=True)
+class IntentLabel:
+    """The routing fields an exemplar votes for."""
+    category: str
+    complexity: str
+    search_strategy: str
+    intent_mode: str
+    response_style: str
+
+
+@dataclass
+class Exemplar:
+    """A labelled example message."""
+    text: str
+    label: IntentLabel
+    direct_response: str | None = None  # Canned social reply (seeds only)
+    followup: bool = False  # Routed with reference to earlier turns
+
+
+@dataclass
+class IntentMatch:
+    """A confident local classification."""
+    label: IntentLabel
+    confidence: float  # Winning label's share of the neighbours' similarity
+    similarity: float  # Cosine similarity of the nearest exemplar
+    direct_response: str | None = None
+
+
+_SOCIAL = IntentLabel("social", "instant", "none", "action", "conversational")
+_RESOURCES = IntentLabel("resource_query", "simple", "none", "action", "structured")
+_DOCS = IntentLabel("doc_search", "moderate", "docs", "action", "structured")
+_DOCS_EXPLORE = IntentLabel("doc_search", "moderate", "docs", "exploratory", "conversational")
+_WEB = IntentLabel("web_search", "simple", "web", "action", "structured")
+_RESEARCH = IntentLabel("research", "complex", "docs", "action", "report")
+
+# Seed exemplars, written from INSTANT_PATTERNS (social, resource_query),
+# SIMPLE_QUERY_PATTERNS (social) and DEEP_THINKING_PATTERNS (research)
+SEED_EXEMPLARS = [
+    Exemplar("hi", _SOCIAL, "Hi! What are we diving into today?"),
+    Exemplar("hello there", _SOCIAL, "Hi! What are we diving into today?"),
+    Exemplar("hey, good morning", _SOCIAL, "Good morning! What are we diving into today?"),
+    Exemplar("good afternoon", _SOCIAL, "Good afternoon! What are we diving into today?"),
+    Exemplar("thanks so much", _SOCIAL, "Happy to help! What else should we look at?"),
+    Exemplar("thank you, that was helpful", _SOCIAL, "Happy to help! What else should we look at?"),
+    Exemplar("ok got it", _SOCIAL, "Great! What should we explore next?"),
+    Exemplar("perfect, makes sense", _SOCIAL, "Great! What should we explore next?"),
+    Exemplar("bye for now", _SOCIAL, "Goodbye! Feel free to come back anytime."),
+    Exemplar("see you later, take care", _SOCIAL, "Goodbye! Feel free to come back anytime."),
+    Exemplar("what files do I have", _RESOURCES),
+    Exemplar("which documents are in this project", _RESOURCES),
+    Exemplar("show me my uploads", _RESOURCES),
+    Exemplar("list the resources in my workspace", _RESOURCES),
+    Exemplar("what have I uploaded so far", _RESOURCES),
+    Exemplar("what's in my workspace", _RESOURCES),
+    Exemplar("find mentions of the budget in my documents", _DOCS),
+    Exemplar("what does my document say about pricing", _DOCS),
+    Exemplar("search my files for the contract end date", _DOCS),
+    Exemplar("summarize the report I uploaded", _DOCS),
+    Exemplar("look in my documents for the project deadline", _DOCS),
+    Exemplar("what are the key findings in the paper", _DOCS),
+    Exemplar("help me understand what the paper is about", _DOCS_EXPLORE),
+    Exemplar("walk me through the main ideas in my documents", _DOCS_EXPLORE),
+    Exemplar("search the web for the latest news on this", _WEB),
+    Exemplar("look this up online", _WEB),
+    Exemplar("what's the latest news about interest rates", _WEB),
+    Exemplar("find current information on the internet about it", _WEB),
+    Exemplar("think harder about this and analyze it thoroughly", _RESEARCH),
+    Exemplar("take your time and reason through the documents step by step", _RESEARCH),
+    Exemplar("give this a careful, detailed analysis", _RESEARCH),
+    Exemplar("let's think step by step about what the documents imply", _RESEARCH),
+    Exemplar("examine the documents carefully and give me a thorough analysis", _RESEARCH),
+]
+
+
+class IntentRouter:
+    """Nearest-neighbour intent classifier over exemplar embeddings.
+
+    Exemplars (seeds plus learned exemplars from Redis, in one batch) are
+    embedded in a background thread started by warm() - at process start,
+    or on the first route() call. Until they are loaded route() defers to
+    the LLM router. Router outputs added with learn() go to this process
+    immediately and to Redis for other processes' next start. Redis errors
+    are logged and ignored.
+    """
+
+    def __init__(self, embedder, redis_url: str = None, key: str = "intent_router:exemplars"):
+        self.embedder = embedder
+        self.key = key
+        self._exemplars: list[Exemplar] = []
+        self._vectors: list[np.ndarray] = []
+        self._matrix: np.ndarray | None = None
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._warming = False
+        self._redis = None
+
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.from_url(redis_url)
+            except Exception as e:
+                print(f"[IntentRouter] Redis disabled: {e}")
+
+    def _load(self) -> None:
+        """Embed the seed and learned exemplars (once per process)."""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            exemplars = list(SEED_EXEMPLARS)
+            if self._redis is not None:
+                try:
+                    for raw in reversed(self._redis.lrange(self.key, 0, INTENT_ROUTER_MAX_LEARNED - 1)):
+                        data = json.loads(raw)
+                        exemplars.append(Exemplar(
+                            text=data["text"],
+                            label=IntentLabel(**data["label"]),
+                            followup=data.get("followup", False)
+                        ))
+                except Exception as e:
+                    print(f"[IntentRouter] Could not load learned exemplars: {e}")
+
+            vectors = self.embedder.embed_texts([e.text for e in exemplars])
+            self._exemplars = exemplars
+            self._vectors = [self._unit(v) for v in vectors]
+            self._matrix = None
+            self._loaded = True
+            print(f"[IntentRouter] Loaded {len(exemplars)} exemplars ({len(exemplars) - len(SEED_EXEMPLARS)} learned)")
+
+    def warm(self) -> None:
+        """Load the exemplars in a background thread (no-op once started)."""
+        with self._lock:
+            if self._loaded or self._warming:
+                return
+            self._warming = True
+
+        def run():
+            try:
+                self._load()
+            except Exception as e:
+                print(f"[IntentRouter] Could not load exemplars: {e}")
+            finally:
+                self._warming = False  # Retried by the next warm() if loading failed
+
+        threading.Thread(target=run, name="intent-router-warmup", daemon=True).start()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def route(
+        self,
+        message: str,
+        has_documents: bool,
+        has_web_search: bool,
+        embedding: list[float] = None
+    ) -> IntentMatch | None:
+        """Classify a message, or None if the LLM router should decide.
+
+        Args:
+            message: User message
+            has_documents: Whether the project has searchable documents
+            has_web_search: Whether web search is available
+            embedding: The message's embedding, if already computed
+        """
+        if not self._loaded:
+            self.warm()
+            return None
+        query = self._unit(embedding if embedding is not None else self.embedder.embed_text(message))
+
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.vstack(self._vectors)
+            matrix = self._matrix
+            exemplars = self._exemplars[:len(matrix)]
+
+        similarities = matrix @ query
+        top = np.argsort(-similarities)[:INTENT_ROUTER_NEIGHBORS]
+        nearest = float(similarities[top[0]])
+        if nearest < INTENT_ROUTER_THRESHOLD:
+            return None
+
+        top = [i for i in top if similarities[i] >= nearest - INTENT_ROUTER_MARGIN]
+        votes: dict[IntentLabel, float] = {}
+        for i in top:
+            if exemplars[i].followup:
+                # Close to a message that relied on earlier turns
+                return None
+            weight = max(float(similarities[i]), 0.0)
+            votes[exemplars[i].label] = votes.get(exemplars[i].label, 0.0) + weight
+        label, weight = max(votes.items(), key=lambda item: item[1])
+        confidence = weight / sum(votes.values()) if votes else 0.0
+
+        if confidence < INTENT_ROUTER_MIN_AGREEMENT or label.category not in LOCAL_CATEGORIES:
+            return None
+        if label.search_strategy == "docs" and not has_documents:
+            return None
+        if label.search_strategy == "web" and not has_web_search:
+            return None
+
+        # Canned text from the nearest seed; learned exemplars carry none
+        direct_response = next(
+            (exemplars[i].direct_response for i in top if exemplars[i].label == label and exemplars[i].direct_response),
+            None
+        )
+        if label.category == "social" and not direct_response:
+            return None
+        return IntentMatch(label=label, confidence=round(confidence, 3), similarity=round(nearest, 3), direct_response=direct_response)
+
+    def learn(self, message: str, plan, followup: bool = False) -> None:
+        """Add a router plan as an exemplar.
+
+        Only the message and the plan's routing label are kept; the plan's
+        direct_response was written for this user and is not stored.
+
+        Args:
+            message: The routed message
+            plan: The LLM router's RequestPlanV3
+            followup: Whether the message was routed with conversation history
+        """
+        exemplar = Exemplar(
+            text=message,
+            label=IntentLabel(
+                category=plan.category,
+                complexity=plan.complexity,
+                search_strategy=plan.search_strategy,
+                intent_mode=plan.intent_mode,
+                response_style=plan.response_style
+            ),
+            followup=followup or plan.is_followup
+        )
+        # Before the exemplars are loaded, the warmup picks it up from Redis
+        if self._loaded:
+            try:
+                vector = self._unit(self.embedder.embed_text(message))
+            except Exception as e:
+                print(f"[IntentRouter] Could not learn exemplar: {e}")
+                return
+
+            with self._lock:
+                self._exemplars.append(exemplar)
+                self._vectors.append(vector)
+                # Seeds are never dropped
+                if len(self._exemplars) - len(SEED_EXEMPLARS) > INTENT_ROUTER_MAX_LEARNED:
+                    del self._exemplars[len(SEED_EXEMPLARS)]
+                    del self._vectors[len(SEED_EXEMPLARS)]
+                self._matrix = None
+
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline()
+                pipe.lpush(self.key, json.dumps({
+                    "text": exemplar.text,
+                    "label": asdict(exemplar.label),
+                    "followup": exemplar.followup,
+                }))
+                pipe.ltrim(self.key, 0, INTENT_ROUTER_MAX_LEARNED - 1)
+                pipe.execute()
+            except Exception as e:
+                print(f"[IntentRouter] Could not store exemplar: {e}")
+
+
+class PlanCache:
+    """Two-tier cache of router plans (process LRU, then Redis with a TTL).
+
+    Values are the plan's fields as a dict; Redis errors are treated as misses.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: int = 3600,
+        redis_url: str = None,
+        key_prefix: str = "plan"
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._local: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.from_url(redis_url)
+            except Exception as e:
+                print(f"[PlanCache] Redis tier disabled: {e}")
+
+    def key(
+        self,
+        message: str,
+        resources: list = None,
+        has_documents: bool = True,
+        has_web_search: bool = False,
+        conversation_history: list[dict] = None,
+        version: str = "v3"
+    ) -> str:
+        """Cache key for a routing request.
+
+        The resource fingerprint covers each resource's ID, name and status,
+        so adding, renaming or finishing a resource changes the key. The
+        recent turns the router sees are part of the key as well.
+        """
+        fingerprint = sorted(f"{r.id}:{r.name}:{r.status}" for r in resources or [])
+        recent = [
+            (m.get("role"), m.get("content") if isinstance(m.get("content"), str) else "")
+            for m in (conversation_history or [])[-6:]
+        ]
+        raw = json.dumps(
+            [version, normalize_text(message), fingerprint, has_documents, has_web_search, recent],
+            ensure_ascii=False
+        )
+        return f"{self.key_prefix}:{version}:{text_hash(raw)}"
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            data = self._local.get(key)
+            if data is not None:
+                self._local.move_to_end(key)
+                return json.loads(data)
+
+        if self._redis is not None:
+            try:
+                data = self._redis.get(key)
+            except Exception as e:
+                print(f"[PlanCache] Redis error (treating as miss): {e}")
+                data = None
+            if data is not None:
+                data = data.decode("utf-8") if isinstance(data, bytes) else data
+                self._store_local(key, data)
+                return json.loads(data)
+        return None
+
+    def put(self, key: str, plan: dict) -> None:
+        data = json.dumps(plan)
+        self._store_local(key, data)
+        if self._redis is not None:
+            try:
+                self._redis.set(key, data, ex=self.ttl_seconds)
+            except Exception as e:
+                print(f"[PlanCache] Redis error: {e}")
+
+    def _store_local(self, key: str, data: str) -> None:
+        with self._lock:
+            self._local[key] = data
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+
+# Global instances (lazy initialized)
+_router: IntentRouter | None = None
+_plan_cache: PlanCache | None = None
+_init_lock = threading.Lock()
+
+
+def get_intent_router(embedder) -> IntentRouter:
+    """Get the process-wide intent router (exemplars are shared through REDIS_URL)."""
+    global _router
+    if _router is None:
+        with _init_lock:
+            if _router is None:
+                _router = IntentRouter(embedder, redis_url=os.getenv("REDIS_URL"))
+    return _router
+
+
+def get_plan_cache() -> PlanCache:
+    """Get the process-wide plan cache.
+
+    Configured from PLAN_CACHE_SIZE (LRU entries), PLAN_CACHE_TTL (seconds)
+    and REDIS_URL (shared tier, omitted if unset).
+    """
+    global _plan_cache
+    if _plan_cache is None:
+        with _init_lock:
+            if _plan_cache is None:
+                _plan_cache = PlanCache(
+                    max_entries=int(os.getenv("PLAN_CACHE_SIZE", "1024")),
+                    ttl_seconds=int(os.getenv("PLAN_CACHE_TTL", "3600")),
+                    redis_url=os.getenv("REDIS_URL")
+                )
+    return _plan_cache
@@ -0,0 +1,221 @@
+"""Lexical retrieval - BM25 index over chunks, stored locally per resource."""
+
+import gzip
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .chunker import Chunk
+
+# Identifiers such as "DS28EA00", "SAMD11", "0x1F" or "spi.transfer" are kept
+# whole, and compound tokens are also indexed by their parts.
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._\-/:][a-z0-9]+)*")
+SPLIT_PATTERN = re.compile(r"[._\-/:]")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase text and split it into BM25 terms."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = SPLIT_PATTERN.split(token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if p)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 index over chunk content.
+
+    Each entry keeps the chunk's content, source and metadata so lexical
+    hits can be returned in the same shape as vector store matches.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs: list[dict] = []
+        self.lengths: list[int] = []
+        self.postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    def add_chunks(self, chunks: list[Chunk]) -> None:
+        """Add chunks to the index."""
+        for chunk in chunks:
+            doc_index = len(self.docs)
+            terms = Counter(tokenize(chunk.content))
+            self.docs.append({
+                "id": chunk.id,
+                "content": chunk.content,
+                "source": chunk.source,
+                "metadata": {
+                    "source": chunk.source,
+                    "doc_id": chunk.doc_id,
+                    "chunk_index": chunk.chunk_index,
+                    **{k: v for k, v in chunk.metadata.items() if v is not None},
+                },
+            })
+            self.lengths.append(sum(terms.values()))
+            self._add_postings(doc_index, terms)
+
+    def remove_sources(self, sources: set[str]) -> int:
+        """Drop all chunks from the given sources (rebuilds the postings).
+
+        Returns:
+            Number of chunks removed
+        """
+        kept = [doc for doc in self.docs if doc["source"] not in sources]
+        removed = len(self.docs) - len(kept)
+        if removed:
+            self.docs, self.lengths = [], []
+            self.postings = defaultdict(list)
+            for doc in kept:
+                terms = Counter(tokenize(doc["content"]))
+                self._add_postings(len(self.docs), terms)
+                self.docs.append(doc)
+                self.lengths.append(sum(terms.values()))
+        return removed
+
+    def _add_postings(self, doc_index: int, terms: Counter) -> None:
+        for term, tf in terms.items():
+            self.postings[term].append((doc_index, tf))
+
+    def search(self, query: str, top_k: int = 10) -> list[dict]:
+        """Score chunks against the query.
+
+        Returns:
+            Matches as {id, score, content, source, metadata}, best first
+        """
+        if not self.docs:
+            return []
+
+        n = len(self.docs)
+        avg_length = sum(self.lengths) / n or 1.0
+        scores: dict[int, float] = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_index, tf in postings:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc_index] / avg_length)
+                scores[doc_index] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        best = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        return [{**self.docs[doc_index], "score": score} for doc_index, score in best]
+
+    def to_dict(self) -> dict:
+        return {
+            "version": 1,
+            "k1": self.k1,
+            "b": self.b,
+            "docs": self.docs,
+            "lengths": self.lengths,
+            "postings": self.postings,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        index = cls(k1=data.get("k1", 1.5), b=data.get("b", 0.75))
+        index.docs = data["docs"]
+        index.lengths = data["lengths"]
+        index.postings = defaultdict(list, {
+            term: [tuple(p) for p in postings]
+            for term, postings in data["postings"].items()
+        })
+        return index
+
+
+class LexicalIndexStore:
+    """Stores one gzipped BM25 index file per resource on local disk.
+
+    Loaded indexes are kept in a small LRU and reloaded when the file on
+    disk changes (e.g. after a reindex in another process).
+    """
+
+    # Threads loading index files for one search
+    LOAD_WORKERS = 8
+
+    def __init__(self, base_dir: str = "lexical_indexes", max_loaded: int = 32):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(parents=True, exist_ok=True)
+        self.max_loaded = max_loaded
+        self._loaded: OrderedDict[str, tuple[float, BM25Index]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, resource_id: str) -> Path:
+        return self.base_dir / f"{resource_id}.json.gz"
+
+    def save(self, resource_id: str, index: BM25Index) -> None:
+        """Write a resource's index, replacing any previous one atomically."""
+        path = self._path(resource_id)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._loaded.pop(resource_id, None)
+
+    def load(self, resource_id: str) -> BM25Index | None:
+        """Load a resource's index, or None if it has none."""
+        path = self._path(resource_id)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+        with self._lock:
+            cached = self._loaded.get(resource_id)
+            if cached and cached[0] == mtime:
+                self._loaded.move_to_end(resource_id)
+                return cached[1]
+
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            index = BM25Index.from_dict(json.load(f))
+
+        with self._lock:
+            self._loaded[resource_id] = (mtime, index)
+            self._loaded.move_to_end(resource_id)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+        return index
+
+    def delete(self, resource_id: str) -> None:
+        """Remove a resource's index."""
+        with self._lock:
+            self._loaded.pop(resource_id, None)
+        self._path(resource_id).unlink(missing_ok=True)
+
+    def search(self, query: str, resource_ids: list[str], top_k: int = 10) -> list[dict]:
+        """Search the indexes of several resources, best matches first.
+
+        Resources without an index are skipped. Indexes not in the LRU are
+        loaded concurrently.
+        """
+        def load(resource_id: str) -> BM25Index | None:
+            try:
+                return self.load(resource_id)
+            except Exception as e:
+                print(f"[Lexical] Failed to load index for {resource_id}: {e}")
+                return None
+
+        if len(resource_ids) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.LOAD_WORKERS, len(resource_ids))) as pool:
+                indexes = list(pool.map(load, resource_ids))
+        else:
+            indexes = [load(resource_id) for resource_id in resource_ids]
+
+        results = []
+        for index in indexes:
+            if index:
+                results.extend(index.search(query, top_k=top_k))
+        results.sort(key=lambda x: x["score"], reverse=True)
+        return results[:top_k]
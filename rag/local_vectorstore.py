@@ -0,0 +1,466 @@
+"""Local vector store - memory-mapped vectors with SQLite metadata, no external service."""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from .chunker import Chunk
+from .vectorstore import VectorStore, LAYOUT_RESOURCE, SHARED_NAMESPACE
+from .chunk_store import ChunkStore, hydrate_matches
+
+
+def _match_value(value, op: str, operand) -> bool:
+    """Apply one Pinecone filter operator to a metadata value."""
+    # List-valued metadata matches if any element does
+    values = value if isinstance(value, list) else [value]
+    if op == "$eq":
+        return operand in values
+    if op == "$ne":
+        return operand not in values
+    if op == "$in":
+        return any(v in operand for v in values)
+    if op == "$nin":
+        return not any(v in operand for v in values)
+    if op == "$exists":
+        return (value is not None) == bool(operand)
+    if value is None:
+        return False
+    if op == "$gt":
+        return value > operand
+    if op == "$gte":
+        return value >= operand
+    if op == "$lt":
+        return value < operand
+    if op == "$lte":
+        return value <= operand
+    raise ValueError(f"Unsupported filter operator: {op}")
+
+
+def matches_filter(metadata: dict, filter: dict = None) -> bool:
+    """Evaluate a Pinecone-style metadata filter against a metadata dict."""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, f) for f in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, f) for f in condition):
+                return False
+        else:
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            value = metadata.get(key)
+            if not all(_match_value(value, op, operand) for op, operand in condition.items()):
+                return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+    """VectorStore backend that runs in process, for offline use and small tenants.
+
+    Each namespace is one float32 matrix file, memory-mapped and grown by
+    doubling. Rows are stored unit-normalized, so cosine similarity is a
+    single matrix-vector product followed by an argpartition top-k. Vector
+    IDs, row numbers and metadata live in SQLite (WAL mode, so the API and
+    Celery workers can share a directory). Rows freed by deletes are reused
+    by later upserts.
+
+    Filters support the Pinecone operators used by this codebase ($eq, $ne,
+    $in, $nin, $exists, $gt/$gte/$lt/$lte, $and, $or) and are evaluated in
+    Python against metadata cached per namespace.
+    """
+
+    def __init__(
+        self,
+        base_dir: str = "vector_store",
+        dimension: int = 1536,
+        layout: str = None,
+        initial_capacity: int = 1024,
+        chunk_store: ChunkStore = None
+    ):
+        self.base_dir = Path(base_dir)
+        self.index_name = str(self.base_dir)
+        self.dimension = dimension
+        self.metric = "cosine"
+        self.layout = layout or os.getenv("VECTOR_LAYOUT", LAYOUT_RESOURCE)
+        self.initial_capacity = initial_capacity
+        self.chunk_store = chunk_store
+        self._lock = threading.RLock()
+        self._db: sqlite3.Connection | None = None
+        # namespace -> (file size, memmap)
+        self._matrices: dict[str, tuple[int, np.memmap]] = {}
+        # namespace -> (version, rows, ids, metadatas)
+        self._cache: dict[str, tuple[int, np.ndarray, list[str], list[dict]]] = {}
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """SQLite connection, created with the schema on first use."""
+        if self._db is None:
+            with self._lock:
+                if self._db is None:
+                    self.base_dir.mkdir(parents=True, exist_ok=True)
+                    db = sqlite3.connect(
+                        self.base_dir / "vectors.db",
+                        check_same_thread=False,
+                        timeout=30,
+                        isolation_level=None
+                    )
+                    db.execute("PRAGMA journal_mode=WAL")
+                    db.executescript("""
+                        CREATE TABLE IF NOT EXISTS vectors (
+                            namespace TEXT NOT NULL,
+                            id TEXT NOT NULL,
+                            row INTEGER NOT NULL,
+                            metadata TEXT NOT NULL,
+                            PRIMARY KEY (namespace, id)
+                        );
+                        CREATE TABLE IF NOT EXISTS namespaces (
+                            namespace TEXT PRIMARY KEY,
+                            next_row INTEGER NOT NULL DEFAULT 0,
+                            version INTEGER NOT NULL DEFAULT 0
+                        );
+                        CREATE TABLE IF NOT EXISTS free_rows (
+                            namespace TEXT NOT NULL,
+                            row INTEGER NOT NULL,
+                            PRIMARY KEY (namespace, row)
+                        );
+                    """)
+                    self._db = db
+        return self._db
+
+    def create_index_if_not_exists(self) -> None:
+        """Create the storage directory and metadata tables."""
+        self.db
+        print(f"Local vector store ready: {self.base_dir}")
+
+    # --- Matrix files ---
+
+    def _matrix_path(self, namespace: str) -> Path:
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace) or "_default"
+        if name != namespace:
+            name += "-" + hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:8]
+        return self.base_dir / f"{name}.f32"
+
+    def _matrix(self, namespace: str, min_rows: int = 0) -> np.memmap | None:
+        """Memory-map a namespace's matrix, growing the file to hold min_rows."""
+        path = self._matrix_path(namespace)
+        row_bytes = self.dimension * 4
+        size = path.stat().st_size if path.exists() else 0
+
+        if min_rows * row_bytes > size:
+            capacity = max(self.initial_capacity, size // row_bytes)
+            while capacity < min_rows:
+                capacity *= 2
+            with open(path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+            size = capacity * row_bytes
+
+        if size == 0:
+            return None
+
+        cached = self._matrices.get(namespace)
+        if cached is None or cached[0] != size:
+            # Another process may have grown the file since it was mapped
+            matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(size // row_bytes, self.dimension))
+            self._matrices[namespace] = (size, matrix)
+            return matrix
+        return cached[1]
+
+    # --- Writes ---
+
+    def _write(self, vectors: list[dict], namespace: str) -> int:
+        """Insert or replace vectors ({id, values, metadata}) in a namespace."""
+        if not vectors:
+            return 0
+
+        values = np.asarray([v["values"] for v in vectors], dtype=np.float32)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values /= np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            db = self.db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("INSERT OR IGNORE INTO namespaces (namespace) VALUES (?)", (namespace,))
+                next_row = db.execute(
+                    "SELECT next_row FROM namespaces WHERE namespace = ?", (namespace,)
+                ).fetchone()[0]
+
+                # Existing IDs keep their row, new IDs reuse freed rows first
+                rows: dict[str, int] = {}
+                ids = [v["id"] for v in vectors]
+                for i in range(0, len(ids), 500):
+                    batch = ids[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows.update(db.execute(
+                        f"SELECT id, row FROM vectors WHERE namespace = ? AND id IN ({placeholders})",
+                        [namespace, *batch]
+                    ).fetchall())
+
+                new_ids = list(dict.fromkeys(i for i in ids if i not in rows))
+                free = [r for (r,) in db.execute(
+                    "SELECT row FROM free_rows WHERE namespace = ? ORDER BY row LIMIT ?",
+                    (namespace, len(new_ids))
+                )]
+                reused = free[:len(new_ids)]
+                for vector_id, row in zip(new_ids, reused):
+                    rows[vector_id] = row
+                for vector_id in new_ids[len(reused):]:
+                    rows[vector_id] = next_row
+                    next_row += 1
+                if reused:
+                    db.executemany(
+                        "DELETE FROM free_rows WHERE namespace = ? AND row = ?",
+                        [(namespace, row) for row in reused]
+                    )
+
+                matrix = self._matrix(namespace, min_rows=next_row)
+                matrix[[rows[v["id"]] for v in vectors]] = values
+                matrix.flush()
+
+                db.executemany(
+                    "INSERT OR REPLACE INTO vectors (namespace, id, row, metadata) VALUES (?, ?, ?, ?)",
+                    [(namespace, v["id"], rows[v["id"]], json.dumps(v["metadata"])) for v in vectors]
+                )
+                db.execute(
+                    "UPDATE namespaces SET next_row = ?, version = version + 1 WHERE namespace = ?",
+                    (next_row, namespace)
+                )
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+        return len(vectors)
+
+    def upsert(
+        self,
+        chunks: list[Chunk],
+        embeddings: list[list[float]],
+        namespace: str = "",
+        parallel: bool = True
+    ) -> dict:
+        """Insert or update vectors for chunks."""
+        vectors = self._prepare_vectors(chunks, embeddings, namespace)
+        return {"upserted_count": self._write(vectors, namespace)}
+
+    def _delete_ids(self, namespace: str, ids: list[str]) -> None:
+        """Delete vectors by ID, returning their rows to the free list."""
+        if not ids:
+            return
+        with self._lock:
+            db = self.db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for i in range(0, len(ids), 500):
+                    batch = ids[i:i + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    params = [namespace, *batch]
+                    db.execute(
+                        f"INSERT OR IGNORE INTO free_rows (namespace, row) SELECT namespace, row FROM vectors "
+                        f"WHERE namespace = ? AND id IN ({placeholders})",
+                        params
+                    )
+                    db.execute(f"DELETE FROM vectors WHERE namespace = ? AND id IN ({placeholders})", params)
+                db.execute("UPDATE namespaces SET version = version + 1 WHERE namespace = ?", (namespace,))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+
+    def _delete_by_filter(self, namespace: str, filter: dict) -> None:
+        _, _, ids, metadatas = self._namespace_state(namespace)
+        self._delete_ids(namespace, [i for i, m in zip(ids, metadatas) if matches_filter(m, filter)])
+
+    def _drop_namespace(self, namespace: str) -> None:
+        """Delete a namespace and its matrix file."""
+        with self._lock:
+            db = self.db
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                for table in ("vectors", "free_rows", "namespaces"):
+                    db.execute(f"DELETE FROM {table} WHERE namespace = ?", (namespace,))
+                db.execute("COMMIT")
+            except Exception:
+                db.execute("ROLLBACK")
+                raise
+            self._matrices.pop(namespace, None)
+            self._cache.pop(namespace, None)
+            self._matrix_path(namespace).unlink(missing_ok=True)
+
+    def delete_by_source(self, source: str, namespace: str = "", resource_id: str = None) -> None:
+        """Delete all vectors from a specific source document.
+
+        In the shared namespace the delete is scoped to resource_id, which
+        is then required.
+        """
+        if namespace == SHARED_NAMESPACE:
+            # Other resources may have a file with the same name here
+            if not resource_id:
+                raise ValueError("delete_by_source needs a resource_id in the shared namespace")
+            self.delete_sources(namespace, [source], resource_id=resource_id)
+            return
+        _, _, ids, metadatas = self._namespace_state(namespace)
+        self._delete_ids(namespace, [i for i, m in zip(ids, metadatas) if m.get("source") == source])
+        if self.chunk_store is not None:
+            self.chunk_store.delete(namespace, source=source)
+
+    def delete_resource(self, resource_id: str, namespace: str) -> None:
+        """Delete all vectors belonging to a resource."""
+        if self.chunk_store is not None:
+            self.chunk_store.delete(namespace, resource_id=None if namespace != SHARED_NAMESPACE else resource_id)
+        if namespace != SHARED_NAMESPACE:
+            self._drop_namespace(namespace)
+            return
+        self._delete_ids(namespace, self._list_ids(namespace, prefix=f"{resource_id}#"))
+
+    # --- Reads ---
+
+    def _namespace_state(self, namespace: str) -> tuple[int, np.ndarray, list[str], list[dict]]:
+        """Rows, IDs and metadata of a namespace, reloaded when it changes."""
+        row = self.db.execute(
+            "SELECT version, next_row FROM namespaces WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        if row is None:
+            return 0, np.empty(0, dtype=np.int64), [], []
+
+        version, next_row = row
+        cached = self._cache.get(namespace)
+        if cached and cached[0] == version:
+            return next_row, cached[1], cached[2], cached[3]
+
+        records = self.db.execute(
+            "SELECT id, row, metadata FROM vectors WHERE namespace = ? ORDER BY row", (namespace,)
+        ).fetchall()
+        rows = np.fromiter((r[1] for r in records), dtype=np.int64, count=len(records))
+        ids = [r[0] for r in records]
+        metadatas = [json.loads(r[2]) for r in records]
+        with self._lock:
+            self._cache[namespace] = (version, rows, ids, metadatas)
+        return next_row, rows, ids, metadatas
+
+    def query(
+        self,
+        embedding: list[float],
+        top_k: int = 5,
+        namespace: str = "",
+        filter: dict = None
+    ) -> list[dict]:
+        """Query the namespace for the most similar vectors."""
+        used, rows, ids, metadatas = self._namespace_state(namespace)
+        if not ids:
+            return []
+
+        positions = np.arange(len(ids))
+        if filter:
+            positions = np.fromiter(
+                (i for i, m in enumerate(metadatas) if matches_filter(m, filter)),
+                dtype=np.int64
+            )
+            if positions.size == 0:
+                return []
+
+        query = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        # Score the contiguous block of used rows (no copy out of the memmap),
+        # then pick the live rows that passed the filter
+        with self._lock:
+            matrix = self._matrix(namespace, min_rows=used)
+        scores = (matrix[:used] @ query)[rows[positions]]
+
+        k = min(top_k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            metadata = metadatas[positions[i]]
+            results.append({
+                "id": ids[positions[i]],
+                "namespace": namespace,
+                "score": float(scores[i]),
+                "content": metadata.get("content", ""),
+                "source": metadata.get("source", ""),
+                "metadata": metadata
+            })
+        return results
+
+    def _list_ids(self, namespace: str, prefix: str = None, limit: int = None) -> list[str]:
+        """List vector IDs in a namespace, optionally by ID prefix."""
+        sql = "SELECT id FROM vectors WHERE namespace = ?"
+        params: list = [namespace]
+        if prefix:
+            sql += " AND substr(id, 1, ?) = ?"
+            params += [len(prefix), prefix]
+        sql += " ORDER BY row"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [r[0] for r in self.db.execute(sql, params)]
+
+    def move_to_shared(self, resource_id: str, source_namespace: str, batch_size: int = 100) -> int:
+        """Copy a resource's vectors from its own namespace into the shared one."""
+        used, rows, ids, metadatas = self._namespace_state(source_namespace)
+        if not ids:
+            return 0
+
+        matrix = self._matrix(source_namespace, min_rows=used)
+        copied = 0
+        for i in range(0, len(ids), batch_size):
+            self._copy_chunk_records(resource_id, source_namespace, ids[i:i + batch_size])
+            batch = []
+            for j in range(i, min(i + batch_size, len(ids))):
+                batch.append({
+                    "id": f"{resource_id}#{ids[j]}",
+                    "values": np.array(matrix[rows[j]]),
+                    "metadata": {**metadatas[j], "resource_id": resource_id}
+                })
+            copied += self._write(batch, SHARED_NAMESPACE)
+        return copied
+
+    def stats(self) -> dict:
+        """Vector counts per namespace."""
+        counts = dict(self.db.execute("SELECT namespace, COUNT(*) FROM vectors GROUP BY namespace").fetchall())
+        return {
+            "dimension": self.dimension,
+            "total_vector_count": sum(counts.values()),
+            "namespaces": {ns: {"vector_count": n} for ns, n in counts.items()},
+        }
+
+    def list_vectors(self, namespace: str = "", limit: int = 100, prefix: str = None) -> list[dict]:
+        """List vectors in a namespace with their metadata, in chunk order."""
+        sql = "SELECT id, metadata FROM vectors WHERE namespace = ?"
+        params: list = [namespace]
+        if prefix:
+            sql += " AND substr(id, 1, ?) = ?"
+            params += [len(prefix), prefix]
+        sql += " ORDER BY row LIMIT ?"
+        params.append(limit)
+
+        vectors = []
+        for vector_id, raw in self.db.execute(sql, params):
+            metadata = json.loads(raw)
+            vectors.append({
+                "id": vector_id,
+                "namespace": namespace,
+                "content": metadata.get("content", ""),
+                "source": metadata.get("source", ""),
+                "chunk_index": metadata.get("chunk_index", 0),
+                "metadata": metadata
+            })
+
+        if self.chunk_store is not None:
+            hydrate_matches(self.chunk_store, vectors)
+
+        vectors.sort(key=lambda x: x.get("chunk_index", 0))
+        return vectors
@@ -2,14 +2,19 @@
 
 import os
 from pathlib import Path
+from typing import Iterable
 from dotenv import load_dotenv
 from anthropic import Anthropic
 
 from .ingest import DocumentLoader, Document
 from .chunker import Chunker, Chunk
 from .embeddings import Embedder
-from .vectorstore import VectorStore
+from .embedding_cache import ChunkEmbeddingStore
+from .chunk_store import ChunkStore
+from .vectorstore import VectorStore, create_vectorstore
 from .retriever import Retriever, RetrievalResult
+from .lexical import BM25Index, LexicalIndexStore
+from .streaming import StreamingIngestor
 from .llm import LLM
 
 
@@ -93,6 +98,12 @@ class RAGPipeline:
         embedding_model: str = "text-embedding-3-small",
         llm_model: str = "claude-sonnet-4-20250514",
         llm_provider: str = "anthropic",
+        embedding_store: ChunkEmbeddingStore = None,
+        chunk_store: ChunkStore = None,
+        embedder: Embedder = None,
+        vectorstore: VectorStore = None,
+        lexical_store: LexicalIndexStore = None,
+        retrieval_mode: str = "dense",
     ):
         # Load from environment if not provided
         load_dotenv()
@@ -102,16 +113,27 @@ class RAGPipeline:
         pinecone_key = pinecone_api_key or os.getenv("PINECONE_API_KEY")
         index_name = pinecone_index_name or os.getenv("PINECONE_INDEX_NAME", "akleao-research")
 
-        # Initialize components
+        # Initialize components (embedder/vectorstore may be shared, long-lived clients)
         self.loader = DocumentLoader()
         self.chunker = Chunker(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        self.embedder = Embedder(api_key=openai_key, model=embedding_model)
-        self.vectorstore = VectorStore(
+        self.embedder = embedder or Embedder(api_key=openai_key, model=embedding_model, chunk_store=embedding_store)
+        # Pinecone unless VECTOR_STORE_BACKEND=local
+        self.vectorstore = vectorstore or create_vectorstore(
             api_key=pinecone_key,
             index_name=index_name,
-            dimension=self.embedder.dimensions
+            dimension=self.embedder.dimensions,
+            chunk_store=chunk_store
         )
+        # Per-resource BM25 indexes, built during ingestion when configured
+        self.lexical_store = lexical_store
         self.retriever = Retriever(
+            embedder=self.embedder,
+            vectorstore=self.vectorstore,
+            lexical_store=lexical_store,
+            mode=retrieval_mode
+        )
+        self.ingestor = StreamingIngestor(
+            chunker=self.chunker,
             embedder=self.embedder,
             vectorstore=self.vectorstore
         )
@@ -132,7 +154,8 @@ class RAGPipeline:
         path: str | Path,
         namespace: str = "",
         resource_id: str = None,
-        generate_summary: bool = False
+        generate_summary: bool = False,
+        documents: list[Document] = None
     ) -> dict:
         """Ingest documents from a file or directory.
 
@@ -141,6 +164,7 @@ class RAGPipeline:
             namespace: Pinecone namespace to store vectors in
             resource_id: Optional resource ID for source linking
             generate_summary: If True, generate an LLM summary of the document
+            documents: Documents already parsed from path (skips loading)
 
         Returns:
             Dict with ingestion stats and optional summary
@@ -148,37 +172,23 @@ class RAGPipeline:
         if not self._initialized:
             self.initialize()
 
-        # Load documents
-        print(f"Loading documents from: {path}")
-        documents = self.loader.load(path)
-        print(f"Loaded {len(documents)} document(s)")
-
-        # Add resource_id to document metadata if provided
-        if resource_id:
-            for doc in documents:
-                doc.metadata["resource_id"] = resource_id
-
-        # Chunk documents
-        print("Chunking documents...")
-        chunks = self.chunker.chunk_documents(documents)
-        print(f"Created {len(chunks)} chunk(s)")
-
-        # Generate embeddings
-        print("Generating embeddings...")
-        chunk_embeddings = self.embedder.embed_chunks(chunks)
-        embeddings = [emb for _, emb in chunk_embeddings]
-        print(f"Generated {len(embeddings)} embedding(s)")
-
-        # Store in vector database
-        print("Storing in Pinecone...")
-        result = self.vectorstore.upsert(chunks, embeddings, namespace=namespace)
-        print(f"Upserted {result['upserted_count']} vector(s)")
-
-        output = {
-            "documents": len(documents),
-            "chunks": len(chunks),
-            "vectors_upserted": result["upserted_count"]
-        }
+        if documents is None:
+            # Load documents
+            print(f"Loading documents from: {path}")
+            documents = self.loader.load(path)
+            print(f"Loaded {len(documents)} document(s)")
+
+        # Chunk, embed and upsert as a stream
+        print("Chunking, embedding and storing in Pinecone...")
+        lexical_index = self._new_lexical_index(resource_id)
+        output = self.ingestor.run(
+            documents,
+            namespace=namespace,
+            on_document=self._tag_resource(resource_id),
+            on_chunks=lexical_index.add_chunks if lexical_index else None
+        )
+        self._save_lexical_index(resource_id, lexical_index)
+        print(f"Upserted {output['vectors_upserted']} vector(s) from {output['chunks']} chunk(s)")
 
         # Generate summary if requested
         if generate_summary and documents:
@@ -254,31 +264,24 @@ class RAGPipeline:
         document = self.loader.load_url(url)
         print(f"Loaded document: {document.doc_type}")
 
-        # Add resource_id to document metadata if provided
-        if resource_id:
-            document.metadata["resource_id"] = resource_id
-
-        # Chunk document
-        print("Chunking document...")
-        chunks = self.chunker.chunk_documents([document])
-        print(f"Created {len(chunks)} chunk(s)")
-
-        # Generate embeddings
-        print("Generating embeddings...")
-        chunk_embeddings = self.embedder.embed_chunks(chunks)
-        embeddings = [emb for _, emb in chunk_embeddings]
-        print(f"Generated {len(embeddings)} embedding(s)")
-
-        # Store in vector database
-        print("Storing in Pinecone...")
-        result = self.vectorstore.upsert(chunks, embeddings, namespace=namespace)
-        print(f"Upserted {result['upserted_count']} vector(s)")
+        # Chunk, embed and upsert as a stream
+        print("Chunking, embedding and storing in Pinecone...")
+        lexical_index = self._new_lexical_index(resource_id)
+        result = self.ingestor.run(
+            [document],
+            namespace=namespace,
+            on_document=self._tag_resource(resource_id),
+            on_chunks=lexical_index.add_chunks if lexical_index else None
+        )
+        self._save_lexical_index(resource_id, lexical_index)
+        print(f"Upserted {result['vectors_upserted']} vector(s) from {result['chunks']} chunk(s)")
 
         output = {
             "url": url,
             "doc_type": document.doc_type,
-            "chunks": len(chunks),
-            "vectors_upserted": result["upserted_count"]
+            "chunks": result["chunks"],
+            "vectors_upserted": result["vectors_upserted"],
+            "stage_stats": result["stage_stats"]
         }
 
         # Generate summary if requested
@@ -294,65 +297,70 @@ class RAGPipeline:
 
     def ingest_documents(
         self,
-        documents: list[Document],
+        documents: Iterable[Document],
         namespace: str = "",
         resource_id: str = None,
-        generate_summary: bool = False
+        generate_summary: bool = False,
+        replace: bool = False
     ) -> dict:
-        """Ingest a list of pre-loaded documents (e.g., from a git repository).
+        """Ingest pre-loaded documents (e.g., from a git repository).
 
         Args:
-            documents: List of Document objects to ingest
+            documents: Document objects to ingest - a list or a lazy iterable
             namespace: Pinecone namespace to store vectors in
             resource_id: Optional resource ID for source linking
             generate_summary: If True, generate an LLM summary of the documents
+            replace: If True, the resource's vectors in namespace that this
+                ingest didn't rewrite are deleted once it succeeds (needs
+                resource_id; namespace must be the resource's own or the
+                shared one)
 
         Returns:
-            Dict with ingestion stats and optional summary
+            Dict with ingestion stats, optional summary and, with replace,
+            vectors_deleted
         """
         if not self._initialized:
             self.initialize()
 
-        if not documents:
-            return {"documents": 0, "chunks": 0, "vectors_upserted": 0}
-
-        print(f"Ingesting {len(documents)} document(s)")
-
-        # Add resource_id to document metadata if provided
-        if resource_id:
-            for doc in documents:
-                doc.metadata["resource_id"] = resource_id
-
-        # Chunk documents
-        print("Chunking documents...")
-        chunks = self.chunker.chunk_documents(documents)
-        print(f"Created {len(chunks)} chunk(s)")
-
-        if not chunks:
-            return {"documents": len(documents), "chunks": 0, "vectors_upserted": 0}
-
-        # Generate embeddings
-        print("Generating embeddings...")
-        chunk_embeddings = self.embedder.embed_chunks(chunks)
-        embeddings = [emb for _, emb in chunk_embeddings]
-        print(f"Generated {len(embeddings)} embedding(s)")
-
-        # Store in vector database
-        print("Storing in Pinecone...")
-        result = self.vectorstore.upsert(chunks, embeddings, namespace=namespace)
-        print(f"Upserted {result['upserted_count']} vector(s)")
+        # Keep the first N files for the summary (to avoid token limits)
+        sample_docs = []
+        tag_resource = self._tag_resource(resource_id)
+
+        def on_document(doc: Document):
+            if tag_resource:
+                tag_resource(doc)
+            if len(sample_docs) < 10:
+                sample_docs.append(doc)
+
+        # Chunk, embed and upsert as a stream
+        print("Ingesting documents...")
+        lexical_index = self._new_lexical_index(resource_id)
+        written_ids: set[str] = set()
+
+        def on_chunks(chunks: list[Chunk]):
+            if lexical_index:
+                lexical_index.add_chunks(chunks)
+            if replace:
+                written_ids.update(self.vectorstore.vector_id(chunk, namespace) for chunk in chunks)
+
+        output = self.ingestor.run(
+            documents,
+            namespace=namespace,
+            on_document=on_document,
+            on_chunks=on_chunks
+        )
+        self._save_lexical_index(resource_id, lexical_index)
+        print(f"Ingested {output['documents']} document(s): {output['chunks']} chunk(s), "
+              f"{output['vectors_upserted']} vector(s)")
 
-        output = {
-            "documents": len(documents),
-            "chunks": len(chunks),
-            "vectors_upserted": result["upserted_count"]
-        }
+        if replace and resource_id:
+            # Old vectors go only after the new ones are in
+            output["vectors_deleted"] = self.vectorstore.delete_stale_vectors(resource_id, namespace, written_ids)
+            print(f"Removed {output['vectors_deleted']} stale vector(s)")
 
         # Generate summary if requested
-        if generate_summary and documents:
+        if generate_summary and sample_docs:
             print("Generating document summary...")
-            # Sample first N files for summary (to avoid token limits)
-            sample_docs = documents[:10]
             combined_content = "\n\n---\n\n".join([
                 f"File: {doc.source}\n{doc.content[:2000]}"
                 for doc in sample_docs
@@ -363,6 +371,77 @@ class RAGPipeline:
 
         return output
 
+    def sync_documents(
+        self,
+        documents: Iterable[Document],
+        stale_sources: list[str],
+        namespace: str,
+        resource_id: str
+    ) -> dict:
+        """Incrementally update a resource: replace some sources, keep the rest.
+
+        Vectors (and lexical index entries) for every stale source - changed
+        or deleted files - are removed, then the given documents are ingested.
+        Everything else indexed for the resource is left as is.
+
+        Args:
+            documents: New versions of the changed sources
+            stale_sources: Sources whose existing chunks must be dropped
+            namespace: Pinecone namespace of the resource
+            resource_id: Resource being updated
+
+        Returns:
+            Dict with ingestion stats plus vectors_deleted
+        """
+        if not self._initialized:
+            self.initialize()
+
+        deleted = self.vectorstore.delete_sources(namespace, stale_sources, resource_id=resource_id)
+        print(f"Removed vectors for {len(stale_sources)} stale source(s) ({deleted} vector(s))")
+
+        lexical_index = None
+        if self.lexical_store is not None:
+            lexical_index = self.lexical_store.load(resource_id) or BM25Index()
+            lexical_index.remove_sources(set(stale_sources))
+
+        output = self.ingestor.run(
+            documents,
+            namespace=namespace,
+            on_document=self._tag_resource(resource_id),
+            on_chunks=lexical_index.add_chunks if lexical_index else None
+        )
+        self._save_lexical_index(resource_id, lexical_index)
+        print(f"Re-ingested {output['documents']} document(s): {output['chunks']} chunk(s)")
+
+        output["vectors_deleted"] = deleted
+        return output
+
+    @staticmethod
+    def _tag_resource(resource_id: str = None):
+        """Callback adding resource_id to document metadata, or None."""
+        if not resource_id:
+            return None
+
+        def tag(doc: Document):
+            doc.metadata["resource_id"] = resource_id
+        return tag
+
+    def _new_lexical_index(self, resource_id: str = None) -> BM25Index | None:
+        """Empty BM25 index to fill during ingestion, if lexical search is enabled."""
+        if self.lexical_store is None or not resource_id:
+            return None
+        return BM25Index()
+
+    def _save_lexical_index(self, resource_id: str, index: BM25Index | None) -> None:
+        """Persist a resource's BM25 index. Failures only disable lexical hits."""
+        if index is None:
+            return
+        try:
+            self.lexical_store.save(resource_id, index)
+            print(f"Saved lexical index with {len(index)} chunk(s)")
+        except Exception as e:
+            print(f"[Lexical] Failed to save index for {resource_id}: {e}")
+
     def stats(self) -> dict:
         """Get statistics about the vector store."""
         if not self._initialized:
@@ -0,0 +1,73 @@
+"""Reranking - rescores retrieval candidates before they are cut to top_k."""
+
+import math
+from abc import ABC, abstractmethod
+from dataclasses import replace
+from typing import TYPE_CHECKING
+
+from .lexical import tokenize
+
+if TYPE_CHECKING:
+    from .retriever import RetrievalResult
+
+# Common words that say nothing about whether a chunk answers the query
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for",
+    "from", "how", "i", "in", "is", "it", "of", "on", "or", "that", "the", "this",
+    "to", "what", "when", "where", "which", "who", "why", "with", "you",
+}
+
+
+class Reranker(ABC):
+    """Rescores an over-fetched candidate list for a query."""
+
+    name: str = "reranker"
+
+    @abstractmethod
+    def rerank(self, query: str, candidates: list["RetrievalResult"]) -> list["RetrievalResult"]:
+        """Rescore candidates.
+
+        Returns:
+            Candidates with updated scores, best first
+        """
+        pass
+
+
+class LexicalReranker(Reranker):
+    """Blends the retrieval score with query term coverage.
+
+    Coverage is the IDF-weighted share of query terms that appear in a
+    chunk, with IDF taken over the candidate set, so a chunk containing the
+    one rare term in the query (a part number, a register name) moves up
+    past chunks that only match common words. Runs locally in well under a
+    millisecond per candidate.
+    """
+
+    name = "lexical"
+
+    def __init__(self, weight: float = 0.4):
+        # Share of the final score that comes from term coverage
+        self.weight = weight
+
+    def rerank(self, query: str, candidates: list["RetrievalResult"]) -> list["RetrievalResult"]:
+        query_terms = {t for t in tokenize(query) if t not in STOPWORDS}
+        if not query_terms or not candidates:
+            return sorted(candidates, key=lambda r: r.score, reverse=True)
+
+        candidate_terms = [set(tokenize(r.content)) for r in candidates]
+        n = len(candidates)
+        idf = {
+            term: math.log(1 + n / (1 + sum(term in terms for terms in candidate_terms)))
+            for term in query_terms
+        }
+        total = sum(idf.values())
+
+        reranked = []
+        for result, terms in zip(candidates, candidate_terms):
+            coverage = sum(idf[t] for t in query_terms if t in terms) / total
+            score = (1 - self.weight) * result.score + self.weight * coverage
+            metadata = {**result.metadata, "retrieval_score": result.score, "term_coverage": round(coverage, 4)}
+            reranked.append(replace(result, score=round(score, 4), metadata=metadata))
+
+        reranked.sort(key=lambda r: r.score, reverse=True)
+        return reranked
@@ -1,8 +1,19 @@
 """Retrieval module - finds relevant chunks for a query."""
 
+import heapq
+import itertools
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dataclasses import dataclass
 from .embeddings import Embedder
-from .vectorstore import VectorStore
+from .vectorstore import VectorStore, SHARED_NAMESPACE, scope_filter
+from .lexical import LexicalIndexStore
+from .rerank import Reranker
+from .chunk_store import hydrate_matches
+
+# Reciprocal rank fusion constant (standard value from Cormack et al.)
+RRF_K = 60
 
 
 @dataclass
@@ -12,6 +23,9 @@ class RetrievalResult:
     source: str
     score: float
     metadata: dict
+    # Vector ID and namespace, used to hydrate content from the chunk store
+    id: str = None
+    namespace: str = None
 
 
 class Retriever:
@@ -22,12 +36,26 @@ class Retriever:
         embedder: Embedder,
         vectorstore: VectorStore,
         top_k: int = 5,
-        score_threshold: float = 0.3
+        score_threshold: float = 0.3,
+        max_workers: int = 8,
+        namespace_timeout: float = 5.0,
+        lexical_store: LexicalIndexStore = None,
+        mode: str = "dense",
+        reranker: Reranker = None,
+        overfetch: int = 4
     ):
         self.embedder = embedder
         self.vectorstore = vectorstore
         self.top_k = top_k
         self.score_threshold = score_threshold
+        self.max_workers = max_workers
+        self.namespace_timeout = namespace_timeout
+        # "dense" or "hybrid" (BM25 + dense, fused with reciprocal rank fusion)
+        self.lexical_store = lexical_store
+        self.mode = mode
+        # With a reranker, overfetch * top_k candidates are rescored and cut to top_k
+        self.reranker = reranker
+        self.overfetch = overfetch
 
     def retrieve(
         self,
@@ -35,7 +63,11 @@ class Retriever:
         top_k: int = None,
         namespace: str = "",
         namespaces: list[str] = None,
-        filter: dict = None
+        filter: dict = None,
+        parallel: bool = True,
+        resource_ids: list[str] = None,
+        stats: dict = None,
+        query_embedding: list[float] = None
     ) -> list[RetrievalResult]:
         """Retrieve relevant chunks for a query.
 
@@ -45,42 +77,287 @@ class Retriever:
             namespace: Single namespace to search (deprecated, use namespaces)
             namespaces: List of namespaces to search across
             filter: Metadata filter to apply
+            parallel: Query multiple namespaces concurrently
+            resource_ids: Resources to scope the shared namespace to. The
+                shared namespace is skipped if this is empty, since it holds
+                vectors for every resource.
+            stats: Optional dict that receives timings (retrieve_ms, rerank_ms)
+                and the number of candidates considered
+            query_embedding: The query's embedding, if the caller already has
+                it (skips embedding the query again)
         """
-        # Embed the query
-        query_embedding = self.embedder.embed_text(query)
-
         # Support both single namespace (backwards compat) and multiple namespaces
         ns_list = namespaces if namespaces else ([namespace] if namespace else [""])
 
-        all_results = []
+        # Resources in the shared namespace are reached with one filtered query
+        filters = {}
+        for ns in ns_list:
+            if ns == SHARED_NAMESPACE:
+                if resource_ids:
+                    filters[ns] = scope_filter(resource_ids, filter)
+            else:
+                filters[ns] = filter
         k = top_k or self.top_k
+        started = time.time()
 
-        # Query each namespace and combine results
-        for ns in ns_list:
-            results = self.vectorstore.query(
-                embedding=query_embedding,
+        # Overfetch so the reranker has more than k candidates to choose from
+        n = k * self.overfetch if self.reranker else k
+        candidates = self._search(
+            query, n, filters, parallel, ns_list, resource_ids,
+            use_lexical=not filter, query_embedding=query_embedding
+        )
+        # Only the candidates that can still be returned are hydrated
+        self._hydrate(candidates)
+        if stats is not None:
+            stats["candidates"] = len(candidates)
+            stats["retrieve_ms"] = int((time.time() - started) * 1000)
+
+        if self.reranker and candidates:
+            started = time.time()
+            try:
+                candidates = self.reranker.rerank(query, candidates)
+            except Exception as e:
+                print(f"[Retriever] Rerank failed, keeping retrieval order: {e}")
+            if stats is not None:
+                stats["rerank_ms"] = int((time.time() - started) * 1000)
+                stats["reranker"] = self.reranker.name
+
+        return candidates[:k]
+
+    def _search(
+        self,
+        query: str,
+        k: int,
+        filters: dict[str, dict],
+        parallel: bool,
+        ns_list: list[str],
+        resource_ids: list[str] = None,
+        use_lexical: bool = True,
+        query_embedding: list[float] = None
+    ) -> list[RetrievalResult]:
+        """Best k candidates from dense search, fused with lexical search in hybrid mode."""
+        # Lexical search can't apply metadata filters, so those stay dense-only
+        use_lexical = use_lexical and self.mode == "hybrid" and self.lexical_store is not None
+        if not use_lexical:
+            return [
+                self._to_result(match)
+                for match in self._dense_search(query, k, filters, parallel, query_embedding)
+            ]
+
+        # Per-resource namespaces are named after their resource
+        lexical_ids = resource_ids or [ns for ns in ns_list if ns and ns != SHARED_NAMESPACE]
+
+        # Fuse deeper candidate lists than we return, so RRF has overlap to work with
+        depth = k * 2
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            lexical_future = pool.submit(self.lexical_store.search, query, lexical_ids, depth)
+            dense = self._dense_search(query, depth, filters, parallel, query_embedding)
+            try:
+                lexical = lexical_future.result()
+            except Exception as e:
+                print(f"[Retriever] Lexical search failed, using dense results only: {e}")
+                lexical = []
+
+        return self._fuse(dense, lexical, k)
+
+    def _dense_search(
+        self,
+        query: str,
+        k: int,
+        filters: dict[str, dict],
+        parallel: bool = True,
+        query_embedding: list[float] = None
+    ) -> list[dict]:
+        """Embed the query and return the best k vector matches above threshold."""
+        if query_embedding is None:
+            query_embedding = self.embedder.embed_text(query)
+        ns_list = list(filters)
+
+        # Bounded min-heap holding the best k matches seen so far. Matches
+        # below the score threshold can never make the final list, so they
+        # are dropped as they arrive instead of being sorted at the end.
+        heap = []
+        counter = itertools.count()
+
+        def merge(results: list[dict]):
+            for result in results:
+                if result["score"] < self.score_threshold:
+                    continue
+                item = (result["score"], next(counter), result)
+                if len(heap) < k:
+                    heapq.heappush(heap, item)
+                elif item[0] > heap[0][0]:
+                    heapq.heapreplace(heap, item)
+
+        if parallel and len(ns_list) > 1:
+            self._fan_out(query_embedding, k, filters, merge)
+        else:
+            for ns in ns_list:
+                merge(self.vectorstore.query(
+                    embedding=query_embedding,
+                    top_k=k,
+                    namespace=ns,
+                    filter=filters[ns]
+                ))
+
+        # Best score first
+        return [result for _, _, result in sorted(heap, key=lambda x: (-x[0], x[1]))]
+
+    @staticmethod
+    def _to_result(match: dict) -> RetrievalResult:
+        return RetrievalResult(
+            content=match["content"],
+            source=match["source"],
+            score=match["score"],
+            metadata=match["metadata"],
+            id=match.get("id"),
+            namespace=match.get("namespace")
+        )
+
+    def _hydrate(self, results: list[RetrievalResult]) -> None:
+        """Load content and full metadata from the chunk store, in one lookup per namespace."""
+        chunk_store = getattr(self.vectorstore, "chunk_store", None)
+        pending = [r for r in results if not r.content and r.id]
+        if chunk_store is None or not pending:
+            return
+
+        matches = [
+            {"id": r.id, "namespace": r.namespace or "", "content": "", "source": r.source, "metadata": r.metadata}
+            for r in pending
+        ]
+        try:
+            hydrate_matches(chunk_store, matches)
+        except Exception as e:
+            print(f"[Retriever] Failed to hydrate {len(pending)} chunk(s): {e}")
+            return
+        for result, match in zip(pending, matches):
+            result.content = match["content"]
+            result.source = match["source"]
+            result.metadata = match["metadata"]
+
+    @staticmethod
+    def _match_key(match: dict) -> tuple:
+        """Identify a chunk across dense and lexical results."""
+        metadata = match.get("metadata") or {}
+        if metadata.get("doc_id") is None:
+            return ("id", match.get("id"))
+        # Pinecone returns numeric metadata as floats
+        return (metadata.get("resource_id"), metadata["doc_id"], int(metadata.get("chunk_index", 0)))
+
+    def _fuse(self, dense: list[dict], lexical: list[dict], k: int) -> list[RetrievalResult]:
+        """Merge ranked dense and lexical matches with reciprocal rank fusion.
+
+        Scores are normalized so a chunk ranked first by both searches gets
+        1.0. The per-search scores are kept in the result metadata.
+        """
+        fused: dict[tuple, dict] = {}
+        for kind, matches in (("dense", dense), ("lexical", lexical)):
+            for rank, match in enumerate(matches, 1):
+                entry = fused.setdefault(self._match_key(match), {"match": match, "rrf": 0.0})
+                if not entry["match"].get("content") and match.get("content"):
+                    # Lexical hits carry content, so the chunk needn't be hydrated
+                    entry["match"] = match
+                entry["rrf"] += 1 / (RRF_K + rank)
+                entry[f"{kind}_score"] = match["score"]
+
+        max_rrf = 2 / (RRF_K + 1)
+        ranked = sorted(fused.values(), key=lambda e: e["rrf"], reverse=True)[:k]
+
+        results = []
+        for entry in ranked:
+            match = entry["match"]
+            metadata = dict(match["metadata"])
+            metadata["rrf_score"] = round(entry["rrf"], 6)
+            for kind in ("dense", "lexical"):
+                if f"{kind}_score" in entry:
+                    metadata[f"{kind}_score"] = entry[f"{kind}_score"]
+            results.append(RetrievalResult(
+                content=match["content"],
+                source=match["source"],
+                score=round(entry["rrf"] / max_rrf, 4),
+                metadata=metadata,
+                id=match.get("id"),
+                namespace=match.get("namespace")
+            ))
+        return results
+
+    def _fan_out(
+        self,
+        embedding: list[float],
+        k: int,
+        filters: dict[str, dict],
+        merge
+    ):
+        """Query namespaces concurrently, merging each shard as it completes.
+
+        Each namespace gets namespace_timeout from when its query starts; one
+        that hasn't answered by then is dropped so a single slow shard can't
+        stall the whole search. Namespaces still queued behind hung workers
+        are dropped at a backstop of namespace_timeout per wave of work.
+
+        Args:
+            filters: Metadata filter to apply, keyed by namespace
+        """
+        ns_list = list(filters)
+        workers = min(self.max_workers, len(ns_list))
+        waves = math.ceil(len(ns_list) / workers)
+        backstop = time.monotonic() + self.namespace_timeout * waves
+        started = {}  # Namespace -> monotonic time its query started
+
+        def query(ns: str, ns_filter: dict):
+            started[ns] = time.monotonic()
+            return self.vectorstore.query(
+                embedding=embedding,
                 top_k=k,
                 namespace=ns,
-                filter=filter
+                filter=ns_filter
             )
-            all_results.extend(results)
-
-        # Sort by score descending and take top_k
-        all_results.sort(key=lambda x: x["score"], reverse=True)
-        all_results = all_results[:k]
-
-        # Filter by score threshold and convert to RetrievalResult
-        retrieved = []
-        for result in all_results:
-            if result["score"] >= self.score_threshold:
-                retrieved.append(RetrievalResult(
-                    content=result["content"],
-                    source=result["source"],
-                    score=result["score"],
-                    metadata=result["metadata"]
-                ))
 
-        return retrieved
+        executor = ThreadPoolExecutor(max_workers=workers)
+        futures = {
+            executor.submit(query, ns, ns_filter): ns
+            for ns, ns_filter in filters.items()
+        }
+
+        errors = []
+        dropped = []
+        pending = set(futures)
+        try:
+            while pending:
+                now = time.monotonic()
+                # A query starting during the wait has its deadline at least
+                # namespace_timeout away, so waking that often catches it
+                wake = min(
+                    [started[futures[f]] + self.namespace_timeout for f in pending if futures[f] in started]
+                    + [backstop, now + self.namespace_timeout]
+                )
+                done, pending = wait(pending, timeout=max(0.0, wake - now), return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        merge(future.result())
+                    except Exception as e:
+                        errors.append(e)
+                        print(f"[Retriever] Namespace '{futures[future]}' failed: {e}")
+
+                now = time.monotonic()
+                expired = {
+                    f for f in pending
+                    if now >= backstop
+                    or (futures[f] in started and now >= started[futures[f]] + self.namespace_timeout)
+                }
+                if expired:
+                    pending -= expired
+                    dropped.extend(futures[f] for f in expired)
+        finally:
+            # Don't wait for stragglers - their results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if dropped:
+            print(f"[Retriever] Dropped {len(dropped)} slow namespace(s) after {self.namespace_timeout:.1f}s: {dropped}")
+
+        # Only fail the search if every namespace failed
+        if errors and len(errors) == len(ns_list):
+            raise errors[0]
 
     def format_context(self, results: list[RetrievalResult]) -> str:
         """Format retrieved results as context for the LLM."""
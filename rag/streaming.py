@@ -0,0 +1,215 @@
+"""Streaming ingestion - chunk, embed and upsert stages linked by bounded queues."""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from .ingest import Document
+from .chunker import Chunker, Chunk
+from .embeddings import Embedder
+from .vectorstore import VectorStore
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+@dataclass
+class StageStats:
+    """Throughput counters for one ingestion stage."""
+    name: str
+    items: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "items": self.items,
+            "batches": self.batches,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "items_per_second": round(self.items / self.busy_seconds, 1) if self.busy_seconds else None,
+        }
+
+
+class StreamingIngestor:
+    """Runs chunk -> embed -> upsert as concurrent stages.
+
+    Chunks are grouped into embedding batches as soon as they are produced,
+    and each embedded batch is upserted while later batches are still being
+    embedded. Stages are connected by bounded queues, so peak memory is set
+    by queue depth and batch size rather than by document size.
+
+    Stats are recorded per stage: load (pulling documents from the input
+    iterable), chunk, embed and upsert. Busy time excludes time spent
+    waiting on queues, so items_per_second is each stage's own throughput.
+    """
+
+    def __init__(
+        self,
+        chunker: Chunker,
+        embedder: Embedder,
+        vectorstore: VectorStore,
+        embed_batch_size: int = 1024,
+        embed_workers: int = 1,
+        queue_depth: int = 4
+    ):
+        self.chunker = chunker
+        self.embedder = embedder
+        self.vectorstore = vectorstore
+        self.embed_batch_size = embed_batch_size
+        self.embed_workers = embed_workers
+        self.queue_depth = queue_depth
+
+    def run(
+        self,
+        documents: Iterable[Document],
+        namespace: str = "",
+        on_document: Callable[[Document], None] = None,
+        on_chunks: Callable[[list[Chunk]], None] = None
+    ) -> dict:
+        """Ingest documents, streaming them through all stages.
+
+        Args:
+            documents: Documents to ingest - any iterable, consumed lazily
+            namespace: Pinecone namespace to store vectors in
+            on_document: Called with each document before it is chunked
+            on_chunks: Called with each document's chunks (e.g. to build a
+                lexical index alongside the vectors)
+
+        Returns:
+            Dict with documents/chunks/vectors_upserted counts and stage_stats
+        """
+        stats = {name: StageStats(name) for name in ("load", "chunk", "embed", "upsert")}
+        stats_lock = threading.Lock()
+        embed_q: queue.Queue = queue.Queue(maxsize=self.queue_depth)
+        upsert_q: queue.Queue = queue.Queue(maxsize=self.queue_depth)
+        stop = threading.Event()
+        errors: list[Exception] = []
+        counts = {"documents": 0, "chunks": 0, "vectors_upserted": 0}
+
+        def put(q: queue.Queue, item) -> bool:
+            # Bounded put that gives up if another stage failed
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q: queue.Queue):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _DONE
+
+        def fail(e: Exception):
+            errors.append(e)
+            stop.set()
+
+        def chunk_stage():
+            try:
+                batch: list[Chunk] = []
+                iterator = iter(documents)
+                while not stop.is_set():
+                    started = time.time()
+                    try:
+                        doc = next(iterator)
+                    except StopIteration:
+                        break
+                    stats["load"].busy_seconds += time.time() - started
+                    stats["load"].items += 1
+                    counts["documents"] += 1
+
+                    if on_document:
+                        on_document(doc)
+
+                    started = time.time()
+                    chunks = self.chunker.chunk_document(doc)
+                    stats["chunk"].busy_seconds += time.time() - started
+                    stats["chunk"].items += len(chunks)
+                    counts["chunks"] += len(chunks)
+
+                    if on_chunks:
+                        on_chunks(chunks)
+
+                    batch.extend(chunks)
+                    while len(batch) >= self.embed_batch_size:
+                        stats["chunk"].batches += 1
+                        if not put(embed_q, batch[:self.embed_batch_size]):
+                            return
+                        batch = batch[self.embed_batch_size:]
+
+                if batch:
+                    stats["chunk"].batches += 1
+                    put(embed_q, batch)
+            except Exception as e:
+                fail(e)
+            finally:
+                for _ in range(self.embed_workers):
+                    put(embed_q, _DONE)
+
+        def embed_stage():
+            try:
+                while True:
+                    batch = get(embed_q)
+                    if batch is _DONE:
+                        break
+                    started = time.time()
+                    # Each batch fans out into concurrent token-packed requests
+                    chunk_embeddings = self.embedder.embed_chunks(batch)
+                    with stats_lock:
+                        stats["embed"].busy_seconds += time.time() - started
+                        stats["embed"].items += len(batch)
+                        stats["embed"].batches += 1
+                    if not put(upsert_q, chunk_embeddings):
+                        break
+            except Exception as e:
+                fail(e)
+            finally:
+                put(upsert_q, _DONE)
+
+        threads = [threading.Thread(target=chunk_stage, name="ingest-chunk", daemon=True)]
+        threads += [
+            threading.Thread(target=embed_stage, name=f"ingest-embed-{i}", daemon=True)
+            for i in range(self.embed_workers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Upsert stage runs on the calling thread
+        finished_embedders = 0
+        try:
+            while finished_embedders < self.embed_workers:
+                item = get(upsert_q)
+                if item is _DONE:
+                    if stop.is_set():
+                        break
+                    finished_embedders += 1
+                    continue
+                chunks = [chunk for chunk, _ in item]
+                embeddings = [emb for _, emb in item]
+                started = time.time()
+                result = self.vectorstore.upsert(chunks, embeddings, namespace=namespace)
+                stats["upsert"].busy_seconds += time.time() - started
+                stats["upsert"].items += result["upserted_count"]
+                stats["upsert"].batches += 1
+                counts["vectors_upserted"] += result["upserted_count"]
+        except Exception as e:
+            fail(e)
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+        stage_stats = {name: s.to_dict() for name, s in stats.items()}
+        for name, s in stage_stats.items():
+            print(f"[Ingest] {name}: {s['items']} items in {s['batches']} batches, "
+                  f"{s['busy_seconds']}s busy ({s['items_per_second'] or 0}/s)")
+
+        return {**counts, "stage_stats": stage_stats}
@@ -6,11 +6,11 @@ a self-contained class with its own schema, implementation, and direct database/
 
 from .base import BaseTool, ToolContext, ToolResult
 from .registry import ToolRegistry, get_registry
-from .executor import ToolExecutor, ToolEvent
+from .executor import ToolExecutor, ToolEvent, ToolCall
 
 # Individual tools (for direct access if needed)
 from .resources import ListResourcesTool, GetResourceInfoTool, ReadResourceTool
-from .search import DocumentSearchTool, WebSearchTool
+from .search import DocumentSearchTool, WebSearchTool, SpeculativeSearch
 from .findings import SaveFindingTool
 from .data import AnalyzeDataTool
 from .vision import ViewImageTool
@@ -23,6 +23,7 @@ __all__ = [
     "ToolRegistry",
     "ToolExecutor",
     "ToolEvent",
+    "ToolCall",
     "get_registry",
     # Tools
     "ListResourcesTool",
@@ -30,6 +31,7 @@ __all__ = [
     "ReadResourceTool",
     "DocumentSearchTool",
     "WebSearchTool",
+    "SpeculativeSearch",
     "SaveFindingTool",
     "AnalyzeDataTool",
     "ViewImageTool",
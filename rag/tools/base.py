@@ -1,6 +1,8 @@
 """Base classes for the tool system."""
 
+import threading
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from typing import Any
 
@@ -22,6 +24,8 @@ class ToolContext:
     # For document search
     retriever: Any = None  # Retriever instance
     namespaces: list[str] = field(default_factory=list)
+    resource_ids: list[str] = field(default_factory=list)  # Scope for the shared namespace
+    speculative_search: Any = None  # SpeculativeSearch started by the agent for this turn
 
     # For vision and LLM calls
     anthropic_client: Any = None
@@ -30,6 +34,32 @@ class ToolContext:
     # For web search
     tavily_api_key: str | None = None
 
+    # Opens a new Session. When set, each tool call gets its own session -
+    # calls run on worker threads and a timed-out one keeps running, so
+    # they must not share db with the caller
+    db_factory: Any = None
+
+    # Serializes use of db when there is no db_factory - a Session isn't
+    # thread-safe and tool calls from one turn run concurrently
+    db_lock: threading.RLock = field(default_factory=threading.RLock)
+
+    @contextmanager
+    def session(self):
+        """Database session for one tool call.
+
+        A fresh session from db_factory (closed on exit) if set, otherwise
+        the shared db held under db_lock.
+        """
+        if self.db_factory is None:
+            with self.db_lock:
+                yield self.db
+            return
+        db = self.db_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
 
 @dataclass
 class ToolResult:
@@ -50,12 +80,14 @@ class BaseTool(ABC):
 
     Tools also specify:
     - requires: List of ToolContext attributes needed (for conditional availability)
+    - timeout: Seconds a call may run before it is reported as failed
     """
 
     name: str
     description: str
     input_schema: dict
     requires: list[str] = []  # e.g., ["retriever"] for document search
+    timeout: float = 60.0
 
     @abstractmethod
     def execute(self, params: dict, context: ToolContext) -> ToolResult:
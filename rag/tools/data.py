@@ -37,6 +37,7 @@ The query should describe what analysis to perform in natural language."""
     }
 
     requires = ["anthropic_api_key"]
+    timeout = 180.0  # Generates and runs analysis code
 
     def execute(self, params: dict, context: ToolContext) -> ToolResult:
         resource_name = params.get("resource_name", "")
@@ -1,11 +1,17 @@
 """Tool executor for dispatching tool calls and handling events."""
 
+import os
+import time
 from typing import Iterator
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-from .base import ToolContext, ToolResult
+from .base import BaseTool, ToolContext, ToolResult
 from .registry import ToolRegistry
 
+# Most tool calls from one turn that run at once
+TOOL_MAX_WORKERS = int(os.getenv("TOOL_MAX_WORKERS", "4"))
+
 
 @dataclass
 class ToolEvent:
@@ -14,6 +20,16 @@ class ToolEvent:
     data: dict
 
 
+@dataclass
+class ToolCall:
+    """One tool_use block from Claude, filled in by execute_many."""
+    tool_name: str
+    tool_use_id: str
+    params: dict
+    content: str = ""  # Result text for Claude
+    metadata: dict = field(default_factory=dict)
+
+
 class ToolExecutor:
     """Executes tools and yields events.
 
@@ -45,47 +61,103 @@ class ToolExecutor:
             Tuple of (result_content, events_list, metadata)
             metadata contains full tool result metadata including sources for search
         """
-        events = []
-
-        # Get tool
-        tool = self.registry.get(tool_name)
-        if not tool:
-            error_content = f"Unknown tool: {tool_name}"
-            events.append(ToolEvent("tool_result", {
-                "tool": tool_name,
-                "error": error_content
-            }))
-            return error_content, events, {}
-
-        # Emit tool_call event
-        call_event_data = {
-            "tool": tool_name,
-            **self._extract_event_data(tool_name, params)
-        }
-        events.append(ToolEvent("tool_call", call_event_data))
+        call = ToolCall(tool_name, tool_use_id, params)
+        events = list(self.execute_many([call]))
+        return call.content, events, call.metadata
+
+    def execute_many(self, calls: list[ToolCall]) -> Iterator[ToolEvent]:
+        """Execute a turn's tool calls concurrently, yielding events as they happen.
+
+        A tool_call event is yielded for every call up front, then each
+        call's tool_result event as soon as it finishes, so results can
+        arrive out of order; event data carries the tool_use_id to match
+        them. Calls run on at most TOOL_MAX_WORKERS threads. A call still
+        running after its tool's timeout gets an error result (the thread
+        is left to finish in the background).
 
-        # Execute tool
+        Each call's content and metadata are filled in by the time the
+        iterator is exhausted, so callers read results in the original order.
+
+        Args:
+            calls: Tool calls from Claude's response, in order
+        """
+        futures = {}
+        deadlines = {}
+        pool = ThreadPoolExecutor(
+            max_workers=max(1, min(len(calls), TOOL_MAX_WORKERS)),
+            thread_name_prefix="tool"
+        )
+        try:
+            for call in calls:
+                tool = self.registry.get(call.tool_name)
+                if not tool:
+                    call.content = f"Unknown tool: {call.tool_name}"
+                    yield ToolEvent("tool_result", {
+                        "tool": call.tool_name,
+                        "tool_call_id": call.tool_use_id,
+                        "error": call.content
+                    })
+                    continue
+
+                # Emit tool_call event
+                yield ToolEvent("tool_call", {
+                    "tool": call.tool_name,
+                    "tool_call_id": call.tool_use_id,
+                    **self._extract_event_data(call.tool_name, call.params)
+                })
+                future = pool.submit(self._run_tool, tool, call.params)
+                futures[future] = call
+                # Queued calls' clocks start now too - the limit bounds the turn's wait
+                deadlines[future] = time.monotonic() + tool.timeout
+
+            pending = set(futures)
+            while pending:
+                next_deadline = min(deadlines[f] for f in pending)
+                done, pending = wait(
+                    pending,
+                    timeout=max(0.0, next_deadline - time.monotonic()),
+                    return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    yield self._finish(futures[future], *future.result())
+
+                now = time.monotonic()
+                for future in [f for f in pending if deadlines[f] <= now]:
+                    pending.discard(future)
+                    future.cancel()
+                    call = futures[future]
+                    print(f"[ToolExecutor] {call.tool_name} timed out")
+                    yield self._finish(
+                        call,
+                        f"Tool execution failed: {call.tool_name} timed out",
+                        {"error": "timeout"},
+                        {}
+                    )
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _run_tool(self, tool: BaseTool, params: dict) -> tuple[str, dict, dict]:
+        """Run one tool (in a pool thread). Returns (content, result event data, metadata)."""
         try:
             result = tool.execute(params, self.context)
 
             # Emit tool_result event (exclude large data like sources)
-            result_event_data = {
-                "tool": tool_name,
-                **{k: v for k, v in result.metadata.items() if k != "sources"}
-            }
+            result_event_data = {k: v for k, v in result.metadata.items() if k != "sources"}
             if not result.success:
                 result_event_data["error"] = True
-            events.append(ToolEvent("tool_result", result_event_data))
-
-            return result.content, events, result.metadata
+            return result.content, result_event_data, result.metadata
 
         except Exception as e:
-            error_content = f"Tool execution failed: {str(e)}"
-            events.append(ToolEvent("tool_result", {
-                "tool": tool_name,
-                "error": str(e)
-            }))
-            return error_content, events, {}
+            return f"Tool execution failed: {str(e)}", {"error": str(e)}, {}
+
+    def _finish(self, call: ToolCall, content: str, event_data: dict, metadata: dict) -> ToolEvent:
+        call.content = content
+        call.metadata = metadata
+        return ToolEvent("tool_result", {
+            "tool": call.tool_name,
+            "tool_call_id": call.tool_use_id,
+            **event_data
+        })
 
     def _extract_event_data(self, tool_name: str, params: dict) -> dict:
         """Extract relevant data for tool_call event based on tool type."""
@@ -54,10 +54,13 @@ Include enough context that it makes sense on its own."""
                 content=content,
                 note=note
             )
-            context.db.add(finding)
-            context.db.commit()
+            with context.session() as db:
+                db.add(finding)
+                db.commit()
+                # Attributes reload after commit - read them before the session closes
+                finding_id, finding_content = finding.id, finding.content
 
-            result_message = f"Finding saved successfully with ID: {finding.id}"
+            result_message = f"Finding saved successfully with ID: {finding_id}"
 
             return ToolResult(
                 content=result_message,
@@ -65,8 +68,8 @@ Include enough context that it makes sense on its own."""
                     "found": 1,
                     "query": content[:50] + "..." if len(content) > 50 else content,
                     "saved": True,
-                    "finding_id": finding.id,
-                    "finding_content": finding.content
+                    "finding_id": finding_id,
+                    "finding_content": finding_content
                 }
             )
 
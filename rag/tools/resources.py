@@ -18,6 +18,7 @@ class ResourceInfo:
     row_count: int | None = None
     file_path: str | None = None
     dimensions: str | None = None  # For images
+    content_hash: str | None = None  # Key of the parsed-document artifact
 
 
 def _query_project_resources(context: ToolContext) -> list[ResourceInfo]:
@@ -26,10 +27,16 @@ def _query_project_resources(context: ToolContext) -> list[ResourceInfo]:
     This ensures we always get fresh data from the database,
     not a stale snapshot from conversation start.
     """
+    # Tools run concurrently on worker threads - use the call's own session
+    with context.session() as db:
+        return _load_project_resources(context, db)
+
+
+def _load_project_resources(context: ToolContext, db) -> list[ResourceInfo]:
     # Import here to avoid circular imports
     from api.database import Resource, ProjectResource
 
-    db_resources = context.db.query(Resource).join(
+    db_resources = db.query(Resource).join(
         ProjectResource, ProjectResource.resource_id == Resource.id
     ).filter(
         ProjectResource.project_id == context.project_id
@@ -48,6 +55,7 @@ def _query_project_resources(context: ToolContext) -> list[ResourceInfo]:
             id=r.id,
             summary=r.summary,
             file_path=r.source,
+            content_hash=r.content_hash,
         )
 
         # Add data file metadata if available
@@ -310,6 +318,18 @@ This is a direct read - no semantic search involved."""
                 metadata={"found": 1, "query": resource_name}
             )
 
+        if resource_info.type == "document" and resource_info.content_hash:
+            # Parsed text (e.g. Docling markdown of a PDF) rather than raw file bytes
+            from api.utils.parsed_documents import load_parsed_document
+            document = load_parsed_document(resource_info.content_hash)
+            if document is not None:
+                lines = document.content.split("\n")[:preview_lines]
+                file_content = "\n".join(line.rstrip() for line in lines)
+                return ToolResult(
+                    content=f"## {resource_name}\n\n**Content preview ({len(lines)} lines):**\n```\n{file_content}\n```",
+                    metadata={"found": 1, "query": resource_name}
+                )
+
         if not os.path.exists(resource_info.file_path):
             return ToolResult(
                 content=f"Error: File for '{resource_name}' no longer exists on disk.",
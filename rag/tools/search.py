@@ -1,9 +1,104 @@
 """Search tools for document and web searches."""
 
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
 from .base import BaseTool, ToolContext, ToolResult
 
+# Cosine similarity between a search_documents query and the user's message
+# at which the speculative search's results are used for that query
+SPECULATIVE_SEARCH_THRESHOLD = float(os.getenv("SPECULATIVE_SEARCH_THRESHOLD", "0.9"))
+
+# Seconds a search_documents call waits for an unfinished speculative search
+SPECULATIVE_SEARCH_WAIT = 10.0
+
+
+def _cosine(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class SpeculativeSearch:
+    """Document search for the raw user message, started while the router runs.
+
+    The agent starts one before planning, so retrieval overlaps the router
+    call. The first search_documents call whose query is close enough to
+    the message (SPECULATIVE_SEARCH_THRESHOLD) takes its results instead of
+    searching again; other queries search normally, reusing the query
+    embedding computed for the comparison.
+    """
+
+    def __init__(self, message: str, context: ToolContext, top_k: int = 5):
+        self.message = message
+        self.top_k = top_k
+        self._retriever = context.retriever
+        self._lock = threading.Lock()
+        self._used = False
+
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="speculative-search")
+        self._future = pool.submit(self._search, context.namespaces, context.resource_ids)
+        # The worker thread exits once the search is done
+        pool.shutdown(wait=False)
+
+    def _search(self, namespaces: list[str], resource_ids: list[str]) -> tuple[list[float], list, dict]:
+        embedding = self._retriever.embedder.embed_text(self.message)
+        stats = {}
+        results = self._retriever.retrieve(
+            query=self.message,
+            namespaces=namespaces,
+            resource_ids=resource_ids,
+            top_k=self.top_k,
+            stats=stats,
+            query_embedding=embedding
+        )
+        return embedding, results, stats
+
+    def take(self, query: str) -> tuple[list | None, dict, list[float] | None]:
+        """Results for a search_documents query, if the speculative search covers it.
+
+        Returns:
+            (results, stats, query_embedding): results and their search
+            stats when served (only once), otherwise (None, {}, the query's
+            embedding or None)
+        """
+        # Concurrent search_documents calls wait on the future and embed in
+        # parallel; the lock only guards claiming the results
+        with self._lock:
+            future = None if self._used else self._future
+        if future is None:
+            return None, {}, None
+
+        try:
+            message_embedding, results, stats = future.result(timeout=SPECULATIVE_SEARCH_WAIT)
+        except Exception as e:
+            print(f"[SpeculativeSearch] Not used: {e!r}")
+            with self._lock:
+                self._used, self._future = True, None
+            return None, {}, None
+
+        if " ".join(query.lower().split()) == " ".join(self.message.lower().split()):
+            similarity, query_embedding = 1.0, message_embedding
+        else:
+            query_embedding = self._retriever.embedder.embed_text(query)
+            similarity = _cosine(message_embedding, query_embedding)
+
+        if similarity < SPECULATIVE_SEARCH_THRESHOLD:
+            print(f"[SpeculativeSearch] Miss ({similarity:.3f}) for {query[:50]!r}")
+            return None, {}, query_embedding
+
+        with self._lock:
+            if self._used:
+                # Another call took the results first
+                return None, {}, query_embedding
+            self._used, self._future = True, None
+        print(f"[SpeculativeSearch] Hit ({similarity:.3f}) for {query[:50]!r}")
+        return results, {**stats, "speculative": True, "speculative_similarity": round(similarity, 4)}, None
+
 
 class DocumentSearchTool(BaseTool):
     """Search the user's uploaded documents."""
@@ -42,12 +137,21 @@ Also use for questions that might be answered by their uploaded documents."""
             )
 
         try:
+            # Use the search started on the user's message if it matches
+            results, search_stats, query_embedding = None, {}, None
+            if context.speculative_search:
+                results, search_stats, query_embedding = context.speculative_search.take(query)
+
             # Perform the search using the retriever
-            results = context.retriever.retrieve(
-                query=query,
-                namespaces=context.namespaces,
-                top_k=5
-            )
+            if results is None:
+                results = context.retriever.retrieve(
+                    query=query,
+                    namespaces=context.namespaces,
+                    resource_ids=context.resource_ids,
+                    top_k=5,
+                    stats=search_stats,
+                    query_embedding=query_embedding
+                )
 
             # Format results
             content = self._format_results(results)
@@ -71,7 +175,7 @@ Also use for questions that might be answered by their uploaded documents."""
 
             return ToolResult(
                 content=content,
-                metadata={"query": query, "found": len(results), "sources": sources}
+                metadata={"query": query, "found": len(results), "sources": sources, **search_stats}
             )
         except Exception as e:
             return ToolResult(
@@ -162,6 +266,7 @@ Also use for questions about recent events, general knowledge not in documents,
     }
 
     requires = ["tavily_api_key"]
+    timeout = 30.0
 
     def execute(self, params: dict, context: ToolContext) -> ToolResult:
         query = params.get("query", "")
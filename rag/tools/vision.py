@@ -39,6 +39,7 @@ You MUST specify which image resource to view by filename."""
     }
 
     requires = ["anthropic_client"]
+    timeout = 120.0
 
     def execute(self, params: dict, context: ToolContext) -> ToolResult:
         resource_name = params.get("resource_name", "")
@@ -1,8 +1,54 @@
 """Vector store module - handles Pinecone operations."""
 
+import os
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from pinecone import Pinecone, ServerlessSpec
 from .chunker import Chunk
+from .chunk_store import ChunkStore, slim_metadata, hydrate_matches
+
+# Vector layouts:
+# - "resource": one namespace per resource. A project search queries every
+#   resource namespace separately.
+# - "shared": every resource lives in one namespace and searches are scoped
+#   with a resource_id metadata filter, so a project search is one query.
+LAYOUT_RESOURCE = "resource"
+LAYOUT_SHARED = "shared"
+SHARED_NAMESPACE = "resources"
+
+# Vector store backends (VECTOR_STORE_BACKEND)
+BACKEND_PINECONE = "pinecone"
+BACKEND_LOCAL = "local"
+
+
+def scope_filter(resource_ids: list[str], filter: dict = None) -> dict:
+    """Build a metadata filter restricting a shared-namespace query to resources."""
+    scope = {"resource_id": {"$in": list(resource_ids)}}
+    if filter:
+        return {"$and": [filter, scope]}
+    return scope
+
+
+def create_vectorstore(
+    api_key: str = None,
+    index_name: str = "akleao-research",
+    dimension: int = 1536,
+    backend: str = None,
+    chunk_store: ChunkStore = None
+) -> "VectorStore":
+    """Create the vector store selected by VECTOR_STORE_BACKEND.
+
+    "pinecone" (the default) uses the hosted index. "local" keeps vectors on
+    disk under LOCAL_VECTOR_DIR, for offline use, CI, benchmarks and small
+    deployments.
+    """
+    backend = backend or os.getenv("VECTOR_STORE_BACKEND", BACKEND_PINECONE)
+    if backend == BACKEND_LOCAL:
+        from .local_vectorstore import LocalVectorStore
+        return LocalVectorStore(
+            base_dir=os.getenv("LOCAL_VECTOR_DIR", "vector_store"),
+            dimension=dimension,
+            chunk_store=chunk_store
+        )
+    return VectorStore(api_key=api_key, index_name=index_name, dimension=dimension, chunk_store=chunk_store)
 
 
 class VectorStore:
@@ -13,16 +59,91 @@ class VectorStore:
         api_key: str,
         index_name: str = "akleao-research",
         dimension: int = 1536,
-        metric: str = "cosine"
+        metric: str = "cosine",
+        layout: str = None,
+        chunk_store: ChunkStore = None
     ):
+        from pinecone import Pinecone
         self.pc = Pinecone(api_key=api_key)
         self.index_name = index_name
         self.dimension = dimension
         self.metric = metric
+        self.layout = layout or os.getenv("VECTOR_LAYOUT", LAYOUT_RESOURCE)
+        # With a chunk store, vectors carry only filterable metadata
+        self.chunk_store = chunk_store
         self._index = None
 
+    def namespace_for(self, resource_id: str) -> str:
+        """Namespace new vectors for a resource should be written to."""
+        if self.layout == LAYOUT_SHARED:
+            return SHARED_NAMESPACE
+        return resource_id
+
+    @staticmethod
+    def vector_id(chunk: Chunk, namespace: str) -> str:
+        """Vector ID for a chunk.
+
+        In the shared namespace IDs are prefixed with the resource ID so that
+        identical content in two resources doesn't collide, and so a
+        resource's vectors can be listed by ID prefix.
+        """
+        resource_id = chunk.metadata.get("resource_id")
+        if namespace == SHARED_NAMESPACE and resource_id:
+            return f"{resource_id}#{chunk.id}"
+        return chunk.id
+
+    @staticmethod
+    def vector_metadata(chunk: Chunk) -> dict:
+        """Metadata stored with a chunk's vector."""
+        # Filter out None values (Pinecone doesn't accept nulls)
+        metadata = {
+            "content": chunk.content,
+            "source": chunk.source,
+            "doc_id": chunk.doc_id,
+            "chunk_index": chunk.chunk_index,
+        }
+        for key, value in chunk.metadata.items():
+            if value is not None:
+                metadata[key] = value
+        return metadata
+
+    def _prepare_vectors(self, chunks: list[Chunk], embeddings: list[list[float]], namespace: str) -> list[dict]:
+        """Build vectors for upsert, saving content to the chunk store first.
+
+        Chunks are stored before their vectors exist, so every match a query
+        can return is hydratable.
+        """
+        vectors = []
+        records = []
+        for chunk, embedding in zip(chunks, embeddings):
+            vector_id = self.vector_id(chunk, namespace)
+            metadata = self.vector_metadata(chunk)
+            if self.chunk_store is not None:
+                records.append({"id": vector_id, "content": metadata.pop("content"), "metadata": metadata})
+                metadata = slim_metadata(metadata)
+            vectors.append({"id": vector_id, "values": embedding, "metadata": metadata})
+
+        if records:
+            self.chunk_store.put_many(namespace, records)
+        return vectors
+
+    def _copy_chunk_records(self, resource_id: str, source_namespace: str, ids: list[str]) -> None:
+        """Copy chunk store entries along with vectors moved into the shared namespace."""
+        if self.chunk_store is None or not ids:
+            return
+        records = self.chunk_store.get_many(source_namespace, ids)
+        self.chunk_store.put_many(SHARED_NAMESPACE, [
+            {
+                "id": f"{resource_id}#{vec_id}",
+                "content": record["content"],
+                "metadata": {**record["metadata"], "resource_id": resource_id}
+            }
+            for vec_id, record in records.items()
+        ])
+
     def create_index_if_not_exists(self) -> None:
         """Create the Pinecone index if it doesn't exist."""
+        from pinecone import ServerlessSpec
         existing_indexes = [idx.name for idx in self.pc.list_indexes()]
 
         if self.index_name not in existing_indexes:
@@ -66,26 +187,7 @@ class VectorStore:
             namespace: Pinecone namespace
             parallel: If True, upsert batches in parallel (faster for large docs)
         """
-        vectors = []
-
-        for chunk, embedding in zip(chunks, embeddings):
-            # Build metadata, filtering out None values (Pinecone doesn't accept nulls)
-            metadata = {
-                "content": chunk.content,
-                "source": chunk.source,
-                "doc_id": chunk.doc_id,
-                "chunk_index": chunk.chunk_index,
-            }
-            # Add chunk metadata, excluding None values
-            for key, value in chunk.metadata.items():
-                if value is not None:
-                    metadata[key] = value
-
-            vectors.append({
-                "id": chunk.id,
-                "values": embedding,
-                "metadata": metadata
-            })
+        vectors = self._prepare_vectors(chunks, embeddings, namespace)
 
         # Pinecone recommends batches of 100
         batch_size = 100
@@ -133,9 +235,12 @@ class VectorStore:
             filter=filter
         )
 
+        # Content is empty for vectors whose text is in the chunk store;
+        # the retriever hydrates the matches it keeps
         return [
             {
                 "id": match.id,
+                "namespace": namespace,
                 "score": match.score,
                 "content": match.metadata.get("content", ""),
                 "source": match.metadata.get("source", ""),
@@ -144,48 +249,184 @@ class VectorStore:
             for match in results.matches
         ]
 
-    def delete_by_source(self, source: str, namespace: str = "") -> None:
-        """Delete all vectors from a specific source document."""
+    def delete_by_source(self, source: str, namespace: str = "", resource_id: str = None) -> None:
+        """Delete all vectors from a specific source document.
+
+        In the shared namespace the delete is scoped to resource_id, which
+        is then required.
+        """
+        if namespace == SHARED_NAMESPACE:
+            # Other resources may have a file with the same name here
+            if not resource_id:
+                raise ValueError("delete_by_source needs a resource_id in the shared namespace")
+            self.delete_sources(namespace, [source], resource_id=resource_id)
+            return
         # Pinecone requires fetching IDs first for deletion by metadata
         # This is a limitation - for now we'll delete by filter if supported
         self.index.delete(
             filter={"source": {"$eq": source}},
             namespace=namespace
         )
+        if self.chunk_store is not None:
+            self.chunk_store.delete(namespace, source=source)
+
+    def _delete_ids(self, namespace: str, ids: list[str]) -> None:
+        """Delete vectors by ID."""
+        for i in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[i:i + 1000], namespace=namespace)
+
+    def _delete_by_filter(self, namespace: str, filter: dict) -> None:
+        """Delete vectors matching a metadata filter (pod-based indexes only)."""
+        self.index.delete(filter=filter, namespace=namespace)
+
+    def delete_sources(self, namespace: str, sources: list[str], resource_id: str = None) -> int:
+        """Delete the vectors of some of a resource's source documents.
+
+        Vector IDs are looked up in the chunk store, so this works on
+        serverless indexes and never touches another resource's vectors in
+        the shared namespace. Without a chunk store it falls back to a
+        metadata filter delete.
+
+        Returns:
+            Number of vectors deleted (0 if unknown)
+        """
+        if not sources:
+            return 0
+
+        if self.chunk_store is not None:
+            ids = self.chunk_store.list_ids(namespace, resource_id=resource_id, sources=sources)
+            self._delete_ids(namespace, ids)
+            self.chunk_store.delete(namespace, resource_id=resource_id, sources=sources)
+            return len(ids)
+
+        filter = {"source": {"$in": list(sources)}}
+        if namespace == SHARED_NAMESPACE and resource_id:
+            filter = scope_filter([resource_id], filter)
+        self._delete_by_filter(namespace, filter)
+        return 0
+
+    def delete_resource(self, resource_id: str, namespace: str) -> None:
+        """Delete all vectors belonging to a resource."""
+        if self.chunk_store is not None:
+            self.chunk_store.delete(namespace, resource_id=None if namespace != SHARED_NAMESPACE else resource_id)
+
+        if namespace != SHARED_NAMESPACE:
+            # Per-resource namespace - drop the whole namespace
+            self.index.delete(delete_all=True, namespace=namespace)
+            return
+
+        self._delete_ids(namespace, self._list_ids(namespace, prefix=f"{resource_id}#"))
+
+    def delete_resource_vectors(self, resource_id: str, namespace: str) -> int:
+        """Delete one resource's vectors from a namespace other resources also use.
+
+        For legacy project/workspace namespaces, where delete_resource would
+        wipe every resource's vectors. IDs come from the chunk store; without
+        records there, a resource_id metadata filter is used.
+
+        Returns:
+            Number of vectors deleted (0 if unknown)
+        """
+        ids = self.chunk_store.list_ids(namespace, resource_id=resource_id) if self.chunk_store is not None else []
+        if ids:
+            self._delete_ids(namespace, ids)
+            self.chunk_store.delete(namespace, resource_id=resource_id)
+            return len(ids)
+        self._delete_by_filter(namespace, {"resource_id": {"$eq": resource_id}})
+        return 0
+
+    def delete_stale_vectors(self, resource_id: str, namespace: str, keep_ids: set[str]) -> int:
+        """Delete a resource's vectors except the given IDs.
+
+        Run after a reindex has rewritten the resource's vectors, so the old
+        index stays searchable until the new one is in place. Only for the
+        resource's own namespace or the shared namespace; IDs are listed
+        from the index.
+
+        Returns:
+            Number of vectors deleted
+        """
+        prefix = f"{resource_id}#" if namespace == SHARED_NAMESPACE else None
+        stale = [i for i in self._list_ids(namespace, prefix=prefix) if i not in keep_ids]
+        self._delete_ids(namespace, stale)
+        if self.chunk_store is not None:
+            self.chunk_store.delete_ids(namespace, stale)
+        return len(stale)
+
+    def _list_ids(self, namespace: str, prefix: str = None, limit: int = None) -> list[str]:
+        """List vector IDs in a namespace, optionally by ID prefix."""
+        kwargs = {"namespace": namespace}
+        if prefix:
+            kwargs["prefix"] = prefix
+
+        vector_ids = []
+        # In Pinecone v8+, list() returns a generator that yields pages
+        for page in self.index.list(**kwargs):
+            # Each page has a 'vectors' attribute containing vector info
+            if hasattr(page, 'vectors'):
+                for vec in page.vectors:
+                    # In v8, each vector in the list has an 'id' attribute
+                    if hasattr(vec, 'id'):
+                        vector_ids.append(vec.id)
+                    else:
+                        # Fallback if it's just a string
+                        vector_ids.append(str(vec))
+            else:
+                # Handle case where page is directly iterable
+                vector_ids.extend(page)
+            if limit and len(vector_ids) >= limit:
+                break
+        return vector_ids
+
+    def move_to_shared(self, resource_id: str, source_namespace: str, batch_size: int = 100) -> int:
+        """Copy a resource's vectors from its own namespace into the shared one.
+
+        Vectors are re-keyed with the resource prefix and tagged with
+        resource_id so the scope filter matches them. The source namespace
+        is left intact - callers delete it once the resource has been
+        repointed, so searches never see a gap.
+
+        Returns:
+            Number of vectors copied
+        """
+        ids = self._list_ids(source_namespace)
+        copied = 0
+
+        for i in range(0, len(ids), batch_size):
+            self._copy_chunk_records(resource_id, source_namespace, ids[i:i + batch_size])
+            result = self.index.fetch(ids=ids[i:i + batch_size], namespace=source_namespace)
+            batch = []
+            for vec_id, vec_data in result.vectors.items():
+                metadata = dict(vec_data.metadata or {})
+                metadata["resource_id"] = resource_id
+                batch.append({
+                    "id": f"{resource_id}#{vec_id}",
+                    "values": vec_data.values,
+                    "metadata": metadata
+                })
+            if batch:
+                copied += self._upsert_batch(batch, SHARED_NAMESPACE)
+
+        return copied
 
     def stats(self) -> dict:
         """Get index statistics."""
         return self.index.describe_index_stats()
 
-    def list_vectors(self, namespace: str = "", limit: int = 100) -> list[dict]:
+    def list_vectors(self, namespace: str = "", limit: int = 100, prefix: str = None) -> list[dict]:
         """List all vectors in a namespace with their metadata.
 
         Args:
             namespace: Pinecone namespace to list vectors from
             limit: Maximum number of vectors to return
+            prefix: Only list vector IDs starting with this prefix
 
         Returns:
             List of vectors with id, content, source, and metadata
         """
         # Use Pinecone's list API to get vector IDs
-        # In Pinecone v8+, list() returns a generator that yields pages
-        vector_ids = []
         try:
-            for page in self.index.list(namespace=namespace):
-                # Each page has a 'vectors' attribute containing vector info
-                if hasattr(page, 'vectors'):
-                    for vec in page.vectors:
-                        # In v8, each vector in the list has an 'id' attribute
-                        if hasattr(vec, 'id'):
-                            vector_ids.append(vec.id)
-                        else:
-                            # Fallback if it's just a string
-                            vector_ids.append(str(vec))
-                else:
-                    # Handle case where page is directly iterable
-                    vector_ids.extend(page)
-                if len(vector_ids) >= limit:
-                    break
+            vector_ids = self._list_ids(namespace, prefix=prefix, limit=limit)
         except Exception as e:
             print(f"Error listing vectors: {e}")
             return []
@@ -207,12 +448,16 @@ class VectorStore:
                 metadata = vec_data.metadata or {}
                 vectors.append({
                     "id": vec_id,
+                    "namespace": namespace,
                     "content": metadata.get("content", ""),
                     "source": metadata.get("source", ""),
                     "chunk_index": metadata.get("chunk_index", 0),
                     "metadata": metadata
                 })
 
+        if self.chunk_store is not None:
+            hydrate_matches(self.chunk_store, vectors)
+
         # Sort by chunk_index to maintain document order
         vectors.sort(key=lambda x: x.get("chunk_index", 0))
 